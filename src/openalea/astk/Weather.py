@@ -27,6 +27,7 @@ from pathlib import Path
 
 from .TimeControl import *
 from openalea.astk.sun_position import sun_position
+from openalea.astk.sun_position_astk import sun_events
 from . import sky_sources as sunsky
 from . import data as datadir
 
@@ -228,9 +229,15 @@ class Weather:
         return sun, sky
 
     def daylength(self, seq):
+        """ Return daylength (hours) of the days of a sequence of dates
         """
-        """
-        return sunsky.day_length(self.localisation['latitude'], seq.dayofyear)
+        # sun_events expects UTC days (naive dates are UTC, as in sun_path)
+        seq = pandas.DatetimeIndex(seq)
+        if seq.tz is not None:
+            seq = seq.tz_convert('UTC')
+        return sun_events(seq.dayofyear, seq.year,
+                          self.localisation['latitude'],
+                          self.localisation['longitude'])['daylength']
 
 
 def weather_node(weather_path):
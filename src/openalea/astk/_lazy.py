@@ -0,0 +1,60 @@
+# -*- python -*-
+#
+#       Copyright 2016-2025 Inria - CIRAD - INRAe
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea/astk
+#
+#       File author(s): Christian Fournier <christian.fournier@inrae.fr>
+#
+# ==============================================================================
+""" Deferred import of heavy or optional dependencies (pvlib, matplotlib,
+plantgl), that are only loaded when first used
+"""
+import importlib
+import importlib.util
+
+
+class LazyModule(object):
+    """ A module proxy that imports the module on first attribute access
+
+    The truth value of the proxy tells whether the module is installed, without
+    importing it.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_installed'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __bool__(self):
+        if self._installed is None:
+            if self._module is not None:
+                installed = True
+            else:
+                # only the parent package is imported by find_spec
+                try:
+                    installed = importlib.util.find_spec(self._name) is not None
+                except ImportError:
+                    installed = False
+            self.__dict__['_installed'] = installed
+        return self._installed
+
+    def __repr__(self):
+        return '<lazy module ' + self._name + '>'
+
+
+def lazy_module(name):
+    """ A proxy to module name, imported on first use"""
+    return LazyModule(name)
@@ -18,6 +18,7 @@
 """
 
 from math import isnan
+import numpy
 
 class ColorMap(object):
     """A RGB color map, between 2 colors defined in HSV code
@@ -97,6 +98,98 @@ def nan_to_zero(values):
     return [0 if isnan(x) else x for x in values]
 
 
+def _jet(normed, coul1=80, coul2=20):
+    """vectorised ColorMap.color: (..., 3) int array of colors of normed values"""
+    inter = 1 / 5.
+    winter = numpy.trunc(normed / inter)
+    a = numpy.mod(normed, inter) / inter
+    b = 1 - a
+    up = coul2 * b + coul1 * a
+    down = coul1 * b + coul2 * a
+    conditions = (winter < 0, winter == 0, winter == 1, winter == 2, winter == 3)
+    r = numpy.select(conditions, (coul2, coul2, coul2, up, coul1), coul1)
+    g = numpy.select(conditions, (coul2, up, coul1, coul1, down), coul2)
+    b = numpy.select(conditions, (coul1, coul1, down, coul2, coul2), coul2)
+    return numpy.stack((r, g, b), axis=-1).astype(int)
+
+
+def _normed(values, minval=None, maxval=None):
+    """values normalised between minval and maxval (nan are ignored for
+    defaulting bounds)"""
+    if minval is None:
+        minval = numpy.nanmin(values)
+    if maxval is None:
+        maxval = numpy.nanmax(values)
+    minval, maxval = float(minval), float(maxval)
+    if minval == maxval:
+        return numpy.where(numpy.isnan(values), numpy.nan, 0.5)
+    return (values - minval) / (maxval - minval)
+
+
+def jet_lut(n=256, coul1=250., coul2=20.):
+    """A lookup table of jet colors
+
+    Args:
+        n: (int) number of colors of the table
+        coul1: (float) highest color component
+        coul2: (float) lowest color component
+
+    Returns:
+        a (n, 3) uint8 array of (r, g, b) colors, sampled regularly between
+        normalised values 0 and 1
+    """
+    return _jet(numpy.linspace(0, 1, n), coul1, coul2).astype(numpy.uint8)
+
+
+def grey_lut(n=256):
+    """A lookup table of grey levels
+
+    Args:
+        n: (int) number of colors of the table
+
+    Returns:
+        a (n, 3) uint8 array of (r, g, b) colors, from black to white
+    """
+    grey = (255 * numpy.linspace(0, 1, n)).astype(numpy.uint8)
+    return numpy.repeat(grey[:, numpy.newaxis], 3, axis=1)
+
+
+def lut_colors(values, lut=None, minval=None, maxval=None, nan_color=None):
+    """Colors associated to an array of values through a lookup table
+
+    Args:
+        values: (array-like of float) input values
+        lut: a (n, 3) array of (r, g, b) colors, such as returned by jet_lut.
+        If None (default), a 256 colors jet_lut is used
+        minval: (float) value at lower bound of color range. If None (default),
+        the minimal value is used
+        maxval: (float) value at upper bound of color range. If None (default),
+        the maximal value is used
+        nan_color: a (r, g, b) tuple for nan values. If None (default), nan are
+        coloured as zero (as in jet_colors)
+
+    Returns:
+        a uint8 array of (r, g, b) colors, with shape values.shape + (3,)
+
+    Details:
+        values outside [minval, maxval] are coloured with the bounds of the
+        table
+    """
+    if lut is None:
+        lut = jet_lut()
+    lut = numpy.asarray(lut, dtype=numpy.uint8)
+    values = numpy.asarray(values, dtype=float)
+    missing = numpy.isnan(values)
+    if nan_color is None:
+        values = numpy.where(missing, 0, values)
+    normed = _normed(values, minval, maxval)
+    index = numpy.rint(numpy.nan_to_num(normed) * (len(lut) - 1))
+    colors = lut[numpy.clip(index, 0, len(lut) - 1).astype(int)]
+    if nan_color is not None:
+        colors[missing] = nan_color
+    return colors
+
+
 def jet_colors(values, minval=None, maxval=None):
     """return jet colors associated to values after gamme normalisation
 
@@ -108,11 +201,7 @@ def jet_colors(values, minval=None, maxval=None):
     Returns:
         a list of (r, g, b) tuples
     """
-
-    values = nan_to_zero(values)
-    if minval is None:
-        minval = min(values)
-    if maxval is None:
-        maxval = max(values)
-    cmap = ColorMap()
-    return list(map(lambda x: cmap(x, minval, maxval, 250., 20.), values))
+    values = numpy.array(list(values), dtype=float)
+    values[numpy.isnan(values)] = 0
+    colors = _jet(_normed(values, minval, maxval), 250., 20.)
+    return list(map(tuple, colors.tolist()))
@@ -24,7 +24,10 @@ hexagonal/pentagonal duals.
 
 import math
 import numpy
-from functools import reduce
+from functools import lru_cache
+from pathlib import Path
+
+from . import data as datadir
 
 
 def normed(point):
@@ -157,6 +160,112 @@ def icosahedron():
     return vertices, faces
 
 
+def _normed(points):
+    """ normalised coordinates of an (n, 3) array of points
+    """
+    return points / numpy.sqrt((points ** 2).sum(axis=1))[:, numpy.newaxis]
+
+
+def _as_lists(vertices, faces):
+    """ convert an array mesh to the list of tuples used by the public API
+    """
+    return list(map(tuple, vertices.tolist())), list(map(tuple, faces.tolist()))
+
+
+def _first_use(values):
+    """ unique values of an array, in order of first occurrence, and the rank
+    of each value in that order
+    """
+    unique, first, inverse = numpy.unique(values, return_index=True,
+                                          return_inverse=True)
+    order = numpy.argsort(first)
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    return unique[order], rank[inverse.ravel()]
+
+
+def _polygons(faces):
+    """ flat vertex indices and number of vertices of a list of polygons
+    """
+    if isinstance(faces, numpy.ndarray) and faces.ndim == 2:
+        return faces.ravel(), numpy.full(len(faces), faces.shape[1])
+    sizes = numpy.array([len(f) for f in faces], dtype=int)
+    return numpy.concatenate(faces).astype(int), sizes
+
+
+def _split_polygons(faces, sizes):
+    """ list of polygons (lists of vertex indices) from their flat
+    concatenation and sizes
+    """
+    return [f.tolist() for f in numpy.split(faces, numpy.cumsum(sizes)[:-1])]
+
+
+def _split_triangles(vertices, faces, tags=None):
+    """ Array version of split_triangles
+
+    Args:
+        vertices: a (n, 3) array of vertex coordinates
+        faces: a (m, 3) array of vertex indices
+        tags: a (m,) array of face tags or None
+
+    Returns:
+        the (n + e, 3) vertices, the (4m, 3) faces and the (4m,) tags (None if
+        tags is None), with e the number of edges of the input mesh
+
+    Details:
+        Edge mid-points are deduplicated by their sorted (v1, v2) keys and
+        numbered in order of first use, as the legacy dict cache did.
+    """
+    n = len(vertices)
+    v1, v2, v3 = faces.T
+    # edges a, b and c of each face, in that order
+    edges = numpy.stack((v1, v2, v2, v3, v1, v3), axis=1).reshape(-1, 2)
+    edges.sort(axis=1)
+    keys, rank = _first_use(edges[:, 0] * n + edges[:, 1])
+    va, vb, vc = (n + rank).reshape(-1, 3).T
+    ends = numpy.stack(divmod(keys, n), axis=1)
+    middles = _normed((vertices[ends[:, 0]] + vertices[ends[:, 1]]) / 2.)
+
+    new_faces = numpy.stack(((v1, va, vc), (v2, vb, va), (v3, vc, vb),
+                             (va, vb, vc)), axis=1).transpose(2, 1, 0)
+    new_faces = new_faces.reshape(-1, 3)
+    if tags is not None:
+        tags = numpy.repeat(tags, 4)
+    return numpy.concatenate((vertices, middles)), new_faces, tags
+
+
+def _star_split(vertices, faces, tags=None, sizes=None):
+    """ Array version of star_split
+
+    Args:
+        vertices: a (n, 3) array of vertex coordinates
+        faces: a (m, k) array or a list of polygons (vertex indices). If sizes
+        is given, the flat concatenation of the polygons
+        tags: a (m,) array of face tags or None
+        sizes: a (m,) array of polygon sizes or None
+
+    Returns:
+        the (n + m, 3) vertices, the triangular faces and their tags (None if
+        tags is None)
+    """
+    vertices = numpy.asarray(vertices, dtype=float)
+    if sizes is None:
+        flat, sizes = _polygons(faces)
+    else:
+        flat = faces
+    starts = numpy.cumsum(sizes) - sizes
+    # index of the next corner along each polygon
+    following = numpy.arange(1, len(flat) + 1)
+    following[starts + sizes - 1] = starts
+    centers = numpy.add.reduceat(vertices[flat], starts, axis=0)
+    centers = _normed(centers / sizes[:, numpy.newaxis])
+    icenters = len(vertices) + numpy.repeat(numpy.arange(len(sizes)), sizes)
+    new_faces = numpy.stack((flat, flat[following], icenters), axis=1)
+    if tags is not None:
+        tags = numpy.repeat(tags, sizes)
+    return numpy.concatenate((vertices, centers)), new_faces, tags
+
+
 def split_triangles(vertices, faces, tags=None):
     """ Iterate an icosphere by sub-dividing each triangle into 4.
 
@@ -172,70 +281,115 @@ def split_triangles(vertices, faces, tags=None):
     This is a python implementation of the C code found here:
     http://blog.andreaskahler.com/2009/06/creating-icosphere-mesh-in-code.html
 """
-    # copy input
-    new_faces = [f for f in faces]
-    new_vertices = [v for v in vertices]
-    if tags is not None:
-        new_tags = [t for t in tags]
-    # cache is a (index_p1, index_p2): middle_point_index dict refering
-    # to vertices
-    cache = {}
-    for i in range(len(faces)):
-        face = new_faces.pop(0)
-        v1, v2, v3 = face
-        p1 = vertices[v1]
-        p2 = vertices[v2]
-        p3 = vertices[v3]
-        ka = tuple(sorted((v1, v2)))
-        kb = tuple(sorted((v2, v3)))
-        kc = tuple(sorted((v1, v3)))
-        if ka in cache:
-            va = cache[ka]
-        else:
-            new_vertices.append(normed(middle_point(p1, p2)))
-            va = len(new_vertices) - 1
-            cache.update({ka: va})
-        if kb in cache:
-            vb = cache[kb]
-        else:
-            new_vertices.append(normed(middle_point(p2, p3)))
-            vb = len(new_vertices) - 1
-            cache.update({kb: vb})
-        if kc in cache:
-            vc = cache[kc]
-        else:
-            new_vertices.append(normed(middle_point(p1, p3)))
-            vc = len(new_vertices) - 1
-            cache.update({kc: vc})
-
-        new_faces.append((v1, va, vc))
-        new_faces.append((v2, vb, va))
-        new_faces.append((v3, vc, vb))
-        new_faces.append((va, vb, vc))
-
-        if tags is not None:
-            tag = new_tags.pop(0)
-            new_tags.extend([tag] * 4)
-
+    vertices, faces, new_tags = _split_triangles(
+        numpy.asarray(vertices, dtype=float), numpy.asarray(faces, dtype=int),
+        tags)
+    new_vertices, new_faces = _as_lists(vertices, faces)
     if tags is None:
         return new_vertices, new_faces
     else:
-        return new_vertices, new_faces, new_tags
+        return new_vertices, new_faces, new_tags.tolist()
+
+
+def adjacency(faces, n_vertices=None):
+    """ Vertex-to-face and edge-to-face adjacency of a closed triangle mesh
+
+    Args:
+        faces: a (m, 3) array of vertex indices of consistently oriented faces
+        n_vertices (int): the number of vertices of the mesh. If None
+        (default), it is deduced from faces
+
+    Returns:
+        - offsets: a (n + 1,) array such that fans[offsets[i]:offsets[i + 1]]
+        are the faces around vertex i
+        - fans: the faces around each vertex, sorted counter clockwise starting
+        from the face of lowest index
+        - edges: a (e, 2) array of the (sorted) vertex indices of mesh edges
+        - edge_faces: a (e, 2) array of the two faces sharing each edge
+
+    Details:
+        Adjacency is stored in compressed sparse row (CSR) form. It is built by
+        sorting the directed edges of the faces, in O(m log m). The face
+        following a face in a fan is the one that shares its edge ending at the
+        fan center.
+    """
+    faces = numpy.asarray(faces, dtype=int)
+    if n_vertices is None:
+        n_vertices = faces.max() + 1
+    n = n_vertices
+    ncorners = faces.size
+    corners = numpy.arange(ncorners).reshape(-1, 3)
+    start = faces.ravel()
+    end = faces[:, [1, 2, 0]].ravel()
+    # directed edge start -> end, running from each corner
+    keys = start * n + end
+    order = numpy.argsort(keys)
+    sorted_keys = keys[order]
+    twin_keys = end * n + start
+    pos = numpy.minimum(numpy.searchsorted(sorted_keys, twin_keys),
+                        ncorners - 1)
+    if not numpy.array_equal(sorted_keys[pos], twin_keys):
+        raise ValueError('faces should form a closed and consistently oriented'
+                         ' triangle mesh')
+    twin = order[pos]
+    next_corner = twin[corners[:, [2, 0, 1]].ravel()]
+
+    counts = numpy.bincount(start, minlength=n)
+    offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+    by_vertex = numpy.argsort(start, kind='stable')
+    first = offsets[:-1][counts > 0]
+    valence = counts[counts > 0]
+    current = by_vertex[first]
+    fans = numpy.empty(ncorners, dtype=int)
+    for step in range(counts.max()):
+        turning = step < valence
+        fans[first[turning] + step] = current[turning]
+        current = next_corner[current]
+    fans //= 3
+
+    forward = numpy.where(start < end)[0]
+    forward = forward[numpy.argsort(keys[forward])]
+    edges = numpy.stack((start[forward], end[forward]), axis=1)
+    edge_faces = numpy.stack((forward // 3, twin[forward] // 3), axis=1)
+
+    return offsets, fans, edges, edge_faces
 
 
 def sorted_faces(center, face_indices, faces):
     """ return face indices sorted to form a counter clockwise rotation
      around its centroid"""
     indices = [i for i in face_indices]
-    sorted_indices = [indices.pop(0)]
-    while len(indices) > 0:
-        last = faces[sorted_indices[-1]]
-        next_pt = last[((numpy.where(numpy.array(last) == center)[0] + 2) % 3)[0]]
-        next_index = [i for i, f in enumerate(indices) if next_pt in faces[f]][0]
-        sorted_indices.append(indices.pop(next_index))
+    # faces indexed by the vertex following center
+    following = {}
+    for i in indices:
+        face = list(faces[i])
+        following[face[(face.index(center) + 1) % 3]] = i
+    sorted_indices = [indices[0]]
+    for _ in range(len(indices) - 1):
+        last = list(faces[sorted_indices[-1]])
+        next_pt = last[(last.index(center) + 2) % 3]
+        sorted_indices.append(following[next_pt])
     return sorted_indices
 
 
+def _dual(vertices, faces):
+    """ Array version of dual
+
+    Args:
+        vertices: a (n, 3) array of vertex coordinates
+        faces: a (m, 3) array of vertex indices
+
+    Returns:
+        the (m, 3) dual vertices, the flat concatenation of the dual faces and
+        the (n,) number of vertices of each dual face
+    """
+    offsets, fans, _, _ = adjacency(faces, len(vertices))
+    # dual vertices are numbered in order of first use along the fans
+    used, dual_faces = _first_use(fans)
+    centers = vertices[faces[used]].sum(axis=1) / 3.
+    return _normed(centers), dual_faces, numpy.diff(offsets)
+
+
 def dual(vertices, faces):
     """Generate the dual polyhedron associated to an icosphere.
 
@@ -245,26 +399,10 @@ def dual(vertices, faces):
     Returns:
         a list of vertices and a list of faces
     """
-
-    # centers = []
-    dual_vertices = []
-    dual_faces = []
-    cache = {}
-    for icenter, center in enumerate(vertices):
-        new_face = []
-        # centers.append(center)
-        ifaces = [i for i, f in enumerate(faces) if icenter in f]
-        for iface in sorted_faces(icenter, ifaces, faces):
-            if iface in cache:
-                new_face.append(cache[iface])
-            else:
-                cache[iface] = len(dual_vertices)
-                new_face.append(len(dual_vertices))
-                points = [vertices[i] for i in faces[iface]]
-                dual_vertices.append(normed(centroid(points)))
-        dual_faces.append(new_face)
-
-    return dual_vertices, dual_faces
+    dual_vertices, dual_faces, sizes = _dual(
+        numpy.asarray(vertices, dtype=float), numpy.asarray(faces, dtype=int))
+    return (list(map(tuple, dual_vertices.tolist())),
+            _split_polygons(dual_faces, sizes))
 
 
 def star_split(vertices, faces, tags=None):
@@ -279,28 +417,12 @@ def star_split(vertices, faces, tags=None):
         a list of vertices and a list of faces and, if tags is not None, a list
         of tags referencing the tag of the parent face
     """
-
-    # copy input
-    new_faces = [f for f in faces]
-    new_vertices = [v for v in vertices]
-    if tags is not None:
-        new_tags = [t for t in tags]
-
-    for i in range(len(faces)):
-        face = new_faces.pop(0)
-        center = normed(centroid([vertices[p] for p in face]))
-        icenter = len(new_vertices)
-        new_vertices.append(center)
-        for j in range(len(face) - 1):
-            new_faces.append((face[j], face[j + 1], icenter))
-        new_faces.append((face[-1], face[0], icenter))
-        if tags is not None:
-            tag = new_tags.pop(0)
-            new_tags.extend([tag] * len(face))
+    vertices, faces, new_tags = _star_split(vertices, faces, tags)
+    new_vertices, new_faces = _as_lists(vertices, faces)
     if tags is None:
         return new_vertices, new_faces
     else:
-        return new_vertices, new_faces, new_tags
+        return new_vertices, new_faces, new_tags.tolist()
 
 
 def icosphere(iter_triangle=0, iter_star=0):
@@ -316,11 +438,20 @@ def icosphere(iter_triangle=0, iter_star=0):
         a list of vertices and a list of faces
     """
 
+    return _as_lists(*_icosphere(iter_triangle, iter_star))
+
+
+def _icosphere(iter_triangle=0, iter_star=0):
+    """ Array version of icosphere
+    """
     vertices, faces = icosahedron()
+    vertices, faces = numpy.array(vertices), numpy.array(faces)
     for i in range(iter_star):
-        vertices, faces = star_split(*dual(vertices, faces))
+        dual_vertices, dual_faces, sizes = _dual(vertices, faces)
+        vertices, faces, _ = _star_split(dual_vertices, dual_faces,
+                                         sizes=sizes)
     for i in range(iter_triangle):
-        vertices, faces = split_triangles(vertices, faces)
+        vertices, faces, _ = _split_triangles(vertices, faces)
 
     return vertices, faces
 
@@ -354,6 +485,211 @@ def refine(level=0):
     return iter_triangle, iter_star
 
 
+# number of faces of the turtle meshes and the corresponding refinement levels
+turtle_mesh_sectors = (6, 16, 26, 46, 66, 91, 136, 196, 251, 341, 406, 556, 751,
+                       976)
+_turtle_library = Path(datadir.__path__[0]) / 'turtle_meshes.npz'
+_turtle_keys = ('vertices', 'faces', 'sizes', 'centers', 'solid_angles',
+                'sky_solid_angles', 'spherical_centers', 'neighbours')
+
+
+def _spherical_geometry(vertices, faces, sizes):
+    """ solid angles and spherical centroids of the spherical polygons joining
+    unit vectors vertices along great circles
+
+    Args:
+        vertices: a (n, 3) array of unit vectors
+        faces: the flat concatenation of the vertex indices of the polygons
+        sizes: a (m,) array of polygon sizes
+
+    Returns:
+        the (m,) solid angles and the (m, 3) unit vectors pointing to the
+        centroids of the polygons
+    """
+    starts = numpy.cumsum(sizes) - sizes
+    following = numpy.arange(1, len(faces) + 1)
+    following[starts + sizes - 1] = starts
+    a = vertices[faces]
+    b = vertices[faces[following]]
+    centers = numpy.add.reduceat(a, starts, axis=0) / sizes[:, numpy.newaxis]
+    c = numpy.repeat(_normed(centers), sizes, axis=0)
+    # Van Oosterom & Strackee (1983) solid angle of the (c, a, b) triangles
+    # of the fan triangulation of polygons
+    det = numpy.abs((c * numpy.cross(a, b)).sum(axis=1))
+    div = 1 + (a * b).sum(axis=1) + (b * c).sum(axis=1) + (c * a).sum(axis=1)
+    solid_angles = numpy.add.reduceat(2 * numpy.arctan2(det, div), starts)
+    # by Stokes theorem, the integral of unit vectors over a polygon is half
+    # the sum along its edges of arc lengths times arc plane normals
+    normals = numpy.cross(a, b)
+    sines = numpy.linalg.norm(normals, axis=1)
+    arcs = numpy.arctan2(sines, (a * b).sum(axis=1))
+    moments = numpy.add.reduceat(normals * (arcs / sines)[:, numpy.newaxis],
+                                 starts, axis=0)
+    orientation = numpy.sign((moments * centers).sum(axis=1))
+    return solid_angles, _normed(moments * orientation[:, numpy.newaxis])
+
+
+def spherical_solid_angles(vertices, faces):
+    """ Solid angles of the faces of a spherical polyhedron
+
+    Args:
+        vertices (list of tuples): list of 3D coordinates of polyhedron vertices
+        faces (list of tuple): list of vertex indices defining the faces
+
+    Returns:
+        a (m,) array of solid angles (sr)
+
+    Details:
+        Faces are the spherical polygons delimited by the great circles joining
+        their (normalised) vertices, that should form convex polygons.
+    """
+    flat, sizes = _polygons(faces)
+    vertices = _normed(numpy.asarray(vertices, dtype=float))
+    return _spherical_geometry(vertices, flat, sizes)[0]
+
+
+def spherical_centroids(vertices, faces):
+    """ Centroids of the faces of a spherical polyhedron
+
+    Args:
+        vertices (list of tuples): list of 3D coordinates of polyhedron vertices
+        faces (list of tuple): list of vertex indices defining the faces
+
+    Returns:
+        a (m, 3) array of unit vectors pointing to the centroids of the
+        spherical faces (see spherical_solid_angles)
+    """
+    flat, sizes = _polygons(faces)
+    vertices = _normed(numpy.asarray(vertices, dtype=float))
+    return _spherical_geometry(vertices, flat, sizes)[1]
+
+
+def _sky_solid_angles(vertices, faces, sizes, solid_angles):
+    """ solid angles of the parts of spherical polygons above the horizon
+    """
+    starts = numpy.cumsum(sizes) - sizes
+    above = vertices[faces, 2] >= 0
+    n_above = numpy.add.reduceat(above.astype(int), starts)
+    sky = numpy.where(n_above == sizes, solid_angles, 0.)
+    for i in numpy.where((n_above > 0) & (n_above < sizes))[0]:
+        polygon = vertices[faces[starts[i]:starts[i] + sizes[i]]]
+        # Sutherland-Hodgman clipping by the horizontal plane
+        clipped = []
+        for a, b in zip(polygon, numpy.roll(polygon, -1, axis=0)):
+            if a[2] >= 0:
+                clipped.append(a)
+            if (a[2] >= 0) != (b[2] >= 0):
+                clipped.append(_normed(
+                    (a + a[2] / (a[2] - b[2]) * (b - a))[numpy.newaxis])[0])
+        clipped = numpy.array(clipped)
+        sky[i] = _spherical_geometry(clipped, numpy.arange(len(clipped)),
+                                     numpy.array([len(clipped)]))[0][0]
+    return sky
+
+
+def _build_turtle(refine_level):
+    """ turtle mesh arrays (see turtle_data) built from scratch
+    """
+    vertices, faces = _icosphere(*refine(refine_level))
+    # dual face i is centred on vertex i, dual faces sharing an edge are
+    # centred on the ends of an icosphere edge
+    _, _, edges, _ = adjacency(faces, len(vertices))
+    vertices, faces, sizes = _dual(vertices, faces)
+    starts = numpy.cumsum(sizes) - sizes
+    centers = numpy.add.reduceat(vertices[faces], starts, axis=0)
+    centers /= sizes[:, numpy.newaxis]
+
+    # filter faces with centroids below horizontal plane
+    median_height = numpy.median(centers[:, 2])
+    t = numpy.linalg.norm(vertices[faces[1]] - vertices[faces[0]])
+    median_height -= (t / 4.)
+    kept = centers[:, 2] > median_height
+    new_faces = numpy.repeat(kept, sizes)
+    used = numpy.unique(faces[new_faces])
+    mapping = numpy.full(len(vertices), -1)
+    mapping[used] = numpy.arange(len(used))
+    face_mapping = numpy.cumsum(kept) - 1
+    neighbours = edges[kept[edges].all(axis=1)]
+
+    solid_angles, spherical_centers = _spherical_geometry(vertices, faces,
+                                                          sizes)
+    sky_solid_angles = _sky_solid_angles(vertices, faces, sizes, solid_angles)
+
+    return dict(vertices=vertices[used], faces=mapping[faces[new_faces]],
+                sizes=sizes[kept], centers=centers[kept],
+                solid_angles=solid_angles[kept],
+                sky_solid_angles=sky_solid_angles[kept],
+                spherical_centers=spherical_centers[kept],
+                neighbours=face_mapping[neighbours])
+
+
+def build_turtle_library(path=None):
+    """ Generate the turtle meshes of all refinement levels and save them
+
+    Args:
+        path: the path of the .npz file to write. If None (default), the
+        library distributed with the package is (re)generated
+
+    Returns:
+        the path of the library
+    """
+    if path is None:
+        path = _turtle_library
+    arrays = {}
+    for level, sectors in enumerate(turtle_mesh_sectors):
+        for k, v in _build_turtle(level).items():
+            arrays[k + '_' + str(sectors)] = v
+    numpy.savez_compressed(path, **arrays)
+    return path
+
+
+@lru_cache(maxsize=None)
+def _turtle(sectors):
+    """ cached, read-only, turtle mesh arrays"""
+    try:
+        with numpy.load(_turtle_library) as library:
+            turtle = {k: library[k + '_' + str(sectors)] for k in _turtle_keys}
+    except (OSError, KeyError):
+        turtle = _build_turtle(turtle_mesh_sectors.index(sectors))
+    for v in turtle.values():
+        v.flags.writeable = False
+    return turtle
+
+
+def turtle_data(min_faces=46):
+    """ Precomputed geometry of a dual icosphere polyhedron mapping the Z+
+    hemisphere
+
+    Args:
+        min_faces (int) : the minimal number of faces for the polyhedron (see
+        turtle_mesh_sectors for the available ones)
+
+    Returns:
+        a dict of read-only arrays:
+        - vertices: (n, 3) vertex coordinates
+        - faces: the flat concatenation of the vertex indices of the faces
+        - sizes: (m,) number of vertices of each face
+        - centers: (m, 3) face centroids
+        - solid_angles: (m,) solid angles (sr) of the spherical faces
+        - sky_solid_angles: (m,) solid angles (sr) of the parts of the
+        spherical faces above the horizon
+        - spherical_centers: (m, 3) unit vectors pointing to the centroids of
+        the spherical faces
+        - neighbours: (e, 2) indices of faces sharing an edge
+
+    Details:
+        Meshes are loaded from the turtle library distributed with the package
+        (see build_turtle_library), or computed if it is missing, and cached.
+        Faces crossing the horizon are kept whole, their solid angle includes
+        the part below the horizon. Spherical faces are the polygons delimited
+        by the great circles joining their vertices (see
+        spherical_solid_angles).
+    """
+    i = numpy.searchsorted(turtle_mesh_sectors,
+                           min(max(turtle_mesh_sectors), min_faces))
+    return _turtle(turtle_mesh_sectors[i])
+
+
 def turtle_mesh(min_faces=46):
     """Generate faces of a dual icosphere polyhedron mapping the Z+ hemisphere
 
@@ -365,40 +701,293 @@ def turtle_mesh(min_faces=46):
     Returns:
         a list of vertices and a list of faces
     """
-    sectors = [ 1, 6, 16, 26, 46, 66, 91, 136, 196, 251, 341, 406, 556, 751, 976]
-    refines = [-1, 0,  1,  2,  3,  4,  5,   6,   7,   8,   9,  10,  11,  12, 13]
-    refine_level = refines[numpy.searchsorted(sectors, min(max(sectors), min_faces))]
-    vertices, faces = dual(*icosphere(*refine(refine_level)))
-    # filter faces with centroids below horizontal plane
-    centers = [centroid([vertices[p] for p in face]) for face in faces]
-    median_height = numpy.median([c[2] for c in centers])
-    edge = [vertices[v] for v in faces[0]]
-    t = norm(numpy.array(edge[1]) - numpy.array(edge[0]))
-    median_height -= (t / 4.)
-    new_faces = [f for c, f in zip(centers, faces) if c[2] > median_height]
-    filtered = sum(new_faces, [])
-    mapping = {}
-    new_vertices = []
-    for v, pt in enumerate(vertices):
-        if v in filtered:
-            mapping[v] = len(new_vertices)
-            new_vertices.append(pt)
-    new_faces = [[mapping.get(v) for v in face] for face in new_faces]
+    turtle = turtle_data(min_faces)
+    return (list(map(tuple, turtle['vertices'].tolist())),
+            _split_polygons(turtle['faces'], turtle['sizes']))
 
-    return new_vertices, new_faces
+
+def _spherical_degrees(centers):
+    """ (elevation, azimuth) list, in degrees, of an array of points
+    """
+    x, y, z = _normed(centers).T
+    zeniths = numpy.arccos(z)
+    azimuths = numpy.arctan2(y, x)
+    return list(zip(90 - numpy.degrees(zeniths), numpy.degrees(azimuths)))
 
 
 def spherical_face_centers(turtle_mesh):
     """ Spherical coordinates of turtle mesh faces centers
     """
     vertices, faces = turtle_mesh
+    vertices = numpy.asarray(vertices, dtype=float)
+    flat, sizes = _polygons(faces)
+    starts = numpy.cumsum(sizes) - sizes
 
     # Compute the centroid of each face
-    centers = [centroid([vertices[p] for p in face]) for face in faces]
+    centers = numpy.add.reduceat(vertices[flat], starts, axis=0)
+    centers /= sizes[:, numpy.newaxis]
 
-    zeniths, azimuths = zip(*spherical(centers))
+    return _spherical_degrees(centers)
 
-    return list(zip(90-numpy.degrees(zeniths), numpy.degrees(azimuths)))
+
+def turtle_face_centers(min_faces=46, spherical=False):
+    """ Spherical coordinates of the face centers of a turtle mesh, equivalent
+     to spherical_face_centers(turtle_mesh(min_faces))
+
+    Args:
+        min_faces (int) : the minimal number of faces of the turtle mesh
+        spherical (bool): if True, the centroids of the spherical faces are
+        returned instead of the (projected) centroids of the flat faces
+    """
+    turtle = turtle_data(min_faces)
+    if spherical:
+        return _spherical_degrees(turtle['spherical_centers'])
+    return _spherical_degrees(turtle['centers'])
+
+
+def _walk(points, current, normals, across, max_steps):
+    """ move points from their current face to the neighbour across the edge
+    they lie the most outside of, until they are inside (in place)
+    """
+    active = numpy.arange(len(points))
+    for _ in range(max_steps):
+        faces = current[active]
+        side = numpy.einsum('ijk,ik->ij', normals[faces], points[active])
+        # mesh boundaries cannot be crossed
+        side[across[faces] < 0] = numpy.inf
+        worst = side.argmin(axis=1)
+        moving = side[numpy.arange(len(active)), worst] < -1e-12
+        if not moving.any():
+            break
+        active = active[moving]
+        current[active] = across[current[active], worst[moving]]
+    return current
+
+
+@lru_cache(maxsize=None)
+def _turtle_locator(sectors, resolution=1):
+    """ cached point location structure of a turtle mesh
+
+    Returns:
+        - normals: (m, k, 3) unit normals of the great circles supporting the
+        edges of faces, pointing inside faces (zero for padded edges)
+        - across: (m, k) index of the face sharing each edge (-1 if none)
+        - lookup: (90 / resolution, 360 / resolution) face containing the
+        centres of a regular (zenith, azimuth) raster
+    """
+    turtle = _turtle(sectors)
+    vertices, faces, sizes = (turtle[k] for k in ('vertices', 'faces', 'sizes'))
+    n = len(vertices)
+    starts = numpy.cumsum(sizes) - sizes
+    following = numpy.arange(1, len(faces) + 1)
+    following[starts + sizes - 1] = starts
+    face_id = numpy.repeat(numpy.arange(len(sizes)), sizes)
+    position = numpy.arange(len(faces)) - starts[face_id]
+
+    start, end = faces, faces[following]
+    edge_normals = _normed(numpy.cross(vertices[start], vertices[end]))
+    inward = numpy.sign((edge_normals * turtle['centers'][face_id]).sum(axis=1))
+    normals = numpy.zeros((len(sizes), sizes.max(), 3))
+    normals[face_id, position] = edge_normals * inward[:, numpy.newaxis]
+
+    keys = start * n + end
+    order = numpy.argsort(keys)
+    twin_keys = end * n + start
+    pos = numpy.minimum(numpy.searchsorted(keys[order], twin_keys),
+                        len(keys) - 1)
+    across = numpy.full((len(sizes), sizes.max()), -1)
+    across[face_id, position] = numpy.where(keys[order][pos] == twin_keys,
+                                            face_id[order][pos], -1)
+
+    z = numpy.radians(numpy.arange(0, 90, resolution) + resolution / 2.)
+    az = numpy.radians(numpy.arange(0, 360, resolution) + resolution / 2.)
+    z, az = numpy.meshgrid(z, az, indexing='ij')
+    cells = numpy.stack((numpy.sin(z) * numpy.cos(az),
+                         numpy.sin(z) * numpy.sin(az), numpy.cos(z)),
+                        axis=-1).reshape(-1, 3)
+    top = numpy.full(len(cells), turtle['centers'][:, 2].argmax())
+    lookup = _walk(cells, top, normals, across, len(sizes))
+    lookup = lookup.reshape(z.shape)
+    for a in (normals, across, lookup):
+        a.flags.writeable = False
+    return normals, across, lookup
+
+
+def turtle_face_index(points, min_faces=46, chunk_size=100000):
+    """ Index of the faces of a turtle mesh containing points
+
+    Args:
+        points: a (..., 3) array of point coordinates, or of directions
+        min_faces (int) : the minimal number of faces for the turtle mesh (see
+        turtle_data)
+        chunk_size (int): the number of points located at once
+
+    Returns:
+        an integer array of face indices, with shape points.shape[:-1]
+
+    Details:
+        Faces are the spherical polygons delimited by the great circles joining
+        their vertices. A first face is read in a 1 degree (zenith, azimuth)
+        lookup raster, then points walk across the edges they lie outside of to
+        the face that contains them, which takes at most a few steps. Points
+        outside the turtle (below, or near, the horizon) are located in a face
+        of its boundary.
+    """
+    sectors = len(turtle_data(min_faces)['sizes'])
+    normals, across, lookup = _turtle_locator(sectors)
+    points = numpy.asarray(points, dtype=float)
+    shape = points.shape[:-1]
+    points = points.reshape(-1, 3)
+    index = numpy.empty(len(points), dtype=int)
+    n_z, n_az = lookup.shape
+    for start in range(0, len(points), chunk_size):
+        chunk = _normed(points[start:start + chunk_size])
+        x, y, z = chunk.T
+        iz = numpy.degrees(numpy.arccos(numpy.clip(z, -1, 1))) * n_z / 90.
+        iaz = numpy.degrees(numpy.arctan2(y, x)) % 360 * n_az / 360.
+        guess = lookup[numpy.minimum(iz.astype(int), n_z - 1),
+                       numpy.minimum(iaz.astype(int), n_az - 1)]
+        index[start:start + chunk_size] = _walk(chunk, guess, normals, across,
+                                                sectors)
+    return index.reshape(shape)
+
+
+class TurtlePyramid(object):
+    """ Turtle meshes of increasing resolution, linked by parent/child sector
+    maps
+
+    Each sector of a level is the child of the sector of the next coarser
+    level that contains its centre (see turtle_face_index). Maps between
+    distant levels compose these one-level maps, so that values summed level
+    by level or at once are the same. Turtle meshes are not nested: children
+    of a sector only approximate its shape, and levels should be coarse enough
+    for every sector to have children.
+
+    Sectors are identified by their index in the turtle mesh of their level,
+    that is in turtle_data(sectors) or turtle_face_centers(sectors).
+    """
+
+    def __init__(self, sectors=(6, 16, 46, 136, 406, 976)):
+        """ Build the pyramid
+
+        Args:
+            sectors: the minimal number of faces of the turtle meshes of
+            each level (see turtle_data)
+        """
+        self.sectors = tuple(sorted(set(len(turtle_data(n)['sizes'])
+                                        for n in sectors)))
+        self._parents = {}
+        for coarse, fine in zip(self.sectors[:-1], self.sectors[1:]):
+            parents = turtle_face_index(turtle_data(fine)['centers'], coarse)
+            if len(numpy.unique(parents)) < coarse:
+                raise ValueError('Some sectors of the ' + str(coarse) +
+                                 ' sectors level have no child in the ' +
+                                 str(fine) + ' sectors level')
+            parents.flags.writeable = False
+            self._parents[fine] = parents
+
+    def __len__(self):
+        return len(self.sectors)
+
+    def __repr__(self):
+        return 'TurtlePyramid(' + str(self.sectors) + ')'
+
+    def _levels(self, sectors, coarse):
+        if sectors not in self.sectors:
+            raise ValueError(str(sectors) + ' is not a level of the pyramid: '
+                             + str(self.sectors))
+        i = self.sectors.index(sectors)
+        if coarse is None:
+            coarse = self.sectors[i - 1]
+        if coarse not in self.sectors[:i]:
+            raise ValueError(str(coarse) + ' is not a coarser level than '
+                             + str(sectors))
+        return self.sectors[self.sectors.index(coarse) + 1:i + 1]
+
+    def solid_angles(self, sectors):
+        """ solid angles (sr) of the sectors of a level"""
+        return turtle_data(sectors)['solid_angles']
+
+    def directions(self, sectors):
+        """ (elevation, azimuth) of the sectors of a level"""
+        return turtle_face_centers(sectors)
+
+    def parents(self, sectors, coarse=None):
+        """ Index of the parent of the sectors of a level
+
+        Args:
+            sectors: the level of the children
+            coarse: the level of the parents. If None (default), the next
+            coarser level
+
+        Returns:
+            a (sectors,) integer array
+        """
+        parents = numpy.arange(sectors)
+        for level in reversed(self._levels(sectors, coarse)):
+            parents = self._parents[level][parents]
+        return parents
+
+    def children(self, sectors, fine=None):
+        """ Children of the sectors of a level
+
+        Args:
+            sectors: the level of the parents
+            fine: the level of the children. If None (default), the next
+            finer level
+
+        Returns:
+            - offsets: a (sectors + 1,) array such that
+            children[offsets[i]:offsets[i + 1]] are the children of sector i
+            - children: the children sectors, grouped by parent
+        """
+        if fine is None:
+            fine = self.sectors[self.sectors.index(sectors) + 1]
+        parents = self.parents(fine, sectors)
+        counts = numpy.bincount(parents, minlength=sectors)
+        offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+        return offsets, numpy.argsort(parents, kind='stable')
+
+    def aggregate(self, values, sectors, coarse=None):
+        """ Sum values of the sectors of a level over the sectors of a coarser
+        level
+
+        Args:
+            values: a (..., sectors) array of additive values (irradiance,
+            light flux, ...). Luminances should be multiplied by solid angles
+            first
+            sectors: the level of values
+            coarse: the level to aggregate to. If None (default), the next
+            coarser level
+
+        Returns:
+            a (..., coarse) array
+        """
+        if coarse is None:
+            coarse = self.sectors[self.sectors.index(sectors) - 1]
+        offsets, children = self.children(coarse, sectors)
+        values = numpy.asarray(values, dtype=float)[..., children]
+        return numpy.add.reduceat(values, offsets[:-1], axis=-1)
+
+    def distribute(self, values, sectors, fine=None):
+        """ Share values of the sectors of a level among their children,
+        proportionally to children solid angles
+
+        Args:
+            values: a (..., sectors) array of additive values
+            sectors: the level of values
+            fine: the level to distribute to. If None (default), the next
+            finer level
+
+        Returns:
+            a (..., fine) array, that aggregates back to values
+        """
+        if fine is None:
+            fine = self.sectors[self.sectors.index(sectors) + 1]
+        parents = self.parents(fine, sectors)
+        weights = self.solid_angles(fine)
+        weights = weights / numpy.bincount(parents, weights)[parents]
+        return numpy.asarray(values, dtype=float)[..., parents] * weights
 
 
 def sample_faces(vertices, faces, iter=2, spheric=False):
@@ -417,19 +1006,170 @@ def sample_faces(vertices, faces, iter=2, spheric=False):
     Returns:
         a list of points or of (theta, phi) tuples and a list of tags
     """
-    tags = list(range(len(faces)))
+    vertices = numpy.asarray(vertices, dtype=float)
+    tags = numpy.arange(len(faces))
     if iter is not None:
-        vertices, faces, tags = star_split(vertices, faces, tags)
+        vertices, faces, tags = _star_split(vertices, faces, tags)
         for i in range(iter):
-            vertices, faces, tags = split_triangles(vertices, faces, tags)
-
-    face_points = [[centroid([vertices[p] for p in face])] for face in faces]
+            vertices, faces, tags = _split_triangles(vertices, faces, tags)
 
-    points = reduce(lambda x, y: x + y, face_points)
-    npt = [len(x) for x in face_points]
-    tags = reduce(lambda x, y: x + y, [[t] * n for t, n in zip(tags, npt)])
+    flat, sizes = _polygons(faces)
+    starts = numpy.cumsum(sizes) - sizes
+    points = numpy.add.reduceat(vertices[flat], starts, axis=0)
+    points /= sizes[:, numpy.newaxis]
     if spheric:
-        points = spherical(points)
+        x, y, z = _normed(points).T
+        points = list(zip(numpy.arccos(z), numpy.arctan2(y, x)))
+    else:
+        points = list(map(tuple, points.tolist()))
+
+    return points, tags.tolist()
 
-    return points, tags
 
+# plastic number, generating the R2 low discrepancy sequence
+_plastic = 1.324717957244746
+
+
+def _unit_square(n_sets, n, method='stratified', seed=0):
+    """ n_sets sets of n (u, v) samples of the unit square
+
+    Args:
+        n_sets (int): the number of sets
+        n (int): the number of samples per set
+        method (str): one of:
+        - 'random': independent uniform samples
+        - 'stratified': latin hypercube samples, stratified along u and v
+        - 'r2': the R2 low discrepancy sequence of Roberts (2018)
+        - 'fibonacci': the Fibonacci lattice, u = (i + 0.5) / n
+        seed: the seed of the random generator used by random and stratified
+        methods
+
+    Returns:
+        u, v (n_sets, n) arrays
+    """
+    i = numpy.arange(n)
+    if method == 'random':
+        rng = numpy.random.default_rng(seed)
+        u, v = rng.random((2, n_sets, n))
+    elif method == 'stratified':
+        rng = numpy.random.default_rng(seed)
+        strata = rng.random((n_sets, n)).argsort(axis=1)
+        u = (strata + rng.random((n_sets, n))) / n
+        v = (i + rng.random((n_sets, n))) / n
+    elif method == 'r2':
+        u = (0.5 + i / _plastic) % 1
+        v = (0.5 + i / _plastic ** 2) % 1
+    elif method == 'fibonacci':
+        u = (i + 0.5) / n
+        v = (i * (math.sqrt(5) - 1) / 2) % 1
+    else:
+        raise ValueError('unknown sampling method: ' + str(method))
+    return numpy.broadcast_to(u, (n_sets, n)), numpy.broadcast_to(v, (n_sets, n))
+
+
+def _arvo(a, b, c, area, u):
+    """ Points of spherical triangles (a, b, c) of a given area, with area
+    coordinate of a and second unit square coordinate u (Arvo, 1995)
+    """
+    # angle at a and length of the (a, b) arc
+    nab = _normed(numpy.cross(a, b))
+    nac = _normed(numpy.cross(a, c))
+    cos_alpha = numpy.clip((nab * nac).sum(axis=1), -1, 1)
+    sin_alpha = numpy.sqrt(1 - cos_alpha ** 2)
+    cos_c = (a * b).sum(axis=1)
+
+    s = numpy.sin(area - numpy.arccos(cos_alpha))
+    t = numpy.cos(area - numpy.arccos(cos_alpha))
+    uu = t - cos_alpha
+    vv = s + sin_alpha * cos_c
+    q = ((vv * t - uu * s) * cos_alpha - vv) / ((vv * s + uu * t) * sin_alpha)
+    q = numpy.clip(q, -1, 1)[:, numpy.newaxis]
+    # c_hat is the third vertex of the sub-triangle of the sampled area
+    ortho = _normed(c - (c * a).sum(axis=1)[:, numpy.newaxis] * a)
+    c_hat = q * a + numpy.sqrt(1 - q ** 2) * ortho
+    z = (1 - u * (1 - (c_hat * b).sum(axis=1)))[:, numpy.newaxis]
+    ortho = _normed(c_hat - (c_hat * b).sum(axis=1)[:, numpy.newaxis] * b)
+    return _normed(z * b + numpy.sqrt(numpy.maximum(0, 1 - z ** 2)) * ortho)
+
+
+def sample_directions(vertices, faces, n=16, method='stratified', seed=0):
+    """Sample directions uniformly within the faces of a spherical polyhedron
+
+    Args:
+        vertices: a (n, 3) array (or list of tuples) of vertex coordinates
+        faces: a list of polygons (vertex indices)
+        n (int): the number of directions per face
+        method (str): the sampling of the unit square mapped onto each face,
+        one of 'random' (independent uniform samples), 'stratified' (latin
+        hypercube), 'r2' (R2 low discrepancy sequence) or 'fibonacci'
+        (Fibonacci lattice)
+        seed: the seed of the random generator used by random and stratified
+        methods
+
+    Returns:
+        - points: (n_faces * n, 3) unit vectors
+        - tags: (n_faces * n,) index of the face of each point
+        - weights: (n_faces * n,) the solid angle (sr) represented by each
+        point, i.e. the face solid angle divided by n
+
+    Details:
+        Faces are the spherical polygons delimited by the great circles joining
+        their vertices. They are fan-triangulated around their centre, and the
+        first coordinate of the unit square samples selects a triangle and an
+        area within it, the second a position along the arc of Arvo (1995)
+        equal-area mapping. Samples are therefore uniformly distributed in
+        solid angle and keep the stratification (or low discrepancy) of the
+        unit square samples.
+    """
+    vertices = _normed(numpy.asarray(vertices, dtype=float))
+    flat, sizes = _polygons(faces)
+    starts = numpy.cumsum(sizes) - sizes
+    centers = numpy.add.reduceat(vertices[flat], starts, axis=0)
+    centers = _normed(centers / sizes[:, numpy.newaxis])
+    following = numpy.arange(1, len(flat) + 1)
+    following[starts + sizes - 1] = starts
+    face_id = numpy.repeat(numpy.arange(len(sizes)), sizes)
+
+    # solid angles of the (center, a, b) triangles of the fans
+    a, b, c = centers[face_id], vertices[flat], vertices[flat[following]]
+    det = numpy.abs((a * numpy.cross(b, c)).sum(axis=1))
+    div = 1 + (a * b).sum(axis=1) + (b * c).sum(axis=1) + (c * a).sum(axis=1)
+    areas = 2 * numpy.arctan2(det, div)
+    cumulated = numpy.cumsum(areas)
+    solid_angles = numpy.add.reduceat(areas, starts)
+
+    u, v = _unit_square(len(sizes), n, method, seed)
+    tags = numpy.repeat(numpy.arange(len(sizes)), n)
+    target = (cumulated[starts] - areas[starts])[tags] + (
+            u.ravel() * solid_angles[tags])
+    triangle = numpy.minimum(numpy.searchsorted(cumulated, target),
+                             starts[tags] + sizes[tags] - 1)
+    area = target - (cumulated - areas)[triangle]
+    points = _arvo(a[triangle], b[triangle], c[triangle], area, v.ravel())
+    return points, tags, solid_angles[tags] / n
+
+
+def sample_hemisphere(n=1000, method='fibonacci', seed=0):
+    """Sample directions uniformly over the Z+ hemisphere
+
+    Args:
+        n (int): the number of directions
+        method (str): the sampling of the unit square, one of 'random',
+        'stratified', 'r2' or 'fibonacci' (see sample_directions)
+        seed: the seed of the random generator used by random and stratified
+        methods
+
+    Returns:
+        - points: (n, 3) unit vectors
+        - weights: (n,) the solid angle (sr) represented by each point
+
+    Details:
+        The unit square is mapped onto the hemisphere with the equal-area
+        (cos(zenith), azimuth) = (1 - u, 2 pi v) mapping.
+    """
+    u, v = _unit_square(1, n, method, seed)
+    z = 1 - u[0]
+    r = numpy.sqrt(1 - z ** 2)
+    phi = 2 * numpy.pi * v[0]
+    points = numpy.stack((r * numpy.cos(phi), r * numpy.sin(phi), z), axis=1)
+    return points, numpy.full(n, 2 * numpy.pi / n)
@@ -1,28 +1,88 @@
 
 import warnings
+import numpy
 from openalea.astk.colormap import jet_colors
 
-display_enable = True
-try:
-    import openalea.plantgl.all as pgl
-except ImportError:
+from openalea.astk._lazy import lazy_module
+
+pgl = lazy_module('openalea.plantgl.all')
+display_enable = bool(pgl)
+if not display_enable:
     warnings.warn('PlantGL not installed: display is not enable!')
-    display_enable = False
 
-def sky_dome(turtle_mesh, sky_sources):
-    vertices, faces = turtle_mesh
+
+def _color_list(colors):
+    """ a pgl Color4Array from a (n, 3) array (or list of tuples) of (r, g, b)
+    colors"""
+    colors = numpy.asarray(colors).astype(int).reshape(-1, 3)
+    return pgl.Color4Array([pgl.Color4(r, g, b, 0) for r, g, b in colors.tolist()])
+
+
+def _index_list(faces):
+    """ indices of faces given as a (m, k) array or a list of polygons"""
+    if isinstance(faces, numpy.ndarray):
+        return faces.tolist()
+    return [list(map(int, face)) for face in faces]
+
+
+def face_set(vertices, faces, colors=None):
+    """A single PlantGL shape of a polyhedron, with one color per face
+
+    Args:
+        vertices: a (n, 3) array (or list of tuples) of vertex coordinates
+        faces: a (m, k) array or a list of vertex indices defining the faces
+        colors: a (m, 3) array (or list of tuples) of (r, g, b) face colors.
+        If None (default), default PlantGL material is used.
+
+    Returns:
+        a pgl shape
+    """
+    points = numpy.asarray(vertices, dtype=float).tolist()
+    if colors is None:
+        return pgl.Shape(pgl.FaceSet(pointList=points, indexList=_index_list(faces)))
+    geometry = pgl.FaceSet(pointList=points, indexList=_index_list(faces), colorList=_color_list(colors),
+                           colorPerVertex=False)
+    return pgl.Shape(geometry)
+
+
+def set_colors(shape, colors):
+    """Update face colors of a shape returned by face_set, without rebuilding its geometry
+
+    Args:
+        shape: a pgl shape, as returned by face_set
+        colors: a (m, 3) array (or list of tuples) of (r, g, b) face colors
+
+    Returns:
+        the shape
+    """
+    shape.geometry.colorList = _color_list(colors)
+    shape.geometry.colorPerVertex = False
+    return shape
+
+
+def sky_dome(turtle_mesh, sky_sources, scene=None):
+    """A PlantGL scene of a turtle mesh coloured by sky sources luminance
+
+    Args:
+        turtle_mesh: a (vertices, faces) tuple, such as returned by astk.icosphere.turtle_mesh
+        sky_sources: a [(elevation, azimuth, luminance), ...] list of sky sources associated to the faces of the mesh
+        scene: a scene previously returned by sky_dome for the same mesh. If given, only its colors are updated
+            (e.g. for animating hourly skies)
+
+    Returns:
+        a pgl scene
+    """
     colors = jet_colors((lum for _,_,lum in sky_sources))
+    if scene is not None:
+        set_colors(scene[0], colors)
+        return scene
+    vertices, faces = turtle_mesh
     scene = pgl.Scene()
-    for i, face in enumerate(faces):
-        vtx = [vertices[v] for v in face]
-        idx = range(len(face))
-        mat = pgl.Material(pgl.Color3(*colors[i]))
-        shape = pgl.Shape(pgl.FaceSet(pointList=vtx, indexList=[idx]), mat)
-        scene += shape
+    scene += face_set(vertices, faces, colors)
     return scene
 
 
-def display(vertices, faces, colors=None, view=True):
+def display(vertices, faces, colors=None, view=True, scene=None):
     """3D display of a polyhedron with PlantGL
 
     Args:
@@ -31,26 +91,21 @@ def display(vertices, faces, colors=None, view=True):
         color: a list of (r,g,b) tuple defining color.
         If None (default), default PlantGL material is used.
         view (bool): should the shape be displayed ?
+        scene: a scene previously returned by display for the same polyhedron. If given, only its colors are updated
 
     Returns:
-        a pgl shape
+        a pgl scene
     """
     global display_enable
     if display_enable:
-        scene = pgl.Scene()
-        if colors is None:
-            shape = pgl.Shape(pgl.FaceSet(pointList=vertices, indexList=faces))
-            scene += shape
+        if scene is not None and colors is not None:
+            set_colors(scene[0], colors)
         else:
-            for i,face in enumerate(faces):
-                vtx = [vertices[v] for v in face]
-                idx = range(len(face))
-                mat = pgl.Material(pgl.Color3(*colors[i]))
-                shape = pgl.Shape(pgl.FaceSet(pointList=vtx, indexList=[idx]), mat)
-                scene += shape
+            scene = pgl.Scene()
+            scene += face_set(vertices, faces, colors)
         if view:
             pgl.Viewer.display(scene)
     else:
         warnings.warn('PlantGL not installed: display is not enable!')
-        shape = None
+        scene = None
     return scene
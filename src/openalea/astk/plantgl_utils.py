@@ -13,7 +13,10 @@
 # ==============================================================================
 
 from __future__ import division
-from openalea.plantgl import all as pgl
+import numpy
+from openalea.astk._lazy import lazy_module
+
+pgl = lazy_module('openalea.plantgl.all')
 #from six.moves import range
 
 def _is_iterable(x):
@@ -24,34 +27,71 @@ def _is_iterable(x):
     return True
 
 
-def get_area_and_normal(scene_geometry):
+def _triangulation_arrays(shape, tesselator):
+    """ (points, triangles) arrays of the triangulation of a shape"""
+    shape.apply(tesselator)
+    mesh = tesselator.triangulation
+    points = numpy.array(mesh.pointList, dtype=float).reshape(-1, 3)
+    triangles = numpy.array(mesh.indexList, dtype=int).reshape(-1, 3)
+    return points, triangles
+
 
-    def _surf(ind,pts):
-        A,B,C = [pts[i] for i in ind]
-        return pgl.norm(pgl.cross(B-A, C-A)) / 2.0
+def triangle_geometry(scene_geometry):
+    """ Areas, normals, centroids and heights of the triangles of objects in the scene
 
-    def _normal(ind,pts):
-        A,B,C = [pts[i] for i in ind]
-        n = pgl.cross(B-A, C-A)
-        return n.normed()
+    Each shape is tesselated once, and its point and index lists are converted
+    to arrays once, so that all triangle properties are computed vectorially.
 
+    Parameters
+    ----------
+    scene_geometry: dict([id, geometry])
+        Dictionnary of geometries (or list of geometries) of objects in the scene.
+
+    Returns
+    -------
+    a {id: {'area': (n,) array, 'normal': (n, 3) array, 'centroid': (n, 3) array,
+    'height': (n,) array}} dict of the n triangles of each object. Unit normals
+    of degenerated triangles are set to zero.
+    """
     tesselator = pgl.Tesselator()
-    areas={}
-    normals={}
-    for vid,shapes in scene_geometry.items():
-        S = []
-        norm = []
+    geometry = {}
+    for vid, shapes in scene_geometry.items():
         if not _is_iterable(shapes):
             shapes = [shapes]
-        for shape in shapes:
-            shape.apply(tesselator)
-            mesh = tesselator.triangulation
-            itri = list(range(mesh.indexListSize()))
-            pts = mesh.pointList
-            S +=[_surf(mesh.indexAt(i),pts) for i in itri]
-            norm += [_normal(mesh.indexAt(i),pts) for i in itri]
-        areas.update({vid:S})
-        normals.update({vid:norm})
+        triangles = [_triangulation_arrays(shape, tesselator) for shape in shapes]
+        if triangles:
+            vertices = numpy.concatenate([pts[tri] for pts, tri in triangles])
+        else:
+            vertices = numpy.zeros((0, 3, 3))
+        A, B, C = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+        n = numpy.cross(B - A, C - A)
+        norm = numpy.linalg.norm(n, axis=1)
+        normal = numpy.zeros_like(n)
+        numpy.divide(n, norm[:, numpy.newaxis], out=normal,
+                     where=norm[:, numpy.newaxis] > 0)
+        centroid = vertices.mean(axis=1)
+        geometry[vid] = {'area': norm / 2.0, 'normal': normal,
+                         'centroid': centroid, 'height': centroid[:, 2]}
+    return geometry
+
+
+def get_area_and_normal(scene_geometry):
+    """ Areas and unit normals of the triangles of objects in the scene
+
+    Parameters
+    ----------
+    scene_geometry: dict([id, geometry])
+        Dictionnary of geometries of objects in the scene.
+
+    Returns
+    -------
+    a tuple of ({id: [area, ...]}, {id: [normal, ...]}) dict, with normals
+    given as pgl Vector3
+    """
+    geometry = triangle_geometry(scene_geometry)
+    areas = {vid: g['area'].tolist() for vid, g in geometry.items()}
+    normals = {vid: [pgl.Vector3(*n) for n in g['normal'].tolist()]
+               for vid, g in geometry.items()}
     return areas, normals
 
 def get_height(scene_geometry):
@@ -66,20 +106,8 @@ def get_height(scene_geometry):
     scene_geometry: dict([id, geometry])
         Dictionnary of geometries of objects in the scene.
     """
-    heights = {}
-    tesselator = pgl.Tesselator()
-    for vid,shapes in scene_geometry.items():
-        S = []
-        H = []
-        if not _is_iterable(shapes):
-            shapes = [shapes]
-        for shape in shapes:
-            shape.apply(tesselator)
-            mesh = tesselator.triangulation
-            itri = list(range(mesh.indexListSize()))
-            H += [mesh.faceCenter(i)[2] for i in itri]
-        heights.update({vid:H})
-    return heights
+    geometry = triangle_geometry(scene_geometry)
+    return {vid: g['height'].tolist() for vid, g in geometry.items()}
  
 def get_lai(scene_geometry, domain_area = 1.0):
     """ compute LAI of all objects in scene
@@ -90,8 +118,8 @@ def get_lai(scene_geometry, domain_area = 1.0):
         Dictionnary of geometries of objects in the scene.
     domain_area: area (expressed in same units as scene objects) of soil occupied by plants in the scene
     """
-    area,_ = get_area_and_normal(scene_geometry)
-    Stot = sum([sum(s) for s in area.itervalues()])
+    geometry = triangle_geometry(scene_geometry)
+    Stot = sum([g['area'].sum() for g in geometry.values()])
     return Stot / domain_area
     
 def as_tuples(pgl_3List, offset=0):
@@ -21,25 +21,21 @@ irradiances packages.
 """
 
 import numpy
-import pandas
 import warnings
 
-try:
-    import pvlib
-except ImportError:
+from openalea.astk.sun_position import (
+    sun_position,
+    sun_extraradiation
+)
+from openalea.astk.decomposition import decompose
+from openalea.astk.timeseries import time_weights, datetime_index
+from openalea.astk._lazy import lazy_module
+
+pandas = lazy_module('pandas')
+pvlib = lazy_module('pvlib')
+if not pvlib:
     warnings.warn('pvlib not installed: using pure python, but less accurate, functions')
 
-if pvlib:
-    from openalea.astk.sun_position import (
-        sun_position, 
-        sun_extraradiation
-    )
-else:
-    from openalea.astk.sun_position_astk import (
-        sun_position, 
-        sun_extraradiation,
-    )
-
 # default location and dates
 _daydate = '2000-06-21'
 _timezone = 'Europe/Paris'
@@ -185,18 +181,26 @@ def micromol_per_joule(dates, ghi, sun_elevation, temp_dew=None):
 
 def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
                           latitude=_latitude, altitude=_altitude,
-                          timezone=_timezone, with_pvlib=True):
+                          timezone=_timezone, with_pvlib=True,
+                          interval_mean=False, label='left'):
     """ Estimate component of sky irradiance for clear sky conditions
 
     Args:
         dates: A pandas datetime index (as generated by pandas.date_range). If
-            None, daydate is used.
+            None, daydate is used. Epoch dates (UTC epoch seconds or numpy
+            datetime64, see timeseries.utc_epoch) are also accepted, and index
+            the output.
         daydate: (str) yyyy-mm-dd (not used if dates is not None).
         longitude: (float) in degrees
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
         with_pvlib : Should we use pvlib library to estimate clearsky ?
+        interval_mean: (bool) if True, dates label time intervals (e.g. hourly
+         means) and the sun position is the interval mean position (see
+         sun_position.sun_position)
+        label: (str) 'left' if dates label the start of their time interval,
+         'right' if they label its end (only used if interval_mean is True)
 
     Returns:
         a pandas dataframe with global horizontal irradiance, direct normal
@@ -218,13 +222,14 @@ def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
                     longitude=longitude,
                     altitude=altitude,
                     timezone=timezone)
-    df = sun_position(dates=dates, daydate=daydate, **location)
+    df = sun_position(dates=dates, daydate=daydate, interval_mean=interval_mean,
+                      label=label, **location)
     am = air_mass(df['zenith'], altitude, with_pvlib=with_pvlib)
     dni_extra = sun_extraradiation(df.index)
 
     if pvlib and with_pvlib:
-        tl = pvlib.clearsky.lookup_linke_turbidity(df.index, latitude,
-                                                   longitude)
+        tl = pvlib.clearsky.lookup_linke_turbidity(datetime_index(df.index),
+                                                   latitude, longitude).values
 
         clearsky = pvlib.clearsky.ineichen(df['zenith'], am, tl,
                                            dni_extra=dni_extra,
@@ -244,13 +249,16 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
                            attenuation=None,
                            pressure=101325, temp_dew=None, longitude=_longitude,
                            latitude=_latitude, altitude=_altitude,
-                           timezone=_timezone, with_pvlib=True):
+                           timezone=_timezone, with_pvlib=True, model=None,
+                           interval_mean=False, label='left'):
     """ Estimate component of sky irradiances from measured actual global
     horizontal irradiance or attenuated clearsky conditions.
 
     Args:
         dates: A pandas datetime index (as generated by pandas.date_range). If
-            None, daydate is used.
+            None, daydate is used. Epoch dates (UTC epoch seconds or numpy
+            datetime64, see timeseries.utc_epoch) are also accepted, and index
+            the output.
         daydate: (str) yyyy-mm-dd (not used if dates is not None).
         ghi: (array_like) : global horizontal irradiance (W. m-2).If None
          (default) clear_sky irradiance are used
@@ -263,13 +271,19 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
         with_pvlib : Should we use pvlib library to estimate sky irradiances ?
+        model: (str) the name of a decomposition model of astk.decomposition ('spitters', 'erbs', 'disc' or 'dirint')
+         used to split ghi into dhi and dni. If None (default), pvlib 'dirint' is used if with_pvlib is True and
+         'spitters' otherwise.
+        interval_mean, label: see clear_sky_irradiances
 
     Returns:
         a pandas dataframe with global horizontal irradiance, direct normal
         irradiance and diffuse horizontal irradiance.
 
     Details:
-        if with_pvlib is True, the 'dirint' model of Perez (1992) is used, otherwise the model of Spitters (1986) is used
+        if model is None and with_pvlib is True, the 'dirint' model of Perez (1992) is used, otherwise the model
+        of Spitters (1986) is used. Named models are computed with the pure numpy implementations of
+        astk.decomposition, that do not require pvlib.
 
         Perez, R., P. Ineichen, E. Maxwell, R. Seals and A. Zelenka, (1992). "Dynamic Global-to-Direct Irradiance
          Conversion Models", ASHRAE Transactions-Research Series, pp. 354-369
@@ -282,10 +296,11 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
                     longitude=longitude,
                     altitude=altitude,
                     timezone=timezone)
-    df = sun_position(dates=dates, daydate=daydate, **location)
+    intervals = dict(interval_mean=interval_mean, label=label)
+    df = sun_position(dates=dates, daydate=daydate, **intervals, **location)
 
     if ghi is None:
-        cs = clear_sky_irradiances(dates=df.index, **location, with_pvlib=with_pvlib)
+        cs = clear_sky_irradiances(dates=df.index, **location, with_pvlib=with_pvlib, **intervals)
         ghi = cs['ghi']
 
     df['ghi'] = ghi
@@ -293,25 +308,19 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
     if attenuation is not None:
         df.ghi *= attenuation
 
-    if pvlib and with_pvlib:
-        df['dni'] = pvlib.irradiance.dirint(df.ghi, 90 - df.elevation, df.index,
-                                            pressure=pressure, temp_dew=temp_dew)
+    if model is None and pvlib and with_pvlib:
+        df['dni'] = numpy.asarray(
+            pvlib.irradiance.dirint(df.ghi.values, 90 - df.elevation.values,
+                                    datetime_index(df.index),
+                                    pressure=pressure, temp_dew=temp_dew))
         df['dhi'] = df.ghi - horizontal_irradiance(df.dni, df.elevation)
     else:
-        Io = sun_extraradiation(df.index)
-        costheta = numpy.sin(numpy.radians(df.elevation))
-        So = Io * costheta
-        RsRso = df.ghi / So
-        R = 0.847 - 1.61 * costheta + 1.04 * costheta * costheta
-        K = (1.47 - R) / 1.66
-        RdRs = numpy.where(RsRso <= 0.22, 1,
-                           numpy.where(RsRso <= 0.35,
-                                       1 - 6.4 * (RsRso - 0.22) ** 2,
-                                       numpy.where(RsRso <= K,
-                                                   1.47 - 1.66 * RsRso,
-                                                   R)))
-        df['dhi'] = df.ghi * RdRs
-        df['dni'] = directional_luminance(df['ghi'] - df['dhi'], df['elevation'])
+        if model is None:
+            model = 'spitters'
+        irr = decompose(df.ghi, 90 - df.elevation, df.index, model=model,
+                        pressure=pressure, temp_dew=temp_dew)
+        df['dhi'] = irr['dhi']
+        df['dni'] = irr['dni']
 
     return df.loc[:, ('ghi', 'dhi', 'dni')]
 
@@ -321,12 +330,15 @@ def sky_irradiance(dates=None, ghi=None, dhi=None, ppfd=None,
                    attenuation=None,
                    pressure=101325, temp_dew=None, longitude=_longitude,
                    latitude=_latitude, altitude=_altitude,
-                   timezone=_timezone, with_pvlib=True):
+                   timezone=_timezone, with_pvlib=True, model=None,
+                   interval_mean=False, label='left'):
     """ Estimate variables related to sky irradiance.
 
     Args:
         dates: A pandas datetime index (as generated by pandas.date_range). If
-            None, daydate is used.
+            None, daydate is used. Epoch dates (UTC epoch seconds or numpy
+            datetime64, see timeseries.utc_epoch) are also accepted, and index
+            the output.
         ghi: (array_like) : global horizontal irradiance (W. m-2).If None
          (default) clear_sky irradiance are used
         dhi: (array-like): diffuse horizontal irradiance
@@ -345,6 +357,12 @@ def sky_irradiance(dates=None, ghi=None, dhi=None, ppfd=None,
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
         with_pvlib : Should we use pvlib library to estimate sky irradiances ?
+        model: (str) the decomposition model used to estimate dhi and dni from ghi (see actual_sky_irradiances)
+        interval_mean: (bool) if True, dates label time intervals (e.g. hourly
+         means) and sun positions are interval mean positions, used for the
+         decomposition of ghi and returned (see sun_position.sun_position)
+        label: (str) 'left' if dates label the start of their time interval,
+         'right' if they label its end (only used if interval_mean is True)
 
     Returns:
         a pandas dataframe with azimuth, zenital and elevation angle of the sun, global horizontal irradiance, direct
@@ -355,10 +373,11 @@ def sky_irradiance(dates=None, ghi=None, dhi=None, ppfd=None,
                     longitude=longitude,
                     altitude=altitude,
                     timezone=timezone)
-    df = sun_position(dates=dates, daydate=daydate, **location)
+    intervals = dict(interval_mean=interval_mean, label=label)
+    df = sun_position(dates=dates, daydate=daydate, **intervals, **location)
     if len(df) < 1:  # night
         if ghi is not None:  # twilight conditions (sun_el < 0, ghi > 0)
-            df = sun_position(dates=dates, daydate=daydate, filter_night=False, **location)
+            df = sun_position(dates=dates, daydate=daydate, filter_night=False, **intervals, **location)
             df['ghi'] = ghi
             df['dhi'] = ghi
             df['dni'] = 0
@@ -369,13 +388,14 @@ def sky_irradiance(dates=None, ghi=None, dhi=None, ppfd=None,
             df['dni'] = 0
     else:   # day
         if dates is None and day_ghi is not None:
-            cs = clear_sky_irradiances(daydate=daydate, with_pvlib=with_pvlib, **location)
-            mj_cs = cs.ghi.sum() * 3600 / 1e6
+            cs = clear_sky_irradiances(daydate=daydate, with_pvlib=with_pvlib, **intervals, **location)
+            mj_cs = (cs.ghi * time_weights(cs.index)).sum() / 1e6
             ghi = cs.ghi * day_ghi / mj_cs
         if ghi is None or dhi is None:
             irr = actual_sky_irradiances(dates=df.index, ghi=ghi,
                                          attenuation=attenuation, pressure=pressure,
-                                         temp_dew=temp_dew, with_pvlib=with_pvlib, **location)
+                                         temp_dew=temp_dew, with_pvlib=with_pvlib, model=model,
+                                         **intervals, **location)
             df = pandas.concat([df, irr], axis=1)
         else:
             df['ghi'] = ghi
@@ -20,7 +20,14 @@ from openalea.astk.sky_irradiance import (
     f_clear_sky,
     all_weather_sky_brightness
 )
-from openalea.astk.sky_map import ksi_grid, scale_sky, sky_ni, sky_lum
+from openalea.astk.sky_map import ksi_grid, scale_sky, sky_hi, sky_ni, sky_lum
+from openalea.astk.timeseries import time_weights
+
+
+def _per_sky(x):
+    """reshape (time series of) sky parameters to broadcast against (T, n_z, n_az) sky arrays"""
+    x = numpy.asarray(x)
+    return x.reshape(x.shape + (1, 1))
 
 
 def cie_luminance_gradation(z, a=4, b=-0.7):
@@ -69,6 +76,8 @@ def cie_relative_luminance(sky_zenith=None, grid=None, sun_zenith=None,
     sun_azimuth: azimuth angle of the sun (deg)
     type is one of 'soc' (standard overcast sky), 'uoc' (uniform radiance)
     or 'clear_sky' (standard clear sky low turbidity)
+    If sun_zenith and sun_azimuth are arrays of T sun positions, a (T, n_z, n_az)
+    array is returned.
     """
 
     if sky_zenith is None and grid is None:
@@ -93,7 +102,7 @@ def cie_relative_luminance(sky_zenith=None, grid=None, sun_zenith=None,
     indicatrix = 1
     if type == 'clear_sky':
         cde = {'c': 10, 'd': -3, 'e': 0.45}
-        ksi_sun = sun_zenith
+        ksi_sun = _per_sky(sun_zenith)
         ksi = ksi_grid(grid, sun_zenith, sun_azimuth)
         indicatrix = cie_scattering_indicatrix(ksi, ksi_sun=ksi_sun, **cde)
 
@@ -107,6 +116,7 @@ def all_weather_abcde(sun_zenith, clearness, brightness):
         sun_zenith: zenith angle of the sun (deg)
         clearness: sky clearness as defined in Perez et al. (1993
         brightness: sky brightness as defined in Perez et al. (1993)
+        All arguments may be scalars or arrays of same shape
 
     Returns:
         a tuple of 5 parameters to be used by CIE sky luminance functions
@@ -116,11 +126,11 @@ def all_weather_abcde(sun_zenith, clearness, brightness):
         validation", Solar Energy, Volume 50, Issue 3, 1993, Pages 235-245,
     """
 
-    def _awfit(p1, p2, p3, p4, zen, br):
-        p1 = numpy.array(p1)
-        p2 = numpy.array(p2)
-        p3 = numpy.array(p3)
-        p4 = numpy.array(p4)
+    def _awfit(p1, p2, p3, p4, zen, br, index):
+        p1 = numpy.array(p1)[index]
+        p2 = numpy.array(p2)[index]
+        p3 = numpy.array(p3)[index]
+        p4 = numpy.array(p4)[index]
         return p1 + p2 * zen + br * (p3 + p4 * zen)
 
     bins = [1, 1.065, 1.23, 1.5, 1.95, 2.8, 4.5, 6.2]
@@ -147,19 +157,18 @@ def all_weather_abcde(sun_zenith, clearness, brightness):
     e3 = (-0.5718, -0.2190, 0.4199, -0.0876, -0.0656, 0.3017, -2.4517, 1.8564)
     e4 = (0.9938, -0.4285, -0.5562, -0.0329, -0.1294, -0.4844, 1.4656, 0.5636)
 
-    index = max(0, numpy.searchsorted(bins, clearness) - 1)
+    index = numpy.maximum(0, numpy.searchsorted(bins, clearness) - 1)
     z = numpy.radians(sun_zenith)
-    a = _awfit(a1, a2, a3, a4, z, brightness)[index]
-    b = _awfit(b1, b2, b3, b4, z, brightness)[index]
-    c = _awfit(c1, c2, c3, c4, z, brightness)[index]
-    d = _awfit(d1, d2, d3, d4, z, brightness)[index]
-    e = _awfit(e1, e2, e3, e4, z, brightness)[index]
-
-    if clearness <= 1.065:
-        c = numpy.exp(numpy.power(brightness * (c1[0] + c2[0] * z), c3[0])) - \
-            c4[0]
-        d = -numpy.exp(brightness * (d1[0] + d2[0] * z)) + d3[0] + d4[
-                                                                       0] * brightness
+    a = _awfit(a1, a2, a3, a4, z, brightness, index)
+    b = _awfit(b1, b2, b3, b4, z, brightness, index)
+    c = _awfit(c1, c2, c3, c4, z, brightness, index)
+    d = _awfit(d1, d2, d3, d4, z, brightness, index)
+    e = _awfit(e1, e2, e3, e4, z, brightness, index)
+
+    overcast = numpy.asarray(clearness) <= 1.065
+    if numpy.any(overcast):
+        c = numpy.where(overcast, numpy.exp(numpy.power(brightness * (c1[0] + c2[0] * z), c3[0])) - c4[0], c)
+        d = numpy.where(overcast, -numpy.exp(brightness * (d1[0] + d2[0] * z)) + d3[0] + d4[0] * brightness, d)
 
     return a, b, c, d, e
 
@@ -174,16 +183,17 @@ def all_weather_relative_luminance(grid, sun_zenith, sun_azimuth, clearness, bri
         sun_azimuth: azimuth angle of the sun (deg)
         clearness: sky clearness as defined in Perez et al. (1993
         brightness: sky brightness as defined in Perez et al. (1993)
+        If sun position, clearness and brightness are arrays of T values, a (T, n_z, n_az) array is returned
 
         Details:
             R. Perez, R. Seals, J. Michalsky, "All-weather model for sky luminance distribution—Preliminary configuration and
             validation", Solar Energy, Volume 50, Issue 3, 1993, Pages 235-245,
 
     """
-    a, b, c, d, e = all_weather_abcde(sun_zenith, clearness, brightness)
+    a, b, c, d, e = map(_per_sky, all_weather_abcde(sun_zenith, clearness, brightness))
     _, sky_zenith, _ = grid
     gradation = cie_luminance_gradation(sky_zenith, a=a, b=b)
-    ksi_sun = sun_zenith
+    ksi_sun = _per_sky(sun_zenith)
     ksi = ksi_grid(grid, sun_zenith, sun_azimuth)
     indicatrix = cie_scattering_indicatrix(ksi, ksi_sun=ksi_sun, c=c, d=d, e=e)
 
@@ -197,11 +207,13 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
         grid: a (azimuth, zenith, az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
         sky_type (str): sky type (see details below), one of ('soc', 'uoc', 'clear_sky', 'sun_soc', 'blended', 'all_weather').
         sky_irradiance: a datetime indexed dataframe specifying sky irradiances for the period , such as returned by
-            astk.meteorology.sky_irradiance.sky_irradiance. Needed for all sky_types except 'uoc' and 'soc'
+            astk.meteorology.sky_irradiance.sky_irradiance. Needed for all sky_types except 'uoc' and 'soc'.
+            Time steps may be irregular: each row is weighted by the duration of its time interval (see
+            astk.timeseries.time_weights)
         scale (str): How should sun/sky luminance be scaled ? If None (default) luminance are scaled so that sun+sky
             horizontal irradiance equals one. Other options are:
-            - 'ghi': sun+sky horizontal flux equals mean ghi (W.m-2.s-1)
-            - 'ppfd' : sun+sky horizontal flux equals mean PPFD (micromolPAR.m-2.s-1)
+            - 'ghi': sun+sky horizontal flux equals time-averaged ghi (W.m-2.s-1)
+            - 'ppfd' : sun+sky horizontal flux equals time-averaged PPFD (micromolPAR.m-2.s-1)
             - 'global': sun+sky horizontal flux equals time-integrated global irradiance (MJ.m-2)
             - 'par': sun+sky horizontal flux equals time-integrated PPFD (molPAR.m-2)
         sun_in_sky: Should the sun be added to the sky ? If True, sky luminance is set to sun luminance in the sun region,
@@ -246,13 +258,14 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
             return [], sky
     else:
         sky = numpy.zeros_like(grid[0])
+        weights = time_weights(sky_irradiance.index)
         if sun_in_sky:
-            hi_sum = sky_irradiance.ghi.sum()
+            hi_sum = (sky_irradiance.ghi * weights).sum()
         else:
-            hi_sum = sky_irradiance.dhi.sum()
+            hi_sum = (sky_irradiance.dhi * weights).sum()
         if sky_type in ('blended', 'sun_soc'):
             soc = scale_sky(grid, cie_relative_luminance(grid=grid, type='soc'))
-        for row in sky_irradiance.itertuples():
+        for row, weight in zip(sky_irradiance.itertuples(), weights):
             if sky_type in ('clear_sky', 'blended'):
                 cs = scale_sky(grid,
                                cie_relative_luminance(grid=grid,
@@ -281,16 +294,16 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
 
 
             if row.dni > 0:
-                sun.append((90 - row.zenith, row.azimuth, row.dni))
+                sun.append((90 - row.zenith, row.azimuth, row.dni * weight))
 
             if sun_in_sky:
                 ksi_sun = ksi_grid(grid, sun_zenith=row.zenith, sun_azimuth=row.azimuth)
                 sun_index = numpy.unravel_index(numpy.argmin(ksi_sun), ksi_sun.shape)
                 _lum = sky_ni(grid, scale_sky(grid, _lum, row.dhi))
                 _lum[sun_index] = max(row.dni, _lum[sun_index])
-                _lum = scale_sky(grid, sky_lum(grid, _lum), row.ghi / hi_sum)
+                _lum = scale_sky(grid, sky_lum(grid, _lum), row.ghi * weight / hi_sum)
             else:
-                _lum *= row.dhi / hi_sum
+                _lum *= row.dhi * weight / hi_sum
             sky += _lum
 
     sky = scale_sky(grid, sky)
@@ -298,18 +311,20 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
     if sky_type == 'clear_sky' or sun_in_sky:
         sun = []
     sc = 1
+    if sky_irradiance is not None:
+        weights = time_weights(sky_irradiance.index)
     if scale is None:
         pass
     elif sky_irradiance is None:
         raise ValueError('Cannot compute scaling to ' + scale + ' without sky_irradiance')
     elif scale == 'ghi':
-        sc = sky_irradiance.ghi.mean()
+        sc = numpy.average(sky_irradiance.ghi, weights=weights)
     elif scale == 'ppfd':
-        sc = sky_irradiance.ppfd.mean()
+        sc = numpy.average(sky_irradiance.ppfd, weights=weights)
     elif scale == 'global':
-        sc = sky_irradiance.ghi.sum() * 3600 / 1e6
+        sc = (sky_irradiance.ghi * weights).sum() / 1e6
     elif scale == 'par':
-        sc = sky_irradiance.ppfd.sum() * 3600 / 1e6
+        sc = (sky_irradiance.ppfd * weights).sum() / 1e6
     else:
         raise ValueError('undefined scale: ' + scale + '. Should be None or one of ghi, ppfd, global or par')
 
@@ -317,9 +332,10 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
     if len(sun) > 0:
         sun_el, sun_az, sun_lum = list(map(numpy.array, zip(*sun)))
         sun_hi = sum(horizontal_irradiance(sun_lum, sun_el))
+        ghi_sum = (sky_irradiance.ghi * weights).sum()
         sun_lum /= sun_hi
-        sun_lum *= sun_hi / sky_irradiance.ghi.sum()
-        sky *= (1 - sun_hi / sky_irradiance.ghi.sum())
+        sun_lum *= sun_hi / ghi_sum
+        sky *= (1 - sun_hi / ghi_sum)
         sun_lum *= sc
         sun = list(zip(sun_el, sun_az, sun_lum))
     sky *= sc
@@ -327,4 +343,83 @@ def sky_luminance(grid, sky_type='soc', sky_irradiance=None, scale=None, sun_in_
     return sun, sky
 
 
+def _scale_sky_series(grid, luminance, irradiance):
+    """Rescale a (T, n_z, n_az) series of sky luminance to horizontal irradiances"""
+    hi = sky_hi(grid, luminance)
+    total = hi.sum(axis=(1, 2))
+    ratio = numpy.divide(irradiance, total, out=numpy.zeros_like(total), where=total > 0)
+    return luminance * _per_sky(ratio)
+
+
+def sky_luminance_series(grid, sky_type='soc', sky_irradiance=None, sun_in_sky=False):
+    """Time-resolved sun and sky luminance as a function of sky type and sky_irradiance
 
+    Args:
+        grid: a (azimuth, zenith, az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
+        sky_type (str): sky type, one of ('soc', 'uoc', 'clear_sky', 'sun_soc', 'blended', 'all_weather'),
+            see sky_luminance.
+        sky_irradiance: a datetime indexed dataframe specifying sky irradiances at T time steps, such as returned
+            by astk.meteorology.sky_irradiance.sky_irradiance.
+        sun_in_sky: Should the sun be added to the sky ? If True, sky luminance is set to sun luminance in the sun region,
+            and sun luminance is set to zero. Ignored for sky types 'uoc' and 'soc'.
+
+    Returns:
+        sun, sky : a (T, 3) array of (sun_elevation, sun_azimuth, sun_luminance) and a (T, n_z, n_az) array of sky
+            luminance, one per time step.
+
+    Details:
+        Unlike sky_luminance, time steps are not accumulated: the luminances of a time step are the actual
+        irradiances of that time step (W.m-2), the sun luminance being the direct normal irradiance and the sky
+        horizontal irradiance being the diffuse horizontal irradiance. Sky types without sun ('soc', 'uoc' and
+        'clear_sky') and sun_in_sky skies carry the global horizontal irradiance, and their sun luminance is zero.
+        All time steps are evaluated at once: memory scales with T * n_z * n_az, and long series should be split
+        in chunks (see astk.sky_sources.iter_sky_sources).
+    """
+    if sky_irradiance is None:
+        raise ValueError('sky_irradiance is required for time-resolved sky luminance')
+
+    _, sky_zenith, _ = grid
+    zenith = sky_irradiance.zenith.values
+    azimuth = sky_irradiance.azimuth.values
+    dni = sky_irradiance.dni.values
+    dhi = sky_irradiance.dhi.values
+    ghi = sky_irradiance.ghi.values
+    shape = (len(zenith),) + sky_zenith.shape
+
+    if sky_type in ('soc', 'uoc', 'sun_soc'):
+        cie_type = 'soc' if sky_type == 'sun_soc' else sky_type
+        lum = numpy.broadcast_to(cie_relative_luminance(grid=grid, type=cie_type), shape)
+    elif sky_type == 'clear_sky':
+        lum = cie_relative_luminance(grid=grid, sun_zenith=zenith, sun_azimuth=azimuth, type='clear_sky')
+    elif sky_type == 'blended':
+        ones = numpy.ones(len(zenith))
+        cs = _scale_sky_series(grid, cie_relative_luminance(grid=grid, sun_zenith=zenith, sun_azimuth=azimuth,
+                                                            type='clear_sky'), ones)
+        soc = _scale_sky_series(grid, numpy.broadcast_to(cie_relative_luminance(grid=grid, type='soc'), shape), ones)
+        f_clear = _per_sky(f_clear_sky(all_weather_sky_clearness(dni, dhi, zenith)))
+        lum = f_clear * cs + (1 - f_clear) * soc
+    elif sky_type == 'all_weather':
+        brightness = numpy.asarray(all_weather_sky_brightness(sky_irradiance.index, dhi, zenith))
+        clearness = all_weather_sky_clearness(dni, dhi, zenith)
+        lum = all_weather_relative_luminance(grid, sun_zenith=zenith, sun_azimuth=azimuth, brightness=brightness,
+                                             clearness=clearness)
+    else:
+        raise ValueError('undefined sky type: ' + sky_type)
+
+    sun_lum = numpy.array(dni, dtype=float)
+    if sky_type in ('soc', 'uoc') or (sky_type == 'clear_sky' and not sun_in_sky):
+        sky = _scale_sky_series(grid, lum, ghi)
+        sun_lum[:] = 0
+    elif sun_in_sky:
+        ni = sky_ni(grid, _scale_sky_series(grid, lum, dhi)).reshape(len(zenith), -1)
+        ksi_sun = ksi_grid(grid, sun_zenith=zenith, sun_azimuth=azimuth).reshape(len(zenith), -1)
+        steps = numpy.arange(len(zenith))
+        sun_cell = numpy.argmin(ksi_sun, axis=1)
+        ni[steps, sun_cell] = numpy.maximum(dni, ni[steps, sun_cell])
+        sky = _scale_sky_series(grid, sky_lum(grid, ni.reshape(shape)), ghi)
+        sun_lum[:] = 0
+    else:
+        sky = _scale_sky_series(grid, lum, dhi)
+
+    sun = numpy.stack((90 - zenith, azimuth, sun_lum), axis=1)
+    return sun, sky
@@ -15,7 +15,10 @@
 """Creation, aggregation and plotting of sky maps
 """
 import numpy
-from matplotlib import pyplot as plt
+
+from openalea.astk._lazy import lazy_module
+
+plt = lazy_module('matplotlib.pyplot')
 
 
 def sky_grid(d_az=1, d_z=1, n_az=None, n_z=None):
@@ -115,24 +118,26 @@ def scale_sky(grid, luminance, irradiance=1):
 
 
 def closest_point(point_grid, point_list):
-    dists = [numpy.sum((point_grid - p)**2, axis=2) for p in point_list]
-    return numpy.argmin(numpy.stack(dists, axis=2), axis=2)
+    # running minimum, to avoid stacking one distance grid per point
+    best = numpy.full(point_grid.shape[:2], numpy.inf)
+    closest = numpy.zeros(point_grid.shape[:2], dtype=int)
+    for i, p in enumerate(point_list):
+        dists = numpy.sum((point_grid - p)**2, axis=2)
+        closer = dists < best
+        best[closer] = dists[closer]
+        closest[closer] = i
+    return closest
 
 
-def sky_map(grid, luminance, new_directions, force_hi=False):
-    """Aggregate luminance for a given new set of directions
+def sky_targets(grid, new_directions):
+    """Index of the closest new direction of all cells of a sky grid
 
     Args:
         grid: a (az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
-        luminance : sky luminance gridded array describing distribution of luminance over the sky hemisphere
         new_directions : a [(elevation, azimuth),..] list of tuples defining directions of the aggregated sky
-        force_hi: if True, aggregated luminance are rescaled to force conservation of global horizontal irradiance.
-            If False (default), no rescaled is applied
 
     Returns:
-        luminance_agg: luminance aggregated along new directions
-        grid_agg: a (azimuth, zenith, sr) tuple describing the aggregated directions and the associated steradians
-        luminance_agg_sky: sky aggregated luminance projected on the original sky grid
+        an integer gridded array
     """
     az, z, sr = grid
 
@@ -145,14 +150,33 @@ def sky_map(grid, luminance, new_directions, force_hi=False):
 
     grid_points = numpy.stack(_polar(az, z), axis=2)
     target_points = numpy.array([_polar(a, 90 - el) for el, a in new_directions])
-    targets = closest_point(grid_points, target_points)
+    return closest_point(grid_points, target_points)
+
+
+def sky_map(grid, luminance, new_directions, force_hi=False, targets=None):
+    """Aggregate luminance for a given new set of directions
+
+    Args:
+        grid: a (az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
+        luminance : sky luminance gridded array describing distribution of luminance over the sky hemisphere
+        new_directions : a [(elevation, azimuth),..] list of tuples defining directions of the aggregated sky
+        force_hi: if True, aggregated luminance are rescaled to force conservation of global horizontal irradiance.
+            If False (default), no rescaled is applied
+        targets: the sky_targets of grid and new_directions, if already known
+
+    Returns:
+        luminance_agg: luminance aggregated along new directions
+        grid_agg: a (azimuth, zenith, sr) tuple describing the aggregated directions and the associated steradians
+        luminance_agg_sky: sky aggregated luminance projected on the original sky grid
+    """
+    az, z, sr = grid
+    if targets is None:
+        targets = sky_targets(grid, new_directions)
     light_flux = luminance * sr
     light_flux_agg = numpy.bincount(targets.flatten(), weights=light_flux.flatten())
     sr_agg = numpy.bincount(targets.flatten(), weights=sr.flatten())
     luminance_agg = light_flux_agg / sr_agg
-    new_luminance = numpy.zeros_like(luminance)
-    for i, w in enumerate(luminance_agg):
-        new_luminance[targets == i] = w
+    new_luminance = luminance_agg[targets]
 
     el_agg, az_agg = list(map(numpy.array, zip(*new_directions)))
     grid_agg = (az_agg, 90 - el_agg, sr_agg)
@@ -160,30 +184,89 @@ def sky_map(grid, luminance, new_directions, force_hi=False):
     if force_hi:
         hi = sky_hi(grid, luminance)
         luminance_agg = scale_sky(grid_agg, luminance_agg, hi.sum())
-        for i, w in enumerate(luminance_agg):
-            new_luminance[targets == i] = w
+        new_luminance = luminance_agg[targets]
 
     return luminance_agg, grid_agg, new_luminance
 
 
+def sky_map_series(grid, luminance, new_directions, force_hi=False, targets=None):
+    """Aggregate a time series of sky luminance for a given new set of directions
+
+    Args:
+        grid: a (az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
+        luminance : a (T, n_z, n_az) array of gridded sky luminances, one per time step
+        new_directions : a [(elevation, azimuth),..] list of tuples defining directions of the aggregated sky
+        force_hi: if True, aggregated luminance are rescaled to force conservation of global horizontal irradiance
+            at each time step. If False (default), no rescaled is applied
+        targets: the sky_targets of grid and new_directions, if already known
+
+    Returns:
+        luminance_agg: a (T, n_directions) array of luminance aggregated along new directions. Directions that are
+            the closest direction of no sky cell get a null luminance (and a null solid angle in grid_agg)
+        grid_agg: a (azimuth, zenith, sr) tuple describing the aggregated directions and the associated steradians
+
+    Details:
+        The sky cells closest to each new direction are located once, and
+        the light flux of all time steps is summed over them in a single pass.
+        Each time step is aggregated as by sky_map.
+    """
+    az, z, sr = grid
+    luminance = numpy.asarray(luminance, dtype=float)
+    n_steps = len(luminance)
+    if targets is None:
+        targets = sky_targets(grid, new_directions)
+    targets = targets.ravel()
+    n = len(new_directions)
+    counts = numpy.bincount(targets, minlength=n)
+    filled = counts > 0
+    starts = (numpy.cumsum(counts) - counts)[filled]
+    order = numpy.argsort(targets, kind='stable')
+    light_flux = (luminance * sr).reshape(n_steps, -1)[:, order]
+    light_flux_agg = numpy.zeros((n_steps, n))
+    if n_steps > 0:
+        light_flux_agg[:, filled] = numpy.add.reduceat(light_flux, starts, axis=1)
+    sr_agg = numpy.bincount(targets, weights=sr.ravel(), minlength=n)
+    # directions without sky cells get a null luminance
+    luminance_agg = numpy.divide(light_flux_agg, sr_agg, out=numpy.zeros_like(light_flux_agg),
+                                 where=sr_agg > 0)
+
+    el_agg, az_agg = list(map(numpy.array, zip(*new_directions)))
+    grid_agg = (az_agg, 90 - el_agg, sr_agg)
+
+    if force_hi:
+        hi = sky_hi(grid, luminance).reshape(n_steps, -1).sum(axis=1)
+        hi_agg = sky_hi(grid_agg, luminance_agg).sum(axis=1)
+        ratio = numpy.divide(hi, hi_agg, out=numpy.zeros_like(hi),
+                             where=hi_agg > 0)
+        luminance_agg *= ratio[:, numpy.newaxis]
+
+    return luminance_agg, grid_agg
+
+
+def _cartesian(zenith, azimuth):
+    theta = numpy.radians(zenith)
+    phi = numpy.radians(azimuth)
+    return (numpy.sin(theta) * numpy.cos(phi),
+            numpy.sin(theta) * numpy.sin(phi),
+            numpy.cos(theta))
+
+
 def ksi_grid(grid, sun_zenith=0, sun_azimuth=0):
-    """acute angle between vector pointing to sky cells and sun vector"""
-    def _cartesian(zenith, azimuth):
-        theta = numpy.radians(zenith)
-        phi = numpy.radians(azimuth)
-        return (numpy.sin(theta) * numpy.cos(phi),
-                numpy.sin(theta) * numpy.sin(phi),
-                numpy.cos(theta))
+    """acute angle between vector pointing to sky cells and sun vector
 
+    If sun_zenith and sun_azimuth are arrays of T sun positions, a (T, n_z,
+    n_az) array is returned.
+    """
     def _acute(v1, v2):
-        """acute angle between 2 3d vectors"""
-        x = numpy.dot(v1, v2) / (numpy.linalg.norm(v1, axis=2) * numpy.linalg.norm(v2))
+        """acute angle between 2 3d vectors (v2 may be a stack of vectors)"""
+        norm2 = numpy.linalg.norm(v2, axis=-1)[..., numpy.newaxis, numpy.newaxis]
+        x = numpy.tensordot(v2, v1, axes=(-1, -1)) / (numpy.linalg.norm(v1, axis=2) * norm2)
         angle = numpy.arccos(numpy.clip(x, -1, 1))
         return numpy.degrees(angle)
 
     sky_azimuth, sky_zenith, _ = grid
     v_sky = numpy.stack(_cartesian(sky_zenith, sky_azimuth), axis=2)
-    v_sun = _cartesian(sun_zenith, sun_azimuth)
+    v_sun = numpy.stack(_cartesian(sun_zenith, sun_azimuth), axis=-1)
 
     return _acute(v_sky, v_sun)
 
@@ -197,6 +280,41 @@ def surfacic_irradiance(grid, luminance, zenith=0, azimuth=0):
     return (ni * numpy.abs(numpy.cos(numpy.radians(ksi)))).sum()
 
 
+def discretisation_error(grid, luminance, new_directions, force_hi=True, targets=None):
+    """Irradiance errors due to the aggregation of a sky luminance along a set of directions
+
+    Args:
+        grid: a (az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
+        luminance : sky luminance gridded array describing distribution of luminance over the sky hemisphere
+        new_directions : a [(elevation, azimuth),..] list of tuples defining directions of the aggregated sky
+        force_hi: is global horizontal irradiance conserved by aggregation (see sky_map) ?
+        targets: the sky_targets of grid and new_directions, if already known
+
+    Returns:
+        hi_error: the relative error on global horizontal irradiance
+        tilted_error: the maximal relative error on the irradiance of bi-face surfaces, tilted by 0, 30, 60 and 90
+            degrees from horizontal, every 30 degrees of azimuth (see surfacic_irradiance)
+    """
+    luminance_agg, grid_agg, _ = sky_map(grid, luminance, new_directions, force_hi=force_hi, targets=targets)
+    hi = sky_hi(grid, luminance).sum()
+    hi_error = abs(sky_hi(grid_agg, luminance_agg).sum() / hi - 1)
+
+    zenith, azimuth = numpy.meshgrid([30, 60, 90], numpy.arange(0, 360, 30))
+    zenith = numpy.append(0, zenith)
+    azimuth = numpy.append(0, azimuth)
+    normals = numpy.stack(_cartesian(zenith, azimuth), axis=1)
+
+    az, z, _ = grid
+    v_sky = numpy.stack(_cartesian(z, az), axis=-1).reshape(-1, 3)
+    reference = sky_ni(grid, luminance).ravel() @ numpy.abs(v_sky @ normals.T)
+    az_agg, z_agg, _ = grid_agg
+    v_agg = numpy.stack(_cartesian(z_agg, az_agg), axis=-1)
+    approximation = sky_ni(grid_agg, luminance_agg) @ numpy.abs(v_agg @ normals.T)
+    tilted_error = numpy.abs(approximation / reference - 1).max()
+
+    return hi_error, tilted_error
+
+
 def uniform_sky():
     grid = sky_grid()
     az_c, z_c, sr_c = grid
@@ -14,11 +14,124 @@
 """ A collection of equation for modelling sun position, sun irradiance and sky
 irradiance
 """
+from functools import lru_cache
+
 import numpy
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from .icosphere import turtle_face_centers, turtle_face_index
+from .sky_map import (sky_grid, sky_targets, sky_map, sky_map_series, sky_hi,
+                      sky_ni, discretisation_error, _cartesian)
+
+
+class LightSources(object):
+    """ A compact, array-backed, collection of directional light sources
+
+    Sources are stored in a numpy structured array (the data attribute) with fields 'elevation' (degrees), 'azimuth'
+    (degrees, from X+ positive counter-clockwise), 'irradiance' and 'vector', the (x, y, z) look-at vector of the
+    source. Elevation, azimuth, irradiance, directions and vectors are views of this array, without copy.
+    Iterating over a LightSources yields legacy (elevation, azimuth, irradiance) tuples.
+    """
+
+    dtype = numpy.dtype([('elevation', float), ('azimuth', float), ('irradiance', float), ('vector', float, (3,))])
+
+    def __init__(self, elevation=(), azimuth=(), irradiance=()):
+        elevation, azimuth, irradiance = numpy.broadcast_arrays(numpy.asarray(elevation, dtype=float),
+                                                                numpy.asarray(azimuth, dtype=float),
+                                                                numpy.asarray(irradiance, dtype=float))
+        self.data = numpy.empty(elevation.size, dtype=self.dtype)
+        self.data['elevation'] = elevation.ravel()
+        self.data['azimuth'] = azimuth.ravel()
+        self.data['irradiance'] = irradiance.ravel()
+        self._update_vectors()
+
+    @classmethod
+    def from_list(cls, sources):
+        """ LightSources from a [(elevation, azimuth, irradiance), ...] list, such as returned by sky_sources"""
+        if isinstance(sources, LightSources):
+            return sources
+        if len(sources) == 0:
+            return cls()
+        elevation, azimuth, irradiance = numpy.asarray(sources, dtype=float).reshape(-1, 3).T
+        return cls(elevation, azimuth, irradiance)
+
+    @classmethod
+    def _from_data(cls, data):
+        sources = cls.__new__(cls)
+        sources.data = data
+        return sources
+
+    def _update_vectors(self):
+        theta = numpy.radians(90 - self.elevation)
+        phi = numpy.radians(self.azimuth)
+        vectors = self.vectors
+        vectors[:, 0] = -numpy.sin(theta) * numpy.cos(phi)
+        vectors[:, 1] = -numpy.sin(theta) * numpy.sin(phi)
+        vectors[:, 2] = -numpy.cos(theta)
+
+    @property
+    def elevation(self):
+        return self.data['elevation']
+
+    @property
+    def azimuth(self):
+        return self.data['azimuth']
+
+    @property
+    def irradiance(self):
+        return self.data['irradiance']
+
+    @property
+    def directions(self):
+        """ a (n, 2) array of (elevation, azimuth) of sources"""
+        return structured_to_unstructured(self.data[['elevation', 'azimuth']])
+
+    @property
+    def vectors(self):
+        """ a (n, 3) array of look-at vectors of sources"""
+        return self.data['vector']
 
-from .icosphere import turtle_mesh, spherical_face_centers
-from openalea.astk.sky_luminance import sky_luminance
-from .sky_map import sky_grid, sky_map, sky_hi, sky_ni, sun_hi
+    def horizontal_irradiance(self):
+        """ horizontal irradiance of the sources, irradiance being normal irradiance"""
+        return self.irradiance * numpy.sin(numpy.radians(self.elevation))
+
+    def orient(self, north=90):
+        """ Sources with azimuths converted from North, positive clockwise, to X+, positive counter-clockwise
+
+        Args:
+            north: the angle between X+ and North (deg, positive counter-clockwise)
+        """
+        data = self.data.copy()
+        data['azimuth'] = _normalise_angle(data['azimuth'], north)
+        sources = LightSources._from_data(data)
+        sources._update_vectors()
+        return sources
+
+    def to_list(self):
+        """ legacy [(elevation, azimuth, irradiance), ...] list of sources"""
+        return list(zip(self.elevation, self.azimuth, self.irradiance))
+
+    def to_caribu(self):
+        """ [(irradiance, (x, y, z)), ...] list of sources, as expected by caribu"""
+        return list(zip(self.irradiance.tolist(), map(tuple, self.vectors.tolist())))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return zip(self.elevation, self.azimuth, self.irradiance)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, numpy.integer)):
+            source = self.data[item]
+            return source['elevation'], source['azimuth'], source['irradiance']
+        return LightSources._from_data(self.data[item])
+
+    def __add__(self, other):
+        return LightSources._from_data(numpy.concatenate((self.data, LightSources.from_list(other).data)))
+
+    def __repr__(self):
+        return 'LightSources(' + str(len(self)) + ' sources)'
 
 
 def regular_sky(d_az=10, d_z=10, n_az=None, n_z=None):
@@ -40,27 +153,330 @@ def hierarchical_turtle(sectors=46):
 
 
 def icospherical_turtle(sectors=46):
-    sky_mesh = turtle_mesh(sectors)
-    return spherical_face_centers(sky_mesh)
+    return turtle_face_centers(sectors)
+
+
+@lru_cache(maxsize=None)
+def _turtle(sectors):
+    """ cached, immutable, sky turtle directions"""
+    if sectors <= 46:
+        return tuple(hierarchical_turtle(sectors))
+    else:
+        return tuple(icospherical_turtle(sectors))
 
 
 def sky_turtle(sectors=46):
+    return list(_turtle(sectors))
+
+
+def adaptive_sky_dirs(grid, luminance, sectors=46, max_iter=100, tolerance=0.1, seed=0):
+    """ Sky directions adapted to a sky luminance distribution
+
+    Args:
+        grid: a (az_c, z_c, sr_c) tuple of sky coordinates, such as returned by astk.sky_map.sky_grid
+        luminance : sky luminance gridded array describing distribution of luminance over the sky hemisphere
+        sectors: the number of directions
+        max_iter: the maximal number of k-means iterations
+        tolerance: iterations stop when directions move by less than tolerance (deg)
+        seed: the seed of the random generator used for initialisation
+
+    Returns:
+        a [(elevation, azimuth), ...] list of directions sampling the sky hemisphere, azimuths being relative to
+        North, positive clockwise
+
+    Details:
+        Sky cells are partitioned by a k-means weighted by cell light flux (luminance * steradians), so that bright
+        regions of the sky are sampled by more, smaller, sectors. Cells are clustered in the polar projection used by
+        astk.sky_map.sky_targets: the partition is the one used by sky_map to aggregate luminance along the returned
+        directions. Initial centers are chosen by weighted k-means++ seeding. Cells are weighted by their solid angle
+        only if the sky has no (or undefined) luminance.
+    """
+    az, z, sr = grid
+    theta = numpy.radians(az)
+    points = numpy.stack(((z * numpy.sin(theta)).ravel(), (z * numpy.cos(theta)).ravel()), axis=1)
+    weights = numpy.maximum(numpy.nan_to_num(luminance * sr), 0).ravel()
+    if weights.sum() <= 0:
+        # dark (or undefined) skies are sampled evenly
+        weights = numpy.broadcast_to(sr, luminance.shape).ravel().astype(float)
+    n = min(sectors, len(points))
+
+    rng = numpy.random.default_rng(seed)
+    centers = numpy.empty((n, 2))
+    centers[0] = points[rng.choice(len(points), p=weights / weights.sum())]
+    distances = ((points - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, n):
+        potential = weights * distances
+        if potential.sum() <= 0:
+            potential = distances
+        centers[i] = points[rng.choice(len(points), p=potential / potential.sum())]
+        distances = numpy.minimum(distances, ((points - centers[i]) ** 2).sum(axis=1))
+
+    squared_norms = (points ** 2).sum(axis=1)
+
+    def _distances(centers):
+        return squared_norms[:, numpy.newaxis] - 2 * points @ centers.T + (centers ** 2).sum(axis=1)
+
+    labels = numpy.argmin(_distances(centers), axis=1)
+    for _ in range(max_iter):
+        previous = centers.copy()
+        total = numpy.bincount(labels, weights=weights, minlength=n)
+        filled = total > 0
+        for i in range(2):
+            centers[filled, i] = numpy.bincount(labels, weights=weights * points[:, i], minlength=n)[filled] / total[
+                filled]
+        d2 = _distances(centers)
+        labels = numpy.argmin(d2, axis=1)
+        # empty clusters are reseeded with the worst represented cells
+        empty = numpy.setdiff1d(numpy.arange(n), labels)
+        if len(empty) > 0:
+            worst = numpy.argsort(-weights * d2[numpy.arange(len(points)), labels], kind='stable')[:len(empty)]
+            centers[empty] = points[worst]
+            labels[worst] = empty
+        elif numpy.abs(centers - previous).max() < tolerance:
+            break
+
+    zenith = numpy.hypot(centers[:, 0], centers[:, 1])
+    azimuth = numpy.degrees(numpy.arctan2(centers[:, 0], centers[:, 1])) % 360
+    return list(zip(90 - zenith, azimuth))
+
+
+@lru_cache(maxsize=None)
+def _grid(d_az=1, d_z=1):
+    """ cached sky grid, with read-only arrays"""
+    grid = sky_grid(d_az=d_az, d_z=d_z)
+    for a in grid:
+        a.flags.writeable = False
+    return grid
+
+
+@lru_cache(maxsize=64)
+def _targets(sky_dirs, d_az=1, d_z=1):
+    """ cached, read-only, sky_targets of a (cached) grid and sky directions"""
+    targets = sky_targets(_grid(d_az, d_z), sky_dirs)
+    targets.flags.writeable = False
+    return targets
+
+
+@lru_cache(maxsize=64)
+def _turtle_targets(sectors, d_az=1, d_z=1):
+    """ cached, read-only, index of the turtle sectors containing the cells of a (cached) grid.
+    Cells are assigned to the closest direction of hierarchical turtles, that have no mesh"""
     if sectors <= 46:
-        return hierarchical_turtle(sectors)
+        return _targets(_turtle(sectors), d_az, d_z)
+    az, z, _ = _grid(d_az, d_z)
+    targets = turtle_face_index(numpy.stack(_cartesian(z, az), axis=-1), sectors)
+    targets.flags.writeable = False
+    return targets
+
+
+def _sky_discretisation(sky_dirs=None, sectors=46):
+    """grid, sky directions and targets used for sky aggregation
+
+    Default structures are memoised: sky_dirs is used as a cache key once
+    converted to a tuple of (elevation, azimuth) tuples. Sky turtles are
+    partitioned by the faces of their mesh, other directions by proximity.
+    """
+    if sky_dirs is None:
+        return _grid(), _turtle(sectors), _turtle_targets(sectors)
+    sky_dirs = tuple(map(tuple, sky_dirs))
+    if len(sky_dirs) in turtle_sectors_counts and sky_dirs == _turtle(len(sky_dirs)):
+        return _grid(), sky_dirs, _turtle_targets(len(sky_dirs))
+    return _grid(), sky_dirs, _targets(sky_dirs)
+
+
+def _sun_vectors(elevation, azimuth):
+    """unit vectors pointing to directions (azimuth from North, positive clockwise)"""
+    el = numpy.radians(elevation)
+    az = numpy.radians(azimuth)
+    return numpy.stack((numpy.cos(el) * numpy.sin(az),
+                        numpy.cos(el) * numpy.cos(az),
+                        numpy.sin(el)), axis=-1)
+
+
+def discretise_sun(sun, n_sources=1, max_iter=100):
+    """ Cluster sun sources into a fixed number of representative directions
+
+    Args:
+        sun: a [(elevation, azimuth, luminance),...] list of sun sources, such as returned by
+            astk.sky_luminance.sky_luminance. Luminance is the normal irradiance of the source.
+        n_sources: the number of representative directions
+        max_iter: the maximal number of k-means iterations
+
+    Returns:
+        sources: a list of at most n_sources (elevation, azimuth, luminance) tuples. The horizontal irradiance of a
+            source equals the sum of the horizontal irradiance of the sun sources it represents.
+        mean_error: the mean angular distance (deg) between sun sources and their representative direction,
+            weighted by horizontal irradiance
+        max_error: the maximal angular distance (deg) between sun sources and their representative direction
+
+    Details:
+        Sun directions are clustered by a k-means of their unit vectors weighted by their horizontal irradiance.
+        Initial clusters split sun sources sorted by azimuth into groups of equal horizontal irradiance, so that
+        results are deterministic, and clusters left empty are reseeded with the sun positions the farthest from
+        their representative direction. Representative directions are the weighted mean directions of the clusters.
+    """
+    if n_sources < 1:
+        raise ValueError('n_sources should be at least 1, not ' + str(n_sources))
+    if len(sun) <= n_sources:
+        return [tuple(source) for source in sun], 0., 0.
+    elevation, azimuth, luminance = map(numpy.array, zip(*sun))
+    hi = luminance * numpy.sin(numpy.radians(elevation))
+    weights = numpy.maximum(hi, 0)
+    if weights.sum() <= 0:
+        weights = numpy.ones_like(hi)
+    vectors = _sun_vectors(elevation, azimuth)
+    n = n_sources
+
+    order = numpy.argsort(azimuth, kind='stable')
+    cumulated = numpy.cumsum(weights[order])
+    labels = numpy.empty(len(sun), dtype=int)
+    labels[order] = numpy.minimum(n - 1, (n * (cumulated - weights[order]) / cumulated[-1]).astype(int))
+
+    def _centers(labels):
+        centers = numpy.stack([numpy.bincount(labels, weights=weights * vectors[:, i], minlength=n)
+                               for i in range(3)], axis=1)
+        norm = numpy.linalg.norm(centers, axis=1)
+        return numpy.divide(centers, norm[:, numpy.newaxis], out=numpy.zeros_like(centers),
+                            where=norm[:, numpy.newaxis] > 0)
+
+    for _ in range(max_iter):
+        centers = _centers(labels)
+        cosines = vectors @ centers.T
+        # empty clusters are never selected...
+        cosines[:, numpy.linalg.norm(centers, axis=1) == 0] = -numpy.inf
+        new_labels = numpy.argmax(cosines, axis=1)
+        # ...but are reseeded with the worst represented sun positions
+        empty = numpy.setdiff1d(numpy.arange(n), new_labels)
+        if len(empty) > 0:
+            fit = cosines[numpy.arange(len(sun)), new_labels]
+            new_labels[numpy.argsort(fit, kind='stable')[:len(empty)]] = empty
+        if numpy.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    centers = _centers(labels)
+
+    error = numpy.degrees(numpy.arccos(numpy.clip((vectors * centers[labels]).sum(axis=1), -1, 1)))
+    used = numpy.unique(labels)
+    centers = centers[used]
+    hi_sources = numpy.bincount(labels, weights=hi, minlength=n)[used]
+    el_sources = numpy.degrees(numpy.arcsin(centers[:, 2]))
+    az_sources = numpy.degrees(numpy.arctan2(centers[:, 0], centers[:, 1])) % 360
+    lum_sources = hi_sources / numpy.sin(numpy.radians(el_sources))
+    sources = list(zip(el_sources, az_sources, lum_sources))
+    return sources, numpy.average(error, weights=weights), error.max()
+
+
+# sector counts of the turtles returned by sky_turtle, by increasing size
+turtle_sectors_counts = (1, 6, 16, 46, 66, 91, 136, 196, 251, 341, 406, 556, 751, 976)
+
+
+def _sky_types_luminance(sky_type, sky_irradiance=None):
+    """sky luminance on the cached grid for a given sky type. Sun dependant sky
+    types use default (clear sky) sky irradiance if sky_irradiance is None"""
+    # deferred: sky_luminance loads pandas and pvlib
+    from openalea.astk.sky_luminance import sky_luminance
+    if sky_irradiance is None and sky_type not in ('soc', 'uoc'):
+        from openalea.astk.sky_irradiance import sky_irradiance as default_irradiance
+        sky_irradiance = default_irradiance()
+    _, sky = sky_luminance(_grid(), sky_type=sky_type, sky_irradiance=sky_irradiance)
+    return sky
+
+
+@lru_cache(maxsize=None)
+def _turtle_errors(sky_type, sectors, force_hi):
+    """ cached discretisation errors of turtles for default skies"""
+    sky_dirs = _turtle(sectors)
+    return discretisation_error(_grid(), _sky_types_luminance(sky_type), sky_dirs, force_hi=force_hi,
+                                targets=_turtle_targets(sectors))
+
+
+def turtle_error_curve(sky_type='soc', sky_irradiance=None, force_hi=True, max_sectors=976):
+    """ Irradiance errors of sky turtles of increasing size
+
+    Args:
+        sky_type (str): sky type, one of ('soc', 'uoc', 'clear_sky', 'sun_soc', 'blended', 'all_weather'),
+            see sky_sources.
+        sky_irradiance: a datetime indexed dataframe specifying sky irradiances for the period, such as returned by
+            astk.meteorology.sky_irradiance.sky_irradiance. If None (default), clear sky irradiance of the default
+            location and date of astk.sky_irradiance is used for sky types that depend on sun position.
+        force_hi: is global horizontal irradiance conserved by sky discretisation (see sky_sources) ?
+        max_sectors: the maximal number of sectors to evaluate
+
+    Returns:
+        sectors: the sector counts of the turtles
+        hi_error: the relative error on global horizontal irradiance of each turtle
+        tilted_error: the maximal relative error on the irradiance of tilted surfaces of each turtle
+
+    Details:
+        Errors are measured against the luminance of the fine sky grid, see astk.sky_map.discretisation_error.
+        Curves of default skies (sky_irradiance is None) are computed once per process.
+    """
+    sectors = [n for n in turtle_sectors_counts if n <= max_sectors]
+    if sky_irradiance is None:
+        errors = [_turtle_errors(sky_type, n, force_hi) for n in sectors]
     else:
-        return icospherical_turtle(sectors)
+        sky = _sky_types_luminance(sky_type, sky_irradiance)
+        errors = [discretisation_error(_grid(), sky, _turtle(n), force_hi=force_hi, targets=_turtle_targets(n))
+                  for n in sectors]
+    hi_error, tilted_error = map(numpy.array, zip(*errors))
+    return sectors, hi_error, tilted_error
+
+
+def turtle_sectors(tilted_tolerance=0.05, hi_tolerance=0.01, sky_type='soc', sky_irradiance=None, force_hi=True,
+                   max_sectors=976):
+    """ The smallest number of turtle sectors meeting irradiance error tolerances
+
+    Args:
+        tilted_tolerance: the tolerance on the relative error on the irradiance of tilted surfaces
+        hi_tolerance: the tolerance on the relative error on global horizontal irradiance
+        sky_type, sky_irradiance, force_hi, max_sectors: see turtle_error_curve
+
+    Returns:
+        the sectors argument of sky_turtle (or sky_sources) to be used
+
+    Details:
+        Turtles are evaluated by increasing size, and evaluation stops at the first turtle meeting the tolerances.
+        Evaluations of default skies (sky_irradiance is None) are cached.
+    """
+    sky = None
+    for n in turtle_sectors_counts:
+        if n > max_sectors:
+            break
+        if sky_irradiance is None:
+            hi_error, tilted_error = _turtle_errors(sky_type, n, force_hi)
+        else:
+            if sky is None:
+                sky = _sky_types_luminance(sky_type, sky_irradiance)
+            hi_error, tilted_error = discretisation_error(_grid(), sky, _turtle(n), force_hi=force_hi,
+                                                          targets=_turtle_targets(n))
+        if hi_error <= hi_tolerance and tilted_error <= tilted_tolerance:
+            return n
+    raise ValueError('No turtle with less than ' + str(max_sectors) + ' sectors meets the tolerances')
+
+
+def _normalise_angle(angle, north):
+    """normalise an angle to the [0, 360] range"""
+    angle = numpy.array(angle, dtype=float)
+    angle = north - angle
+    modulo = 360
+    angle %= modulo
+    # force to [0, modulo] range
+    angle = (angle + modulo) % modulo
+    return angle
 
 
-def sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, scale=None, source_irradiance='normal', north=90, sun_in_sky=False, force_hi=True):
+def sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, scale=None, source_irradiance='normal', north=90, sun_in_sky=False, force_hi=True, sectors=46, sun_clusters=None, as_array=False, return_errors=False, interval_mean=False, label='left'):
     """ Light sources representing the sun and the sky in a scene
 
     Args:
         sky_type (str): sky type (see details below), one of ('soc', 'uoc', 'clear_sky', 'sun_soc', 'blended', 'all_weather').
         sky_irradiance: a datetime indexed dataframe specifying sky irradiances for the period, such as returned by
-            astk.meteorology.sky_irradiance.sky_irradiance. Needed for all sky_types except 'uoc' and 'soc'
+            astk.meteorology.sky_irradiance.sky_irradiance. If None (default), sky types other than 'uoc' and 'soc'
+            use the default (clear sky) sky irradiance of astk.sky_irradiance.sky_irradiance
         sky_dirs (list): a [(elevation,azimuth),...] list of directions sampling the sky hemisphere. If None (default)
-            a hierarchical turtle discretisation of 46 directions is used. Azimuths are relative to North, positive
-            clockwise
+            a turtle discretisation of the sky with the number of directions given by sectors is used (see sky_turtle).
+            If 'adaptive', sectors directions are adapted to the sky luminance distribution (see adaptive_sky_dirs).
+            Azimuths are relative to North, positive clockwise
         scale (str): How should sun/sky luminance be scaled ? If None (default) luminance are scaled so that sun+sky
             horizontal irradiance equals one. Other options are:
             - 'ghi': sun+sky horizontal flux equals mean ghi (W.m-2.s-1)
@@ -75,11 +491,25 @@ def sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, scale=None,
             and sun luminance list is emptied. Ignored for sky types 'uoc' and 'soc'.
         force_hi: if True (default), sky sources are rescaled to ensure that global horizontal irradiance of discretised
             sources is the same as the original sky luminance distrisbution. If False , no rescaling append, ensuring that global direct irradiance of sky is preserved
+        sectors: the number of turtle sectors used if sky_dirs is None (default 46)
+        sun_clusters: if not None, the maximal number of sun sources. Sun positions of the period are clustered into
+            sun_clusters representative directions that conserve direct horizontal irradiance (see discretise_sun).
+            If None (default), one sun source is returned per time step.
+        as_array: if True, sun and sky are returned as LightSources instead of lists
+        return_errors: if True, the angular errors of sun clustering are also returned
+        interval_mean: if True, the default sky irradiance is computed with interval mean sun positions (see
+            astk.sky_irradiance.sky_irradiance). Ignored if sky_irradiance is given: pass interval_mean to
+            sky_irradiance instead.
+        label: 'left' if dates label the start of their time interval, 'right' if they label its end (only used if
+            interval_mean is True)
 
     Returns:
-        sun, sky tuple
+        sun, sky tuple, or sun, sky, (mean_error, max_error) tuple if return_errors is True
         sun and sky are lists of (elevation (degrees), azimuth (degrees, from X+ positive counter-clockwise),
-        luminance) tuples of sources representing the sun or the sky
+        luminance) tuples of sources representing the sun or the sky (or LightSources if as_array is True)
+        mean_error and max_error are the mean (weighted by horizontal irradiance) and maximal angular distances (deg)
+        between sun positions and their representative sun source (see discretise_sun). They are zero if
+        sun_clusters is None.
 
     Details:
         sky_type refer to different sky models:
@@ -103,23 +533,29 @@ def sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, scale=None,
             Leicester, UK, 2000. p193,eq. 5-10
         [4] R. Perez, R. Seals, J. Michalsky, "All-weather model for sky luminance distribution—Preliminary configuration and
             validation", Solar Energy, Volume 50, Issue 3, 1993, Pages 235-245
+
+        The sky grid, the default turtles and the assignment of grid cells to sky directions are memoised,
+        so that repeated calls only evaluate sky luminance.
   """
-    def _normalise_angle(angle, north):
-        """normalise an angle to the [0, 360] range"""
-        angle = numpy.array(angle, dtype=float)
-        angle = north - angle
-        modulo = 360
-        angle %= modulo
-        # force to [0, modulo] range
-        angle = (angle + modulo) % modulo
-        return angle
-
-    grid = sky_grid()
+    if sun_clusters is not None and sun_clusters < 1:
+        raise ValueError('sun_clusters should be None or at least 1, not ' + str(sun_clusters))
+    adaptive = isinstance(sky_dirs, str) and sky_dirs == 'adaptive'
+    grid, sky_dirs, targets = _sky_discretisation(None if adaptive else sky_dirs, sectors)
+    # deferred: sky_luminance loads pandas and pvlib
+    from openalea.astk.sky_luminance import sky_luminance
+    if sky_irradiance is None and sky_type not in ('soc', 'uoc'):
+        from openalea.astk.sky_irradiance import sky_irradiance as default_irradiance
+        sky_irradiance = default_irradiance(interval_mean=interval_mean, label=label)
     sun, sky = sky_luminance(grid, sky_type=sky_type, sky_irradiance=sky_irradiance, scale=scale, sun_in_sky=sun_in_sky)
-    if sky_dirs is None:
-        sky_dirs = sky_turtle()
+    if adaptive:
+        sky_dirs = adaptive_sky_dirs(grid, sky, sectors)
+        targets = None
+    errors = (0., 0.)
+    if sun_clusters is not None:
+        sun, mean_error, max_error = discretise_sun(sun, sun_clusters)
+        errors = (mean_error, max_error)
 
-    sky_agg, grid_agg, _ = sky_map(grid, sky, sky_dirs, force_hi=force_hi)
+    sky_agg, grid_agg, _ = sky_map(grid, sky, sky_dirs, force_hi=force_hi, targets=targets)
     if source_irradiance == 'horizontal':
         sky_irr = sky_hi(grid_agg, sky_agg)
     elif source_irradiance == 'normal':
@@ -127,30 +563,120 @@ def sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, scale=None,
     else:
         raise ValueError('Unvalid option for source_irradiance: ' + source_irradiance)
     sky_elevation, sky_azimuth = zip(*sky_dirs)
-    sky_azimuth = _normalise_angle(sky_azimuth, north)
-    sky_sources = list(zip(sky_elevation, sky_azimuth, sky_irr))
+    sky_sources = LightSources(sky_elevation, sky_azimuth, sky_irr).orient(north)
+    sun_sources = LightSources.from_list(sun).orient(north)
+    if source_irradiance == 'horizontal':
+        sun_sources.irradiance[:] = sun_sources.horizontal_irradiance()
+
+    if not as_array:
+        sun_sources, sky_sources = sun_sources.to_list(), sky_sources.to_list()
+    if return_errors:
+        return sun_sources, sky_sources, errors
+    return sun_sources, sky_sources
+
 
-    if len(sun) > 0:
-        sun_elevation, sun_azimuth, sun_irr = zip(*sun)
+def _sky_sources_chunks(sky_type, sky_irradiance, sky_dirs, source_irradiance, north, sun_in_sky, force_hi,
+                        chunksize, sectors):
+    """(sun, sky) arrays of sources for consecutive chunks of time steps"""
+    if source_irradiance not in ('normal', 'horizontal'):
+        raise ValueError('Unvalid option for source_irradiance: ' + source_irradiance)
+    if sky_irradiance is None:
+        raise ValueError('sky_irradiance is required for time-resolved sky sources')
+    grid, sky_dirs, targets = _sky_discretisation(sky_dirs, sectors)
+    # deferred: sky_luminance loads pandas and pvlib
+    from openalea.astk.sky_luminance import sky_luminance_series
+    for start in range(0, len(sky_irradiance), chunksize):
+        chunk = sky_irradiance.iloc[start:start + chunksize]
+        sun, sky = sky_luminance_series(grid, sky_type=sky_type, sky_irradiance=chunk, sun_in_sky=sun_in_sky)
+        sky_agg, grid_agg = sky_map_series(grid, sky, sky_dirs, force_hi=force_hi, targets=targets)
         if source_irradiance == 'horizontal':
-            sun_irr = sun_hi(sun)
-        sun_azimuth = _normalise_angle(sun_azimuth, north)
-        sun_sources = list(zip(sun_elevation, sun_azimuth, sun_irr))
+            sky_irr = sky_hi(grid_agg, sky_agg)
+            sun[:, 2] *= numpy.sin(numpy.radians(sun[:, 0]))
+        else:
+            sky_irr = sky_ni(grid_agg, sky_agg)
+        sun[:, 1] = _normalise_angle(sun[:, 1], north)
+        yield sun, sky_irr
+
+
+def sky_sources_series(sky_type='soc', sky_irradiance=None, sky_dirs=None, source_irradiance='normal', north=90,
+                       sun_in_sky=False, force_hi=True, chunksize=64, sectors=46):
+    """ Time-resolved light sources representing the sun and the sky at each time step of a period
+
+    Args:
+        sky_type (str): sky type, one of ('soc', 'uoc', 'clear_sky', 'sun_soc', 'blended', 'all_weather'), see
+            sky_sources.
+        sky_irradiance: a datetime indexed dataframe specifying sky irradiances at T time steps, such as returned by
+            astk.meteorology.sky_irradiance.sky_irradiance.
+        sky_dirs (list): a [(elevation,azimuth),...] list of n directions sampling the sky hemisphere. If None (default)
+            a turtle discretisation of the sky with the number of directions given by sectors is used (see sky_turtle).
+            Azimuths are relative to North, positive clockwise
+        source_irradiance (str): How should source irradiance be given ? Should one of:
+            - 'normal' : irradiance are given as normal irradiances (perpendicular to source direction)
+            - 'horizontal': irradiance are given as horizontal irradiances
+        north: the angle between X+ and North (deg, positive counter-clockwise)
+        sun_in_sky: Should the sun be added to the sky ? If True, sky luminance is set to sun luminance in the sun region,
+            and sun irradiance is set to zero. Ignored for sky types 'uoc' and 'soc'.
+        force_hi: if True (default), sky sources are rescaled to ensure that global horizontal irradiance of discretised
+            sources is the same as the original sky luminance distribution at each time step.
+        chunksize: the number of time steps evaluated at once
+        sectors: the number of turtle sectors used if sky_dirs is None (default 46)
+
+    Returns:
+        sun: a (T, 3) array of (elevation (degrees), azimuth (degrees, from X+ positive counter-clockwise),
+            irradiance) of the sun at each time step. Irradiance is zero when the sun is not a source.
+        sky: a (T, n) array of the irradiance of the sky sources at each time step
+        directions: a (n, 2) array of (elevation, azimuth (degrees, from X+ positive counter-clockwise)) of the
+            sky sources
+
+    Details:
+        Source irradiance are the actual irradiance of each time step (W.m-2), see
+        astk.sky_luminance.sky_luminance_series. Time integration of sources (e.g. with
+        astk.timeseries.time_weights) is left to the caller.
+    """
+    if sky_dirs is None:
+        sky_dirs = _turtle(sectors)
+    chunks = list(_sky_sources_chunks(sky_type, sky_irradiance, sky_dirs, source_irradiance, north, sun_in_sky,
+                                      force_hi, chunksize, sectors))
+    if len(chunks) > 0:
+        sun, sky = map(numpy.concatenate, zip(*chunks))
     else:
-        sun_sources = sun
+        sun, sky = numpy.zeros((0, 3)), numpy.zeros((0, len(sky_dirs)))
+    sky_elevation, sky_azimuth = map(numpy.array, zip(*sky_dirs))
+    directions = numpy.stack((sky_elevation, _normalise_angle(sky_azimuth, north)), axis=1)
+    return sun, sky, directions
 
-    return sun_sources, sky_sources
+
+def iter_sky_sources(sky_type='soc', sky_irradiance=None, sky_dirs=None, source_irradiance='normal', north=90,
+                     sun_in_sky=False, force_hi=True, chunksize=64, sectors=46, as_array=False):
+    """ Iterate over the light sources of the time steps of a period
+
+    Time steps are evaluated lazily, by chunks of chunksize time steps (see sky_sources_series for arguments).
+
+    Yields:
+        a sun, sky tuple for each time step, formatted as the sun, sky tuple returned by sky_sources (LightSources if
+        as_array is True). The sun list is empty if the sun is not a source at this time step.
+    """
+    if sky_dirs is None:
+        sky_dirs = _turtle(sectors)
+    sky_elevation, sky_azimuth = zip(*sky_dirs)
+    sky_sources = LightSources(sky_elevation, sky_azimuth, 0).orient(north)
+    for sun, sky in _sky_sources_chunks(sky_type, sky_irradiance, sky_dirs, source_irradiance, north, sun_in_sky,
+                                        force_hi, chunksize, sectors):
+        for sun_row, sky_irr in zip(sun, sky):
+            sun_sources = LightSources(*sun_row) if sun_row[2] > 0 else LightSources()
+            step_sky = LightSources._from_data(sky_sources.data.copy())
+            step_sky.irradiance[:] = sky_irr
+            if as_array:
+                yield sun_sources, step_sky
+            else:
+                yield sun_sources.to_list(), step_sky.to_list()
 
 
 def caribu_light_sources(sun, sky):
-    def _vecteur_direction(elevation, azimuth):
-        """ coordinate of look_at source vector from elevation and azimuth (deg, f
-        rom X+ positive counter-clockwise)"""
-        theta = numpy.radians(90 - numpy.array(elevation))
-        phi = numpy.radians(azimuth)
-        return -numpy.sin(theta) * numpy.cos(phi), -numpy.sin(theta) * numpy.sin(phi), -numpy.cos(theta)
-
-    el, az, irrad = zip(*(sun + sky))
-    x, y, z = _vecteur_direction(el, az)
-    return [(irr, (xx, yy, zz)) for irr, xx, yy, zz in
-            zip(irrad, x, y, z)]
\ No newline at end of file
+    """ caribu [(irradiance, (x, y, z)), ...] light sources from sun and sky sources
+
+    Args:
+        sun, sky: lists of (elevation, azimuth, irradiance) tuples or LightSources, such as returned by sky_sources
+    """
+    sources = LightSources.from_list(sun) + LightSources.from_list(sky)
+    return sources.to_caribu()
@@ -0,0 +1,631 @@
+# -*- python -*-
+#
+#       Copyright 2016-2025 Inria - CIRAD - INRAe
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea/astk
+#
+#       File author(s): Christian Fournier <christian.fournier@inrae.fr>
+#
+# ==============================================================================
+""" Vectorised numpy implementation of the NREL Solar Position Algorithm (SPA)
+
+Reda, I. and Andreas, A. (2004) Solar position algorithm for solar radiation
+applications. Solar Energy 76, 577-589. Uncertainty is +/- 0.0003 deg for years
+-2000 to 6000.
+
+Periodic terms are those of the reference implementation (also used by pvlib).
+"""
+import numpy
+
+_J2000 = 2451545.
+
+# Earth periodic terms (Reda & Andreas 2004, table A4.2): A, B, C of
+# A * cos(B + C * jme) for heliocentric longitude (L), latitude (B) and radius
+# vector (R)
+_L0 = numpy.array([
+    [175347046, 0, 0],
+    [3341656, 4.6692568, 6283.07585],
+    [34894, 4.6261, 12566.1517],
+    [3497, 2.7441, 5753.3849],
+    [3418, 2.8289, 3.5231],
+    [3136, 3.6277, 77713.7715],
+    [2676, 4.4181, 7860.4194],
+    [2343, 6.1352, 3930.2097],
+    [1324, 0.7425, 11506.7698],
+    [1273, 2.0371, 529.691],
+    [1199, 1.1096, 1577.3435],
+    [990, 5.233, 5884.927],
+    [902, 2.045, 26.298],
+    [857, 3.508, 398.149],
+    [780, 1.179, 5223.694],
+    [753, 2.533, 5507.553],
+    [505, 4.583, 18849.228],
+    [492, 4.205, 775.523],
+    [357, 2.92, 0.067],
+    [317, 5.849, 11790.629],
+    [284, 1.899, 796.298],
+    [271, 0.315, 10977.079],
+    [243, 0.345, 5486.778],
+    [206, 4.806, 2544.314],
+    [205, 1.869, 5573.143],
+    [202, 2.458, 6069.777],
+    [156, 0.833, 213.299],
+    [132, 3.411, 2942.463],
+    [126, 1.083, 20.775],
+    [115, 0.645, 0.98],
+    [103, 0.636, 4694.003],
+    [102, 0.976, 15720.839],
+    [102, 4.267, 7.114],
+    [99, 6.21, 2146.17],
+    [98, 0.68, 155.42],
+    [86, 5.98, 161000.69],
+    [85, 1.3, 6275.96],
+    [85, 3.67, 71430.7],
+    [80, 1.81, 17260.15],
+    [79, 3.04, 12036.46],
+    [75, 1.76, 5088.63],
+    [74, 3.5, 3154.69],
+    [74, 4.68, 801.82],
+    [70, 0.83, 9437.76],
+    [62, 3.98, 8827.39],
+    [61, 1.82, 7084.9],
+    [57, 2.78, 6286.6],
+    [56, 4.39, 14143.5],
+    [56, 3.47, 6279.55],
+    [52, 0.19, 12139.55],
+    [52, 1.33, 1748.02],
+    [51, 0.28, 5856.48],
+    [49, 0.49, 1194.45],
+    [41, 5.37, 8429.24],
+    [41, 2.4, 19651.05],
+    [39, 6.17, 10447.39],
+    [37, 6.04, 10213.29],
+    [37, 2.57, 1059.38],
+    [36, 1.71, 2352.87],
+    [36, 1.78, 6812.77],
+    [33, 0.59, 17789.85],
+    [30, 0.44, 83996.85],
+    [30, 2.74, 1349.87],
+    [25, 3.16, 4690.48],
+])
+
+_L1 = numpy.array([
+    [628331966747, 0, 0],
+    [206059, 2.678235, 6283.07585],
+    [4303, 2.6351, 12566.1517],
+    [425, 1.59, 3.523],
+    [119, 5.796, 26.298],
+    [109, 2.966, 1577.344],
+    [93, 2.59, 18849.23],
+    [72, 1.14, 529.69],
+    [68, 1.87, 398.15],
+    [67, 4.41, 5507.55],
+    [59, 2.89, 5223.69],
+    [56, 2.17, 155.42],
+    [45, 0.4, 796.3],
+    [36, 0.47, 775.52],
+    [29, 2.65, 7.11],
+    [21, 5.34, 0.98],
+    [19, 1.85, 5486.78],
+    [19, 4.97, 213.3],
+    [17, 2.99, 6275.96],
+    [16, 0.03, 2544.31],
+    [16, 1.43, 2146.17],
+    [15, 1.21, 10977.08],
+    [12, 2.83, 1748.02],
+    [12, 3.26, 5088.63],
+    [12, 5.27, 1194.45],
+    [12, 2.08, 4694],
+    [11, 0.77, 553.57],
+    [10, 1.3, 6286.6],
+    [10, 4.24, 1349.87],
+    [9, 2.7, 242.73],
+    [9, 5.64, 951.72],
+    [8, 5.3, 2352.87],
+    [6, 2.65, 9437.76],
+    [6, 4.67, 4690.48],
+])
+
+_L2 = numpy.array([
+    [52919, 0, 0],
+    [8720, 1.0721, 6283.0758],
+    [309, 0.867, 12566.152],
+    [27, 0.05, 3.52],
+    [16, 5.19, 26.3],
+    [16, 3.68, 155.42],
+    [10, 0.76, 18849.23],
+    [9, 2.06, 77713.77],
+    [7, 0.83, 775.52],
+    [5, 4.66, 1577.34],
+    [4, 1.03, 7.11],
+    [4, 3.44, 5573.14],
+    [3, 5.14, 796.3],
+    [3, 6.05, 5507.55],
+    [3, 1.19, 242.73],
+    [3, 6.12, 529.69],
+    [3, 0.31, 398.15],
+    [3, 2.28, 553.57],
+    [2, 4.38, 5223.69],
+    [2, 3.75, 0.98],
+])
+
+_L3 = numpy.array([
+    [289, 5.844, 6283.076],
+    [35, 0, 0],
+    [17, 5.49, 12566.15],
+    [3, 5.2, 155.42],
+    [1, 4.72, 3.52],
+    [1, 5.3, 18849.23],
+    [1, 5.97, 242.73],
+])
+
+_L4 = numpy.array([
+    [114, 3.142, 0],
+    [8, 4.13, 6283.08],
+    [1, 3.84, 12566.15],
+])
+
+_L5 = numpy.array([
+    [1, 3.14, 0],
+])
+
+_B0 = numpy.array([
+    [280, 3.199, 84334.662],
+    [102, 5.422, 5507.553],
+    [80, 3.88, 5223.69],
+    [44, 3.7, 2352.87],
+    [32, 4, 1577.34],
+])
+
+_B1 = numpy.array([
+    [9, 3.9, 5507.55],
+    [6, 1.73, 5223.69],
+])
+
+_R0 = numpy.array([
+    [100013989, 0, 0],
+    [1670700, 3.0984635, 6283.07585],
+    [13956, 3.05525, 12566.1517],
+    [3084, 5.1985, 77713.7715],
+    [1628, 1.1739, 5753.3849],
+    [1576, 2.8469, 7860.4194],
+    [925, 5.453, 11506.77],
+    [542, 4.564, 3930.21],
+    [472, 3.661, 5884.927],
+    [346, 0.964, 5507.553],
+    [329, 5.9, 5223.694],
+    [307, 0.299, 5573.143],
+    [243, 4.273, 11790.629],
+    [212, 5.847, 1577.344],
+    [186, 5.022, 10977.079],
+    [175, 3.012, 18849.228],
+    [110, 5.055, 5486.778],
+    [98, 0.89, 6069.78],
+    [86, 5.69, 15720.84],
+    [86, 1.27, 161000.69],
+    [65, 0.27, 17260.15],
+    [63, 0.92, 529.69],
+    [57, 2.01, 83996.85],
+    [56, 5.24, 71430.7],
+    [49, 3.25, 2544.31],
+    [47, 2.58, 775.52],
+    [45, 5.54, 9437.76],
+    [43, 6.01, 6275.96],
+    [39, 5.36, 4694],
+    [38, 2.39, 8827.39],
+    [37, 0.83, 19651.05],
+    [37, 4.9, 12139.55],
+    [36, 1.67, 12036.46],
+    [35, 1.84, 2942.46],
+    [33, 0.24, 7084.9],
+    [32, 0.18, 5088.63],
+    [32, 1.78, 398.15],
+    [28, 1.21, 6286.6],
+    [28, 1.9, 6279.55],
+    [26, 4.59, 10447.39],
+])
+
+_R1 = numpy.array([
+    [103019, 1.10749, 6283.07585],
+    [1721, 1.0644, 12566.1517],
+    [702, 3.142, 0],
+    [32, 1.02, 18849.23],
+    [31, 2.84, 5507.55],
+    [25, 1.32, 5223.69],
+    [18, 1.42, 1577.34],
+    [10, 5.91, 10977.08],
+    [9, 1.42, 6275.96],
+    [9, 0.27, 5486.78],
+])
+
+_R2 = numpy.array([
+    [4359, 5.7846, 6283.0758],
+    [124, 5.579, 12566.152],
+    [12, 3.14, 0],
+    [9, 3.63, 77713.77],
+    [6, 1.87, 5573.14],
+    [3, 5.47, 18849.23],
+])
+
+_R3 = numpy.array([
+    [145, 4.273, 6283.076],
+    [7, 3.92, 12566.15],
+])
+
+_R4 = numpy.array([
+    [4, 2.56, 6283.08],
+])
+
+# Periodic terms for the nutation in longitude and obliquity (Reda & Andreas
+# 2004, table A4.3): coefficients of X0..X4 and a, b, c, d
+_NUTATION_ABCD = numpy.array([
+    [-171996, -174.2, 92025, 8.9],
+    [-13187, -1.6, 5736, -3.1],
+    [-2274, -0.2, 977, -0.5],
+    [2062, 0.2, -895, 0.5],
+    [1426, -3.4, 54, -0.1],
+    [712, 0.1, -7, 0],
+    [-517, 1.2, 224, -0.6],
+    [-386, -0.4, 200, 0],
+    [-301, 0, 129, -0.1],
+    [217, -0.5, -95, 0.3],
+    [-158, 0, 0, 0],
+    [129, 0.1, -70, 0],
+    [123, 0, -53, 0],
+    [63, 0, 0, 0],
+    [63, 0.1, -33, 0],
+    [-59, 0, 26, 0],
+    [-58, -0.1, 32, 0],
+    [-51, 0, 27, 0],
+    [48, 0, 0, 0],
+    [46, 0, -24, 0],
+    [-38, 0, 16, 0],
+    [-31, 0, 13, 0],
+    [29, 0, 0, 0],
+    [29, 0, -12, 0],
+    [26, 0, 0, 0],
+    [-22, 0, 0, 0],
+    [21, 0, -10, 0],
+    [17, -0.1, 0, 0],
+    [16, 0, -8, 0],
+    [-16, 0.1, 7, 0],
+    [-15, 0, 9, 0],
+    [-13, 0, 7, 0],
+    [-12, 0, 6, 0],
+    [11, 0, 0, 0],
+    [-10, 0, 5, 0],
+    [-8, 0, 3, 0],
+    [7, 0, -3, 0],
+    [-7, 0, 0, 0],
+    [-7, 0, 3, 0],
+    [-7, 0, 3, 0],
+    [6, 0, 0, 0],
+    [6, 0, -3, 0],
+    [6, 0, -3, 0],
+    [-6, 0, 3, 0],
+    [-6, 0, 3, 0],
+    [5, 0, 0, 0],
+    [-5, 0, 3, 0],
+    [-5, 0, 3, 0],
+    [-5, 0, 3, 0],
+    [4, 0, 0, 0],
+    [4, 0, 0, 0],
+    [4, 0, 0, 0],
+    [-4, 0, 0, 0],
+    [-4, 0, 0, 0],
+    [-4, 0, 0, 0],
+    [3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+    [-3, 0, 0, 0],
+])
+
+_NUTATION_Y = numpy.array([
+    [0, 0, 0, 0, 1],
+    [-2, 0, 0, 2, 2],
+    [0, 0, 0, 2, 2],
+    [0, 0, 0, 0, 2],
+    [0, 1, 0, 0, 0],
+    [0, 0, 1, 0, 0],
+    [-2, 1, 0, 2, 2],
+    [0, 0, 0, 2, 1],
+    [0, 0, 1, 2, 2],
+    [-2, -1, 0, 2, 2],
+    [-2, 0, 1, 0, 0],
+    [-2, 0, 0, 2, 1],
+    [0, 0, -1, 2, 2],
+    [2, 0, 0, 0, 0],
+    [0, 0, 1, 0, 1],
+    [2, 0, -1, 2, 2],
+    [0, 0, -1, 0, 1],
+    [0, 0, 1, 2, 1],
+    [-2, 0, 2, 0, 0],
+    [0, 0, -2, 2, 1],
+    [2, 0, 0, 2, 2],
+    [0, 0, 2, 2, 2],
+    [0, 0, 2, 0, 0],
+    [-2, 0, 1, 2, 2],
+    [0, 0, 0, 2, 0],
+    [-2, 0, 0, 2, 0],
+    [0, 0, -1, 2, 1],
+    [0, 2, 0, 0, 0],
+    [2, 0, -1, 0, 1],
+    [-2, 2, 0, 2, 2],
+    [0, 1, 0, 0, 1],
+    [-2, 0, 1, 0, 1],
+    [0, -1, 0, 0, 1],
+    [0, 0, 2, -2, 0],
+    [2, 0, -1, 2, 1],
+    [2, 0, 1, 2, 2],
+    [0, 1, 0, 2, 2],
+    [-2, 1, 1, 0, 0],
+    [0, -1, 0, 2, 2],
+    [2, 0, 0, 2, 1],
+    [2, 0, 1, 0, 0],
+    [-2, 0, 2, 2, 2],
+    [-2, 0, 1, 2, 1],
+    [2, 0, -2, 0, 1],
+    [2, 0, 0, 0, 1],
+    [0, -1, 1, 0, 0],
+    [-2, -1, 0, 2, 1],
+    [-2, 0, 0, 0, 1],
+    [0, 0, 2, 2, 1],
+    [-2, 0, 2, 0, 1],
+    [-2, 1, 0, 2, 1],
+    [0, 0, 1, -2, 0],
+    [-1, 0, 1, 0, 0],
+    [-2, 1, 0, 0, 0],
+    [1, 0, 0, 0, 0],
+    [0, 0, 1, 2, 0],
+    [0, 0, -2, 2, 2],
+    [-1, -1, 1, 0, 0],
+    [0, 1, 1, 0, 0],
+    [0, -1, 1, 2, 2],
+    [2, -1, -1, 2, 2],
+    [0, 0, 3, 2, 2],
+    [2, -1, 0, 2, 2],
+])
+
+
+def _series(table, x):
+    """sum of A * cos(B + C * x) over the rows of a periodic term table"""
+    s = numpy.zeros_like(x)
+    for a, b, c in table:
+        s += a * numpy.cos(b + c * x)
+    return s
+
+
+def _polynomial(tables, x):
+    """evaluate sum(series(table_i, x) * x ** i) / 1e8"""
+    s = numpy.zeros_like(x)
+    for table in reversed(tables):
+        s = s * x + _series(table, x)
+    return s / 1e8
+
+
+def julian_day(unixtime):
+    """ Julian day of UTC seconds since epoch
+    """
+    return numpy.asarray(unixtime, dtype=float) / 86400. + 2440587.5
+
+
+def heliocentric_position(jme):
+    """ Earth heliocentric longitude, latitude and radius vector
+
+    Args:
+        jme: julian ephemeris millennium
+
+    Returns:
+        longitude (deg, not reduced to [0, 360[), latitude (deg) and radius
+        vector (AU)
+    """
+    jme = numpy.asarray(jme, dtype=float)
+    longitude = numpy.degrees(
+        _polynomial((_L0, _L1, _L2, _L3, _L4, _L5), jme))
+    latitude = numpy.degrees(_polynomial((_B0, _B1), jme))
+    radius = _polynomial((_R0, _R1, _R2, _R3, _R4), jme)
+    return longitude, latitude, radius
+
+
+def nutation(jce):
+    """ Nutation in longitude and obliquity
+
+    Args:
+        jce: julian ephemeris century
+
+    Returns:
+        nutation in longitude and nutation in obliquity (deg)
+    """
+    jce = numpy.asarray(jce, dtype=float)
+    # mean elongation of the moon, mean anomaly of the sun and of the moon,
+    # moon argument of latitude and longitude of the moon ascending node
+    x = (297.85036 + jce * (445267.111480 + jce * (-0.0019142 + jce / 189474)),
+         357.52772 + jce * (35999.050340 + jce * (-0.0001603 - jce / 300000)),
+         134.96298 + jce * (477198.867398 + jce * (0.0086972 + jce / 56250)),
+         93.27191 + jce * (483202.017538 + jce * (-0.0036825 + jce / 327270)),
+         125.04452 + jce * (-1934.136261 + jce * (0.0020708 + jce / 450000)))
+    delta_psi = numpy.zeros_like(jce)
+    delta_epsilon = numpy.zeros_like(jce)
+    for (a, b, c, d), y in zip(_NUTATION_ABCD, _NUTATION_Y):
+        arg = numpy.radians(sum(yi * xi for yi, xi in zip(y, x) if yi != 0))
+        delta_psi += (a + b * jce) * numpy.sin(arg)
+        delta_epsilon += (c + d * jce) * numpy.cos(arg)
+    return delta_psi / 36000000., delta_epsilon / 36000000.
+
+
+def mean_obliquity(jme):
+    """ Mean obliquity of the ecliptic (arc seconds)
+    """
+    u = numpy.asarray(jme, dtype=float) / 10.
+    coefs = (84381.448, -4680.93, -1.55, 1999.25, -51.38, -249.67, -39.05,
+             7.12, 27.87, 5.79, 2.45)
+    e0 = numpy.zeros_like(u)
+    for c in reversed(coefs):
+        e0 = e0 * u + c
+    return e0
+
+
+def _ephemeris_terms(jde):
+    """ Geocentric sun longitude and latitude (deg), earth radius vector (AU),
+    nutation in longitude and true obliquity of the ecliptic (deg) at given
+    julian ephemeris days. These terms only depend on time.
+    """
+    jce = (jde - _J2000) / 36525.
+    jme = jce / 10.
+    longitude, latitude, radius = heliocentric_position(jme)
+    delta_psi, delta_epsilon = nutation(jce)
+    epsilon = mean_obliquity(jme) / 3600. + delta_epsilon
+    return longitude + 180, -latitude, radius, delta_psi, epsilon
+
+
+def _interpolated_ephemeris_terms(jde, step):
+    """ Evaluate ephemeris terms on a regular grid of nodes spaced by step (s)
+    and interpolate them linearly at jde. Falls back to direct evaluation if
+    there are fewer dates than nodes.
+    """
+    if step is None or jde.size == 0:
+        return _ephemeris_terms(jde)
+    h = step / 86400.
+    start = numpy.floor(numpy.nanmin(jde) / h) * h
+    n = int(numpy.ceil((numpy.nanmax(jde) - start) / h)) + 1
+    if n < 2 or n >= jde.size:
+        return _ephemeris_terms(jde)
+    nodes = start + numpy.arange(n) * h
+    return tuple(numpy.interp(jde, nodes, x) for x in _ephemeris_terms(nodes))
+
+
+def altitude_pressure(altitude):
+    """ Standard atmosphere air pressure (Pa) at a given altitude (m)
+    """
+    return 100 * ((44331.514 - altitude) / 11880.516) ** (1 / 0.1902632)
+
+
+def earth_sun_distance(unixtime, delta_t=67., step=3600):
+    """ Earth-sun distance (AU)
+
+    Args:
+        unixtime: UTC seconds since epoch
+        delta_t: difference (s) between terrestrial time and UT
+        step: spacing (s) of the nodes at which time-only terms are evaluated
+         before linear interpolation (see solar_position).
+    """
+    jde = julian_day(unixtime) + numpy.asarray(delta_t) / 86400.
+    return _interpolated_ephemeris_terms(jde, step)[2]
+
+
+def refraction(elevation, pressure=101325., temperature=12.,
+               atmos_refract=0.5667):
+    """ Atmospheric refraction correction (deg) of the topocentric elevation
+
+    Args:
+        elevation: topocentric elevation without refraction (deg)
+        pressure, temperature, atmos_refract: see solar_position
+
+    Returns:
+        the correction to add to elevation. It is zero when the sun is below
+        the horizon, at -(0.26667 + atmos_refract) deg.
+    """
+    elevation = numpy.asarray(elevation, dtype=float)
+    above = elevation >= -(0.26667 + atmos_refract)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        h = numpy.radians(elevation + 10.3 / (elevation + 5.11))
+        delta_e = ((pressure / 101000.) * (283. / (273 + temperature)) *
+                   1.02 / (60 * numpy.tan(h)))
+    return numpy.where(above, delta_e, 0)
+
+
+def solar_position(unixtime, latitude, longitude, altitude=0,
+                   pressure=101325., temperature=12., delta_t=67.,
+                   atmos_refract=0.5667, step=3600):
+    """ Topocentric sun position with the NREL Solar Position Algorithm
+
+    Args:
+        unixtime: array of UTC seconds since epoch
+        latitude: (float) latitude (deg)
+        longitude: (float) longitude (deg, positive east)
+        altitude: (float) altitude above sea level (m)
+        pressure: (float) air pressure (Pa), used for refraction
+        temperature: (float) air temperature (Celsius), used for refraction
+        delta_t: difference (s) between terrestrial time and UT (see
+         https://maia.usno.navy.mil/products/deltaT)
+        atmos_refract: (float) atmospheric refraction at sunrise and sunset
+         (deg)
+        step: (float) spacing (s) of the nodes at which the time-only terms
+         (heliocentric position, nutation, obliquity) are evaluated and then
+         linearly interpolated at the requested dates. These terms are smooth
+         and one hour nodes keep interpolation errors below 1e-6 deg, while
+         making the cost per date independent of the size of the periodic
+         term tables. If None, all terms are evaluated at every date.
+
+    Returns:
+        a dict of arrays: 'apparent_zenith', 'zenith', 'apparent_elevation',
+        'elevation', 'azimuth' (deg, from North, positive clockwise) and
+        'equation_of_time' (minutes)
+    """
+    jd = julian_day(unixtime)
+    jde = jd + numpy.asarray(delta_t) / 86400.
+    theta, beta, radius, delta_psi, epsilon = _interpolated_ephemeris_terms(
+        jde, step)
+    jc = (jd - _J2000) / 36525.
+    jme = (jde - _J2000) / 365250.
+
+    # geocentric sun right ascension and declination
+    lamd = numpy.radians(theta + delta_psi - 20.4898 / (3600 * radius))
+    eps = numpy.radians(epsilon)
+    beta = numpy.radians(beta)
+    alpha = numpy.degrees(numpy.arctan2(
+        numpy.sin(lamd) * numpy.cos(eps) - numpy.tan(beta) * numpy.sin(eps),
+        numpy.cos(lamd))) % 360
+    delta = numpy.arcsin(numpy.sin(beta) * numpy.cos(eps) + numpy.cos(beta) *
+                         numpy.sin(eps) * numpy.sin(lamd))
+
+    # apparent sidereal time and observer local hour angle
+    v0 = (280.46061837 + 360.98564736629 * (jd - _J2000) +
+          jc ** 2 * (0.000387933 - jc / 38710000)) % 360
+    v = v0 + delta_psi * numpy.cos(eps)
+    h = numpy.radians((v + longitude - alpha) % 360)
+
+    # topocentric corrections (parallax)
+    lat = numpy.radians(latitude)
+    xi = numpy.radians(8.794 / (3600 * radius))
+    u = numpy.arctan(0.99664719 * numpy.tan(lat))
+    x = numpy.cos(u) + altitude / 6378140 * numpy.cos(lat)
+    y = 0.99664719 * numpy.sin(u) + altitude / 6378140 * numpy.sin(lat)
+    delta_alpha = numpy.arctan2(-x * numpy.sin(xi) * numpy.sin(h),
+                                numpy.cos(delta) - x * numpy.sin(xi) *
+                                numpy.cos(h))
+    delta_prime = numpy.arctan2(
+        (numpy.sin(delta) - y * numpy.sin(xi)) * numpy.cos(delta_alpha),
+        numpy.cos(delta) - x * numpy.sin(xi) * numpy.cos(h))
+    h_prime = h - delta_alpha
+
+    # elevation and refraction
+    e0 = numpy.degrees(numpy.arcsin(
+        numpy.sin(lat) * numpy.sin(delta_prime) +
+        numpy.cos(lat) * numpy.cos(delta_prime) * numpy.cos(h_prime)))
+    e = e0 + refraction(e0, pressure, temperature, atmos_refract)
+
+    # azimuth, from north positive clockwise
+    gamma = numpy.degrees(numpy.arctan2(
+        numpy.sin(h_prime),
+        numpy.cos(h_prime) * numpy.sin(lat) -
+        numpy.tan(delta_prime) * numpy.cos(lat)))
+    azimuth = (gamma + 180) % 360
+
+    # equation of time
+    m = 280.4664567 + jme * (360007.6982779 + jme * (0.03032028 + jme * (
+        1 / 49931. + jme * (-1 / 15300. - jme / 2000000.))))
+    eot = 4 * ((m - 0.0057183 - alpha + delta_psi * numpy.cos(eps)) % 360)
+    eot = eot - 1440 * (eot > 20)
+
+    return {'apparent_zenith': 90 - e, 'zenith': 90 - e0,
+            'apparent_elevation': e, 'elevation': e0, 'azimuth': azimuth,
+            'equation_of_time': eot}
@@ -15,9 +15,14 @@
 """
 
 from __future__ import division
-import pandas
 import numpy
 
+from openalea.astk.timeseries import (quadrature as time_quadrature,
+                                      calendar, localised_dates)
+from openalea.astk._lazy import lazy_module
+
+pandas = lazy_module('pandas')
+
 # default location and dates
 _day = '2000-06-21'
 _timezone = 'Europe/Paris'
@@ -165,6 +170,74 @@ def hour_angle(hUTC, dayofyear, year, longitude):
     return ha
 
 
+def solar_ephemeris(hUTC, dayofyear, year, latitude, longitude):
+    """ Sun ephemeris, computed in a single pass
+
+    This is a fused version of julian_date, ecliptic_longitude, declination,
+    right_ascension, hour_angle, sun_elevation and sun_azimuth, that evaluates
+    shared orbital terms only once per date.
+
+    Args:
+        hUTC: fractional hour (UTC time)
+        dayofyear (int):
+        year (int):
+        latitude (float): the location latitude (degrees)
+        longitude (float): the location longitude (degrees, east positive)
+
+    Returns:
+        a dict of arrays with keys:
+            - 'julian_date'
+            - 'ecliptic_longitude' (degrees)
+            - 'obliquity' : obliquity of the ecliptic (degrees)
+            - 'right_ascension' (degrees)
+            - 'declination' (radians)
+            - 'hour_angle' (hour)
+            - 'elevation' (degrees)
+            - 'azimuth' (degrees, from North, positive clockwise)
+
+    Details:
+        World Meteorological Organization (2006).Guide to meteorological
+        instruments and methods of observation. Geneva, Switzerland.
+        Michalsky, J. J. "The Astronomical Almanac's Algorithm for Approximate
+         Solar Position (1950-2050)". Solar Energy. Vol. 40, No. 3, 1988;
+         pp. 227-235, USA
+    """
+    jd = julian_date(hUTC, dayofyear, year)
+    n = jd - 2451545
+    # mean longitude and mean anomaly (deg)
+    L = numpy.mod(280.46 + 0.9856474 * n, 360)
+    g = numpy.radians(numpy.mod(357.528 + 0.9856003 * n, 360))
+    l = L + 1.915 * numpy.sin(g) + 0.02 * numpy.sin(2 * g)
+    obliquity = 23.439 - 0.0000004 * n
+    obl = numpy.radians(obliquity)
+    lr = numpy.radians(l)
+    sinl = numpy.sin(lr)
+    cosl = numpy.cos(lr)
+    dec = numpy.arcsin(numpy.sin(obl) * sinl)
+    ra = numpy.degrees(numpy.arctan(numpy.cos(obl) * sinl / cosl))
+    ra = ra + numpy.where(cosl >= 0, 0, 180)
+    gmst = numpy.mod(6.697375 + 0.0657098242 * n + hUTC, 24)
+    lmst = numpy.mod(gmst + longitude / 15., 24)
+    ha = numpy.mod(lmst - ra / 15. + 12, 24) - 12
+    lat = numpy.radians(latitude)
+    har = numpy.radians(ha * 15)
+    sindec = numpy.sin(dec)
+    cosdec = numpy.cos(dec)
+    el = numpy.degrees(numpy.arcsin(sindec * numpy.sin(lat) + cosdec * numpy.cos(
+        lat) * numpy.cos(har)))
+    elr = numpy.radians(el)
+    sinaz = -cosdec * numpy.sin(har) / numpy.cos(elr)
+    # use method of Michalsky to get az from sinaz
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        elc = numpy.arcsin(sindec / numpy.sin(lat))
+    az = numpy.degrees(numpy.arcsin(sinaz))
+    az = numpy.where(elr >= elc, 180 - az, numpy.where(har > 0, 360 + az, az))
+
+    return {'julian_date': jd, 'ecliptic_longitude': l, 'obliquity': obliquity,
+            'right_ascension': ra, 'declination': dec, 'hour_angle': ha,
+            'elevation': el, 'azimuth': az}
+
+
 def sun_elevation(hUTC, dayofyear, year, latitude, longitude):
     """ Sun elevation
 
@@ -182,13 +255,8 @@ def sun_elevation(hUTC, dayofyear, year, latitude, longitude):
         World Meteorological Organization (2006).Guide to meteorological
         instruments and methods of observation. Geneva, Switzerland.
     """
-    dec = declination(hUTC, dayofyear, year)
-    lat = numpy.radians(latitude)
-    ha = numpy.radians(hour_angle(hUTC, dayofyear, year, longitude) * 15)
-    sinel = numpy.sin(dec) * numpy.sin(lat) + numpy.cos(dec) * numpy.cos(
-        lat) * numpy.cos(ha)
-
-    return numpy.degrees(numpy.arcsin(sinel))
+    return solar_ephemeris(hUTC, dayofyear, year, latitude, longitude)[
+        'elevation']
 
 
 def sun_azimuth(hUTC, dayofyear, year, latitude, longitude):
@@ -209,17 +277,8 @@ def sun_azimuth(hUTC, dayofyear, year, latitude, longitude):
          Solar Position (1950-2050)". Solar Energy. Vol. 40, No. 3, 1988;
          pp. 227-235, USA
     """
-    dec = declination(hUTC, dayofyear, year)
-    lat = numpy.radians(latitude)
-    ha = numpy.radians(hour_angle(hUTC, dayofyear, year, longitude) * 15)
-    el = numpy.radians(sun_elevation(hUTC, dayofyear, year, latitude, longitude))
-    sinaz = -numpy.cos(dec) * numpy.sin(ha) / numpy.cos(el)
-    # use method of Michalsky to get az from sinaz
-    elc = numpy.arcsin(numpy.sin(dec) / numpy.sin(lat))
-    az = numpy.degrees(numpy.arcsin(sinaz))
-    az = numpy.where(el >= elc, 180 - az, numpy.where(ha > 0, 360 + az, az))
-
-    return az
+    return solar_ephemeris(hUTC, dayofyear, year, latitude, longitude)[
+        'azimuth']
 
 
 def eot(hUTC, dayofyear, year):
@@ -247,33 +306,147 @@ def eot(hUTC, dayofyear, year):
     return (L - ra) / 15.
 
 
-def daylength(dayofyear, year, latitude):
-    """ estimate of daylength"""
+def _hour_angle_at_elevation(elevation, declination, latitude):
+    """ Hour angle (hour, positive) at which the sun crosses a given elevation
+    (degrees). Returns 0 if the sun never rises above this elevation during the
+    day, and 12 if it never sets below.
+    """
+    lat = numpy.radians(latitude)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cosh = (numpy.sin(numpy.radians(elevation)) - numpy.sin(lat) *
+                numpy.sin(declination)) / (numpy.cos(lat) *
+                                           numpy.cos(declination))
+    return numpy.degrees(numpy.arccos(numpy.clip(cosh, -1, 1))) / 15.
+
+
+def sun_events(dayofyear, year, latitude, longitude=0, h0=-0.833):
+    """ Sunrise, sunset, solar noon, daylength and daily integral of elevation
+    sine, computed analytically
+
+    All arguments are arrays broadcastable together, e.g. dayofyear and year
+    of shape (n_days,) and latitude and longitude of shape (n_sites, 1) give
+    (n_sites, n_days) arrays.
 
+    Args:
+        dayofyear (int): the day of year
+        year (int): the year
+        latitude (float): the location latitude (degrees)
+        longitude (float): the location longitude (degrees, east positive)
+        h0 (float): the sun elevation (degrees) defining sunrise and sunset.
+         Default (-0.833) accounts for refraction and the apparent radius of
+         the solar disc. Use 0 for the astronomical (geometric) day.
+
+    Returns:
+        a dict of arrays with keys:
+            - 'noon' : solar noon (fractional hour, UTC time)
+            - 'sunrise', 'sunset' : (fractional hour, UTC time), nan during
+            polar days and nights
+            - 'daylength' : (hours)
+            - 'sinel_integral' : the integral over the day of the sine of the
+            (geometric) sun elevation, when positive (seconds)
+
+        Times are given relative to 0h UTC of the day, and may fall outside
+        [0, 24[ for locations far from the Greenwich meridian.
+
+    Details:
+        Sun declination and hour angle are taken from solar_ephemeris. Solar
+        noon and sunrise and sunset are refined once with declination evaluated
+        at their approximate times.
+    """
+    dayofyear, year, latitude, longitude = numpy.broadcast_arrays(
+        *(numpy.asarray(x, dtype=float) for x in
+          (dayofyear, year, latitude, longitude)))
+    # solar noon
+    noon = 12 - longitude / 15.
+    for _ in range(2):
+        ha = solar_ephemeris(noon, dayofyear, year, latitude, longitude)[
+            'hour_angle']
+        noon = noon - ha
+    dec = solar_ephemeris(noon, dayofyear, year, latitude, longitude)[
+        'declination']
+    h = _hour_angle_at_elevation(h0, dec, latitude)
+    # refine sunrise and sunset with declination at the event
+    events = []
+    for sign in (-1, 1):
+        t = noon + sign * h
+        eph = solar_ephemeris(t, dayofyear, year, latitude, longitude)
+        ht = _hour_angle_at_elevation(h0, eph['declination'], latitude)
+        events.append(t + sign * ht - eph['hour_angle'])
+    sunrise, sunset = events
+    daylength = numpy.where((h > 0) & (h < 12), sunset - sunrise, 2 * h)
+    polar = (h <= 0) | (h >= 12)
+    sunrise = numpy.where(polar, numpy.nan, sunrise)
+    sunset = numpy.where(polar, numpy.nan, sunset)
+    # integral of the sine of geometric elevation over the day
     lat = numpy.radians(latitude)
-    dec = declination(12, dayofyear, year)
-    return 12 + 24 / numpy.pi * numpy.arcsin(numpy.tan(lat) - numpy.tan(dec))
+    hs = numpy.radians(_hour_angle_at_elevation(0, dec, latitude) * 15)
+    sinel = 3600 * 24 / numpy.pi * (hs * numpy.sin(lat) * numpy.sin(dec) +
+                                     numpy.cos(lat) * numpy.cos(dec) *
+                                     numpy.sin(hs))
+    return {'noon': noon, 'sunrise': sunrise, 'sunset': sunset,
+            'daylength': daylength, 'sinel_integral': sinel}
+
+
+def daylength(dayofyear, year, latitude, h0=0):
+    """ Daylength (hours)
+
+    Args:
+        dayofyear (int): the day of year
+        year (int): the year
+        latitude (float): the location latitude (degrees)
+        h0 (float): the sun elevation (degrees) defining sunrise and sunset
+         (see sun_events).
+    """
+    return sun_events(dayofyear, year, latitude, h0=h0)['daylength']
 
 
 def sinel_integral(dayofyear, year, latitude):
-    """ estimate the daily integral of elevation sine"""
+    """ Daily integral (s) of the sine of sun elevation (see sun_events)"""
+    return sun_events(dayofyear, year, latitude)['sinel_integral']
 
-    lat = numpy.radians(latitude)
-    dec = declination(12, dayofyear, year)
-    d = daylength(dayofyear, year, latitude)
-    return 3600 * (d * numpy.sin(lat) * numpy.sin(dec) + 24. /
-                   numpy.pi * numpy.cos(lat) * numpy.cos(dec) * numpy.sqrt(
-                       1 - numpy.tan(lat) ** 2 * numpy.tan(dec) ** 2))
+
+def interval_mean_position(elevation, azimuth, weights):
+    """Sun position representative of time intervals, from positions
+    evaluated at quadrature nodes
+
+    Args:
+        elevation: a (n_intervals, n_nodes) array of sun elevations (deg)
+        azimuth: a (n_intervals, n_nodes) array of sun azimuths (deg)
+        weights: a (n_intervals, n_nodes) array of quadrature weights, summing
+         to one for each interval
+
+    Returns:
+        elevation, azimuth arrays. Elevation is the one whose sine equals the
+        interval mean of the (positive part of) sine of elevation, i.e. the
+        mean cosine of zenith that scales direct horizontal irradiance.
+        Azimuth is the circular mean of azimuths weighted by the sine of
+        elevation. For intervals during which the sun stays below the horizon,
+        mean elevation and azimuth are returned.
+    """
+    el = numpy.radians(elevation)
+    az = numpy.radians(azimuth)
+    sinel = numpy.maximum(numpy.sin(el), 0) * weights
+    mean_sinel = sinel.sum(axis=1)
+    day = mean_sinel > 0
+    w = numpy.where(day[:, None], sinel, weights)
+    mean_az = numpy.arctan2((w * numpy.sin(az)).sum(axis=1),
+                            (w * numpy.cos(az)).sum(axis=1))
+    mean_el = numpy.where(day, numpy.arcsin(numpy.minimum(mean_sinel, 1)),
+                          (weights * el).sum(axis=1))
+    return numpy.degrees(mean_el), numpy.mod(numpy.degrees(mean_az), 360)
 
 
 def sun_position(dates=None, daydate=_day, latitude=_latitude,
                  longitude=_longitude,
-                 altitude=_altitude, timezone=_timezone, filter_night=True):
+                 altitude=_altitude, timezone=_timezone, filter_night=True,
+                 interval_mean=False, label='left', quadrature=4):
     """ Sun position
 
     Args:
         dates: a pandas.DatetimeIndex specifying the dates at which sun position
         is required.If None, daydate is used and one position per hour is generated
+        Dates can also be given as UTC epoch seconds or numpy datetime64 values
+        (see timeseries.utc_epoch), that skip any timezone handling.
         daydate: (str) yyyy-mm-dd (not used if dates is not None).
         latitude: float
         longitude: float
@@ -282,26 +455,37 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude,
         dates is not already localised.
         This args is not used if dates are already localised
         filter_night (bool) : Should positions of sun during night be filtered ?
+        interval_mean (bool): If True, dates are considered as labels of time
+        intervals (e.g. for hourly mean irradiance data) and the returned
+        position is the interval mean position (see interval_mean_position),
+        integrated with a Gauss-Legendre quadrature.
+        label (str): 'left' if dates label the start of their time interval,
+        'right' if they label its end (only used if interval_mean is True).
+        quadrature (int): the number of quadrature nodes per time interval
+        (only used if interval_mean is True)
 
     Returns:
         a pandas dataframe with sun position at requested dates indexed by
-        localised dates. Sun azimtuth is given from North, positive clockwise.
+        localised dates (or by the epoch dates). Sun azimtuth is given from
+        North, positive clockwise.
     """
 
-    if dates is None:
-        dates = pandas.date_range(daydate, periods=24, freq='h', tz=timezone)
+    times = localised_dates(dates, daydate, timezone)
 
-    if dates.tz is None:
-        times = dates.tz_localize(timezone)
+    if interval_mean:
+        nodes, weights = time_quadrature(times, n=quadrature, label=label)
+        sunpos = sun_position(nodes, latitude=latitude, longitude=longitude,
+                              altitude=altitude, filter_night=False)
+        shape = weights.shape
+        el, az = interval_mean_position(sunpos.elevation.values.reshape(shape),
+                                        sunpos.azimuth.values.reshape(shape),
+                                        weights)
     else:
-        times = dates
-
-    d = times.tz_convert('UTC')
-    hUTC = d.hour + d.minute / 60.
-    dayofyear = d.dayofyear
-    year = d.year
-    el = sun_elevation(hUTC, dayofyear, year, latitude, longitude)
-    az = sun_azimuth(hUTC, dayofyear, year, latitude, longitude)
+        d = calendar(times)
+        ephemeris = solar_ephemeris(d['hour'], d['dayofyear'], d['year'],
+                                    latitude, longitude)
+        el = ephemeris['elevation']
+        az = ephemeris['azimuth']
     sunpos = pandas.DataFrame(
         {'elevation': el, 'azimuth': az, 'zenith': 90 - el}, index=times)
 
@@ -318,22 +502,17 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
         Args:
             dates: a pandas.DatetimeIndex specifying the dates at which output
             is required.If None, daydate is used and one position per hour is generated
+            Epoch dates are also accepted (see sun_position).
             daydate: (str) yyyy-mm-dd (not used if dates is not None).
             solar_constant: (float)
             method: one method provided by pvlib
             timezone: a string identifying the timezone to be associated to dates if
              dates is not already localised.
     """
-    if dates is None:
-        dates = pandas.date_range(daydate, periods=24, freq='h', tz=timezone)
-
-    if dates.tz is None:
-        times = dates.tz_localize(timezone)
-    else:
-        times = dates
+    times = localised_dates(dates, daydate, timezone)
 
     Io = None
-    dayofyear = times.tz_convert('UTC').dayofyear
+    dayofyear = calendar(times)['dayofyear']
     B = 2 * numpy.pi * (dayofyear - 1) / 365.
     if method == 'asce':
         # R. G. Allen, Environmental, and E. Water Resources institute .
@@ -345,9 +524,12 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
         # Approx Spencer 1971
         # J. W. Spencer, Fourier series representation of the sun,
         # Search, vol. 2, p. 172, 1971
+        # The cos(2B) term is positive (Iqbal, An introduction to solar
+        # radiation, 1983, eq. 1.2.1), as in pvlib. Up to astk 2.4.1 it was
+        # negative, which underestimated Io by about 2 W.m-2.
         Io = solar_constant * (
         1.00011 + 0.034221 * numpy.cos(B) + 0.00128 * numpy.sin(
-            B) - 0.000719 * numpy.cos(2 * B) + 0.000077 * numpy.sin(2 * B))
+            B) + 0.000719 * numpy.cos(2 * B) + 0.000077 * numpy.sin(2 * B))
     else:
         raise ValueError('unrecognised method: ' + method)
 
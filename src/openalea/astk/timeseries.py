@@ -0,0 +1,390 @@
+# -*- python -*-
+#
+#       Copyright 2016-2025 Inria - CIRAD - INRAe
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea/astk
+#
+#       File author(s): Christian Fournier <christian.fournier@inrae.fr>
+#
+# ==============================================================================
+""" Time integration of irradiance time series sampled at arbitrary, possibly
+irregular, time steps
+"""
+from itertools import chain
+
+import numpy
+
+from openalea.astk._lazy import lazy_module
+
+pandas = lazy_module('pandas')
+
+_NS = 1000000000
+# number of leading dates of a streamed series used to infer its time step
+_STEP_SAMPLES = 100
+
+
+def is_epoch(dates):
+    """ Are dates given as UTC epoch seconds (integers or floats, e.g. as
+    returned by pandas.Timestamp.timestamp) or numpy datetime64 values (UTC),
+    rather than pandas dates ?
+    """
+    if dates is None or isinstance(dates, (pandas.DatetimeIndex,
+                                           pandas.Timestamp)):
+        return False
+    return numpy.asarray(dates).dtype.kind in 'iufM'
+
+
+def utc_epoch(dates, timezone='UTC'):
+    """ UTC epoch seconds of dates
+
+    This is the conversion to use once, at the I/O boundary, before calling
+    solar and irradiance functions in hot loops.
+
+    Args:
+        dates: a pandas datetime index (or anything pandas.DatetimeIndex
+         accepts), numpy datetime64 values (UTC) or epoch seconds
+        timezone: the time zone used to localise naive pandas dates
+
+    Returns:
+        an int64 array of seconds since 1970-01-01 UTC (fractions of seconds
+        of float epochs and datetime64 values are floored)
+    """
+    if is_epoch(dates):
+        return utc_nanoseconds(dates) // _NS
+    dates = pandas.DatetimeIndex(numpy.atleast_1d(dates))
+    if dates.tz is None:
+        dates = dates.tz_localize(timezone)
+    return utc_nanoseconds(dates) // _NS
+
+
+def utc_nanoseconds(dates):
+    """UTC nanoseconds since epoch (int64) of a pandas datetime index, of numpy
+    datetime64 values or of epoch seconds"""
+    if is_epoch(dates):
+        values = numpy.asarray(dates)
+        if values.dtype.kind == 'M':
+            return values.astype('datetime64[ns]').astype(numpy.int64)
+        if values.dtype.kind == 'f':
+            return numpy.round(values * _NS).astype(numpy.int64)
+        return values.astype(numpy.int64) * _NS
+    return numpy.asarray(
+        pandas.DatetimeIndex(dates).values.astype('datetime64[ns]')).astype(
+        numpy.int64)
+
+
+def datetime_index(dates):
+    """ a pandas datetime index of dates (UTC for epoch dates)"""
+    if is_epoch(dates):
+        return pandas.to_datetime(utc_nanoseconds(dates), utc=True)
+    return pandas.DatetimeIndex(dates)
+
+
+def localised_dates(dates, daydate, timezone):
+    """ dates as a localised pandas.DatetimeIndex, or epoch dates left as is
+
+    Args:
+        dates: a pandas datetime index or timestamp, epoch dates (see is_epoch)
+         or None
+        daydate: (str) yyyy-mm-dd, used to generate hourly dates if dates is
+         None
+        timezone: the time zone used to localise naive pandas dates
+    """
+    if dates is None:
+        dates = pandas.date_range(daydate, periods=24, freq='h', tz=timezone)
+    if is_epoch(dates):
+        return numpy.atleast_1d(dates)
+    if dates.tz is None:
+        dates = dates.tz_localize(timezone)
+    if isinstance(dates, pandas.Timestamp):
+        dates = pandas.DatetimeIndex([dates])
+    return dates
+
+
+def calendar(dates):
+    """ UTC calendar fields of dates, derived by integer arithmetic
+
+    Args:
+        dates: epoch seconds, numpy datetime64 values or a pandas datetime index
+
+    Returns:
+        a dict of arrays with keys 'year', 'month', 'day', 'dayofyear' (int)
+        and 'hour' (fractional hour, UTC time)
+
+    Details:
+        Hinnant, H. "chrono-Compatible Low-Level Date Algorithms",
+        http://howardhinnant.github.io/date_algorithms.html (civil_from_days)
+    """
+    if is_epoch(dates) and numpy.asarray(dates).dtype.kind in 'iu':
+        # avoid nanosecond overflow for dates far from 1970
+        seconds = numpy.asarray(dates).astype(numpy.int64)
+        fraction = 0
+    else:
+        ns = utc_nanoseconds(dates)
+        seconds = ns // _NS
+        fraction = (ns - seconds * _NS) / _NS
+    days = seconds // 86400
+    hour = (seconds - days * 86400 + fraction) / 3600.
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)  # from March 1st
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = numpy.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    # days from the 1st of January
+    y = year - 1
+    era = y // 400
+    yoe = y - era * 400
+    jan1 = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + 306 - 719468
+    return {'year': year, 'month': month, 'day': day,
+            'dayofyear': days - jan1 + 1, 'hour': hour}
+
+
+def _nominal_step(t, default):
+    """median time step (ns) of a sorted time array"""
+    if len(t) < 2:
+        return int(default * _NS)
+    return int(numpy.median(numpy.diff(t)))
+
+
+def _intervals(t, label, step, max_step, previous=None, following=None):
+    """Start and end (ns) of the time intervals associated with sorted dates
+
+    Args:
+        t: sorted array of dates (ns)
+        label: 'left' if dates label the start of their interval, 'right' if
+         they label its end
+        step: nominal time step (ns), used at the boundaries of the series and
+         in place of gaps
+        max_step: intervals longer than max_step (ns) are considered as gaps in
+         the series
+        previous: date preceding t[0], if any
+        following: date following t[-1], if any
+    """
+    if label == 'left':
+        a = t
+        b = numpy.append(t[1:], t[-1] + step if following is None else following)
+        gap = (b - a) > max_step
+        b = numpy.where(gap, a + step, b)
+    elif label == 'right':
+        a = numpy.insert(t[:-1], 0, t[0] - step if previous is None else previous)
+        b = t
+        gap = (b - a) > max_step
+        a = numpy.where(gap, b - step, a)
+    else:
+        raise ValueError('label should be one of left or right, not ' + label)
+    return a, b
+
+
+def time_weights(dates, label='left', max_step=None, default=3600):
+    """Duration (s) of the time intervals represented by the dates of a series
+
+    Args:
+        dates: a sorted pandas datetime index, or sorted epoch dates (see
+         is_epoch)
+        label (str): 'left' (default) if dates label the start of their time
+         interval, 'right' if they label its end.
+        max_step: the longest duration (s) of a time interval. Longer intervals
+         are considered as gaps in the series (missing data, nights filtered
+         out) and are replaced by the median time step. If None (default),
+         twice the median time step is used.
+        default: the duration (s) used for series of length one.
+
+    Returns:
+        an array of time weights (s), one per date
+    """
+    if len(dates) == 0:
+        return numpy.zeros(0)
+    t = utc_nanoseconds(dates)
+    step = _nominal_step(t, default)
+    if max_step is None:
+        max_step = 2 * step
+    else:
+        max_step = int(max_step * _NS)
+    a, b = _intervals(t, label, step, max_step)
+    return (b - a) / _NS
+
+
+def quadrature(dates, n=4, label='left', max_step=None, default=3600):
+    """Gauss-Legendre quadrature nodes and weights over the time intervals
+    represented by the dates of a series
+
+    Args:
+        dates: a sorted pandas datetime index, or sorted epoch dates (see
+         is_epoch)
+        n: the number of quadrature nodes per time interval
+        label, max_step, default: see time_weights
+
+    Returns:
+        a pandas datetime index of len(dates) * n nodes (the n nodes of the
+        first interval, then those of the second, ...) and a (len(dates), n)
+        array of weights, normalised to sum to one for each interval. Nodes are
+        numpy datetime64 values (UTC) for epoch dates.
+    """
+    epoch = is_epoch(dates)
+    if not epoch:
+        dates = pandas.DatetimeIndex(dates)
+    t = utc_nanoseconds(dates)
+    step = _nominal_step(t, default)
+    if max_step is None:
+        max_step = 2 * step
+    else:
+        max_step = int(max_step * _NS)
+    a, b = _intervals(t, label, step, max_step)
+    x, w = numpy.polynomial.legendre.leggauss(n)
+    nodes = a[:, None] + ((x + 1) / 2)[None, :] * (b - a)[:, None]
+    nodes = numpy.round(nodes).astype(numpy.int64).ravel()
+    if epoch:
+        return nodes.astype('datetime64[ns]'), numpy.tile(w / 2,
+                                                          (len(dates), 1))
+    nodes = pandas.to_datetime(nodes, utc=True)
+    if dates.tz is None:
+        nodes = nodes.tz_localize(None)
+    else:
+        nodes = nodes.tz_convert(dates.tz)
+    return nodes, numpy.tile(w / 2, (len(dates), 1))
+
+
+def _bin_contributions(a, b, values, width):
+    """split [a, b) intervals over the regular bins of a given width and
+    return bin indices, time weights (ns) and weighted values"""
+    first = a // width
+    last = (b - 1) // width
+    n = last - first + 1
+    rows = numpy.repeat(numpy.arange(len(a)), n)
+    bins = numpy.repeat(first, n) + (numpy.arange(len(rows)) - numpy.repeat(
+        numpy.cumsum(n) - n, n))
+    start = numpy.maximum(a[rows], bins * width)
+    end = numpy.minimum(b[rows], (bins + 1) * width)
+    w = (end - start).astype(float)
+    x = values[rows]
+    valid = ~numpy.isnan(x)
+    return bins, numpy.where(valid, w[:, None], 0), numpy.where(valid, x, 0) * w[:, None]
+
+
+def _reduce_bins(bins, w, wx):
+    """sum time weights and weighted values by bins"""
+    uniq, inverse = numpy.unique(bins, return_inverse=True)
+    sw = numpy.zeros((len(uniq), w.shape[1]))
+    swx = numpy.zeros((len(uniq), w.shape[1]))
+    numpy.add.at(sw, inverse, w)
+    numpy.add.at(swx, inverse, wx)
+    return uniq, sw, swx
+
+
+def stream_aggregate(chunks, freq='h', label='left', step=None, max_step=None):
+    """Time-weighted averages of a chunked time series over regular model
+    time steps
+
+    Each value of the input series is weighted by the exact duration of its
+    time interval that falls within the model time step, so that irregular
+    and high-frequency (e.g. minute) series are integrated without
+    resampling. Only one chunk and the model time steps still open are kept in
+    memory, which allows processing multi-year minute series.
+
+    Args:
+        chunks: an iterable of datetime indexed dataframes of numeric values,
+         sorted in time (e.g. as returned by pandas.read_csv with a chunksize)
+        freq: the model time step, as a fixed pandas frequency (e.g. 'h', '30min').
+         Model time steps are aligned on UTC midnight.
+        label (str): 'left' (default) if input dates label the start of their
+         time interval, 'right' if they label its end.
+        step: the nominal duration (s) of input time intervals, used for the
+         open interval at the end (label='left') or start (label='right') of
+         the series and in place of gaps. If None (default), the median time
+         step of the first 100 dates of the series is used, whatever their
+         distribution among chunks, so that results do not depend on chunking.
+        max_step: the longest duration (s) of an input time interval (see
+         time_weights). If None (default), twice step is used.
+
+    Yields:
+        dataframes of time-weighted means indexed by the start of model time steps
+    """
+    width = pandas.tseries.frequencies.to_offset(freq).nanos
+    columns = None
+    tz = None
+    pending = None  # last date and values of the previous chunk
+    open_bins = None  # partial sums of model time steps still accumulating
+
+    def _frame(bins, sw, swx):
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            mean = numpy.where(sw > 0, swx / sw, numpy.nan)
+        index = pandas.to_datetime(bins * width, utc=True)
+        if tz is None:
+            index = index.tz_localize(None)
+        else:
+            index = index.tz_convert(tz)
+        return pandas.DataFrame(mean, index=index, columns=columns)
+
+    def _contributions(t, x, previous=None, following=None):
+        a, b = _intervals(t, label, step, max_step, previous, following)
+        return _bin_contributions(a, b, x, width)
+
+    def _arrays():
+        nonlocal columns, tz
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if columns is None:
+                columns = chunk.columns
+                tz = pandas.DatetimeIndex(chunk.index).tz
+            yield utc_nanoseconds(chunk.index), chunk.loc[:, columns].to_numpy(dtype=float)
+
+    arrays = _arrays()
+    if step is None:
+        # leading chunks are merged until they hold enough dates to infer the step
+        head = []
+        for t, x in arrays:
+            head.append((t, x))
+            if sum(len(t) for t, _ in head) >= _STEP_SAMPLES:
+                break
+        if len(head) > 0:
+            t = numpy.concatenate([t for t, _ in head])
+            x = numpy.vstack([x for _, x in head])
+            arrays = chain([(t, x)], arrays)
+            step = _nominal_step(t[:_STEP_SAMPLES], width / _NS)
+    else:
+        step = int(step * _NS)
+    max_step = None if step is None else (2 * step if max_step is None else int(max_step * _NS))
+
+    for t, x in arrays:
+        if label == 'left':
+            if pending is not None:
+                t = numpy.insert(t, 0, pending[0])
+                x = numpy.vstack((pending[1], x))
+            pending = (t[-1], x[-1:])
+            if len(t) < 2:
+                continue
+            bins, w, wx = _contributions(t[:-1], x[:-1], following=t[-1])
+        else:
+            previous = None if pending is None else pending[0]
+            pending = (t[-1], x[-1:])
+            bins, w, wx = _contributions(t, x, previous=previous)
+        if open_bins is not None:
+            bins = numpy.concatenate((open_bins[0], bins))
+            w = numpy.vstack((open_bins[1], w))
+            wx = numpy.vstack((open_bins[2], wx))
+        bins, sw, swx = _reduce_bins(bins, w, wx)
+        # later intervals start at or after the last date of the chunk
+        done = bins < pending[0] // width
+        open_bins = (bins[~done], sw[~done], swx[~done])
+        if done.any():
+            yield _frame(bins[done], sw[done], swx[done])
+
+    if pending is None:
+        return
+    if label == 'left':
+        bins, w, wx = _contributions(numpy.array([pending[0]]), pending[1])
+        if open_bins is not None:
+            bins = numpy.concatenate((open_bins[0], bins))
+            w = numpy.vstack((open_bins[1], w))
+            wx = numpy.vstack((open_bins[2], wx))
+        open_bins = _reduce_bins(bins, w, wx)
+    if open_bins is not None and len(open_bins[0]) > 0:
+        yield _frame(*open_bins)
@@ -0,0 +1,48 @@
+import numpy
+from openalea.astk.colormap import (ColorMap, nan_to_zero, jet_colors, jet_lut,
+                                    grey_lut, lut_colors)
+
+
+def legacy_jet_colors(values, minval=None, maxval=None):
+    values = nan_to_zero(values)
+    if minval is None:
+        minval = min(values)
+    if maxval is None:
+        maxval = max(values)
+    cmap = ColorMap()
+    return [cmap(x, minval, maxval, 250., 20.) for x in values]
+
+
+def test_jet_colors():
+    rng = numpy.random.default_rng(0)
+    values = rng.normal(size=10000).tolist() + [numpy.nan, 0, 1, -1]
+    values += numpy.linspace(-3, 3, 601).tolist()
+    for bounds in ((None, None), (-1, 1), (0.5, 2), (-0.3, None), (1, 1)):
+        colors = jet_colors(values, *bounds)
+        assert colors == legacy_jet_colors(values, *bounds)
+        assert all(isinstance(c, int) for c in colors[0])
+    assert jet_colors(v for v in [1, 2, 3]) == legacy_jet_colors([1, 2, 3])
+    assert jet_colors([2, 2]) == legacy_jet_colors([2, 2])
+
+
+def test_lut_colors():
+    lut = jet_lut()
+    assert lut.shape == (256, 3)
+    assert lut.dtype == numpy.uint8
+    assert lut[0].tolist() == [20, 20, 250]
+    assert lut[-1].tolist() == [250, 20, 20]
+    assert grey_lut(3).tolist() == [[0, 0, 0], [127, 127, 127],
+                                    [255, 255, 255]]
+
+    values = numpy.linspace(0, 1, 256).reshape(16, 16)
+    colors = lut_colors(values)
+    assert colors.shape == (16, 16, 3)
+    numpy.testing.assert_array_equal(colors.reshape(-1, 3), lut)
+    values = numpy.array([numpy.nan, 2, 3, 4])
+    colors = lut_colors(values, grey_lut(), nan_color=(255, 0, 0))
+    assert colors.tolist() == [[255, 0, 0], [0, 0, 0], [128, 128, 128],
+                               [255, 255, 255]]
+    colors = lut_colors(values, grey_lut())
+    assert colors[:, 0].tolist() == [0, 128, 191, 255]
+    colors = lut_colors(values, grey_lut(), minval=3, maxval=3.5)
+    assert colors[:, 0].tolist() == [0, 0, 0, 255]
@@ -0,0 +1,64 @@
+import numpy
+import pytest
+
+from openalea.astk.data_access import montpellier_spring_2013
+from openalea.astk.sun_position import sun_position
+from openalea.astk.sun_position_astk import sun_extraradiation
+from openalea.astk.decomposition import erbs, disc, dirint, decompose
+from openalea.astk.sky_irradiance import actual_sky_irradiances
+
+
+def _sample():
+    df = montpellier_spring_2013()
+    sun = sun_position(dates=df.index, latitude=43.61, longitude=3.87,
+                       filter_night=False)
+    return df.index, df.ghi.values, sun.zenith.values
+
+
+def test_erbs():
+    pvlib = pytest.importorskip('pvlib')
+    dates, ghi, zenith = _sample()
+    dni, dhi = erbs(ghi, zenith, sun_extraradiation(dates).values)
+    ref = pvlib.irradiance.erbs(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni, ref.dni, atol=2)
+    numpy.testing.assert_allclose(dhi, ref.dhi, atol=2)
+
+
+def test_disc():
+    pvlib = pytest.importorskip('pvlib')
+    dates, ghi, zenith = _sample()
+    dni_extra = sun_extraradiation(dates, solar_constant=1370.).values
+    dni, kt, am = disc(ghi, zenith, dni_extra)
+    ref = pvlib.irradiance.disc(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni, ref.dni, atol=2)
+    numpy.testing.assert_allclose(kt, ref.kt, atol=0.005)
+
+
+def test_dirint():
+    pvlib = pytest.importorskip('pvlib')
+    dates, ghi, zenith = _sample()
+    dni_extra = sun_extraradiation(dates, solar_constant=1370.).values
+    dni = dirint(ghi, zenith, dni_extra)
+    ref = pvlib.irradiance.dirint(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni[zenith < 90], ref[zenith < 90], atol=2)
+    dni = dirint(ghi, zenith, dni_extra, use_delta_kt_prime=False, temp_dew=10)
+    ref = pvlib.irradiance.dirint(ghi, zenith, dates, use_delta_kt_prime=False,
+                                  temp_dew=10)
+    numpy.testing.assert_allclose(dni[zenith < 90], ref[zenith < 90], atol=2)
+
+
+def test_decompose():
+    dates, ghi, zenith = _sample()
+    for model in ('spitters', 'erbs', 'disc', 'dirint'):
+        df = decompose(ghi, zenith, dates, model=model)
+        day = zenith < 85
+        numpy.testing.assert_allclose(
+            df.ghi[day], df.dhi[day] + df.dni[day] * numpy.cos(numpy.radians(zenith[day])))
+
+
+def test_actual_sky_irradiances():
+    pytest.importorskip('pvlib')
+    # default pvlib dirint vs numpy dirint
+    df = actual_sky_irradiances()
+    df2 = actual_sky_irradiances(model='dirint')
+    numpy.testing.assert_allclose(df.dni, df2.dni, atol=2)
@@ -0,0 +1,242 @@
+import numpy
+import pytest
+from openalea.astk.icosphere import (icosahedron, split_triangles, star_split,
+                                     dual, icosphere, refine, turtle_mesh,
+                                     adjacency, sorted_faces, turtle_data,
+                                     turtle_mesh_sectors, build_turtle_library,
+                                     spherical_face_centers,
+                                     turtle_face_centers, turtle_face_index,
+                                     TurtlePyramid, sample_faces,
+                                     sample_directions, sample_hemisphere,
+                                     spherical_solid_angles,
+                                     spherical_centroids)
+
+
+def test_split_triangles():
+    vertices, faces = icosahedron()
+    new_vertices, new_faces, tags = split_triangles(vertices, faces,
+                                                    list(range(20)))
+    # one new vertex per edge
+    assert len(new_vertices) == 12 + 30
+    assert len(new_faces) == len(tags) == 80
+    assert tags[:8] == [0, 0, 0, 0, 1, 1, 1, 1]
+    numpy.testing.assert_allclose(new_vertices[:12], vertices)
+    pts = numpy.array(new_vertices)
+    numpy.testing.assert_allclose(numpy.linalg.norm(pts, axis=1), 1)
+    assert len(numpy.unique(pts.round(9), axis=0)) == len(pts)
+    # first face is split around its first vertex, with mid-points numbered
+    # in order of creation
+    assert new_faces[:4] == [(0, 12, 14), (11, 13, 12), (5, 14, 13),
+                             (12, 13, 14)]
+    numpy.testing.assert_allclose(
+        pts[12], (pts[0] + pts[11]) / numpy.linalg.norm(pts[0] + pts[11]))
+
+
+def test_star_split():
+    vertices, faces = dual(*icosahedron())
+    assert len(vertices) == 20
+    assert all(len(f) == 5 for f in faces)
+    new_vertices, new_faces, tags = star_split(vertices, faces,
+                                               list(range(12)))
+    assert len(new_vertices) == 32
+    assert len(new_faces) == len(tags) == 60
+    f = faces[0]
+    assert new_faces[:5] == [(f[0], f[1], 20), (f[1], f[2], 20),
+                             (f[2], f[3], 20), (f[3], f[4], 20),
+                             (f[4], f[0], 20)]
+    pts = numpy.array(new_vertices)
+    numpy.testing.assert_allclose(numpy.linalg.norm(pts, axis=1), 1)
+
+
+def test_icosphere():
+    for level in range(8):
+        vertices, faces = icosphere(*refine(level))
+        edges = set(tuple(sorted(e)) for f in faces
+                    for e in ((f[0], f[1]), (f[1], f[2]), (f[0], f[2])))
+        # Euler characteristic of a sphere
+        assert len(vertices) - len(edges) + len(faces) == 2
+    vertices, faces = turtle_mesh(136)
+    assert len(faces) == 136
+
+
+def test_adjacency():
+    vertices, faces = icosphere(1, 1)
+    offsets, fans, edges, edge_faces = adjacency(faces)
+    assert len(offsets) == len(vertices) + 1
+    assert len(fans) == 3 * len(faces)
+    assert len(edges) == len(edge_faces) == len(vertices) + len(faces) - 2
+    for v in range(len(vertices)):
+        fan = fans[offsets[v]:offsets[v + 1]].tolist()
+        around = [i for i, f in enumerate(faces) if v in f]
+        assert fan[0] == around[0]
+        assert sorted(fan) == around
+        assert fan == sorted_faces(v, around, faces)
+    for (a, b), (f1, f2) in zip(edges, edge_faces):
+        assert f1 != f2
+        assert {a, b} <= set(faces[f1]) & set(faces[f2])
+
+    with pytest.raises(ValueError):
+        adjacency(faces[1:])
+
+
+def test_turtle_library(tmp_path):
+    # the library distributed with the package is up to date
+    path = build_turtle_library(tmp_path / 'turtle_meshes.npz')
+    with numpy.load(path) as library:
+        for sectors in turtle_mesh_sectors:
+            turtle = turtle_data(sectors)
+            for k, v in turtle.items():
+                numpy.testing.assert_array_equal(
+                    v, library[k + '_' + str(sectors)])
+
+    turtle = turtle_data(100)
+    assert len(turtle['sizes']) == len(turtle['solid_angles']) == 136
+    assert turtle_data(100) is turtle
+    assert not turtle['vertices'].flags.writeable
+    # faces crossing the horizon are kept whole
+    assert turtle['solid_angles'].sum() >= 2 * numpy.pi - 1e-9
+    numpy.testing.assert_allclose(turtle_data(46)['solid_angles'].sum(),
+                                  2 * numpy.pi)
+    vertices, faces = turtle_mesh(100)
+    assert len(faces) == 136
+    assert [len(f) for f in faces] == turtle['sizes'].tolist()
+    assert turtle_face_centers(100) == spherical_face_centers((vertices, faces))
+    for a, b in turtle['neighbours']:
+        assert len(set(faces[a]) & set(faces[b])) == 2
+
+
+def test_turtle_face_index():
+    turtle = turtle_data(136)
+    vertices, centers = turtle['vertices'], turtle['centers']
+    numpy.testing.assert_array_equal(turtle_face_index(centers, 136),
+                                     numpy.arange(136))
+
+    rng = numpy.random.default_rng(0)
+    points = rng.normal(size=(2, 500, 3))
+    points[..., 2] = numpy.abs(points[..., 2])
+    index = turtle_face_index(points, 136, chunk_size=300)
+    assert index.shape == (2, 500)
+    # brute force location: points lie on the side of the face centre of the
+    # great circles supporting face edges
+    faces = numpy.split(turtle['faces'], numpy.cumsum(turtle['sizes'])[:-1])
+    n_neighbours = numpy.bincount(turtle['neighbours'].ravel(), minlength=136)
+    boundary = numpy.where(n_neighbours < turtle['sizes'])[0]
+    for p, i in zip(points.reshape(-1, 3), index.ravel()):
+        within = []
+        for j, face in enumerate(faces):
+            normals = numpy.cross(vertices[face],
+                                  numpy.roll(vertices[face], -1, axis=0))
+            if numpy.all(normals.dot(p) * normals.dot(centers[j]) >= -1e-12):
+                within.append(j)
+        # points outside the turtle are located on its boundary
+        assert within == [i] or (within == [] and i in boundary)
+
+
+def test_turtle_pyramid():
+    pyramid = TurtlePyramid()
+    assert pyramid.sectors == (6, 16, 46, 136, 406, 976)
+    parents = pyramid.parents(136)
+    assert parents.shape == (136,)
+    assert set(parents) == set(range(46))
+    offsets, children = pyramid.children(46)
+    assert len(offsets) == 47
+    assert sorted(children) == list(range(136))
+    for i in range(46):
+        assert all(parents[children[offsets[i]:offsets[i + 1]]] == i)
+    numpy.testing.assert_array_equal(pyramid.parents(976, 16),
+                                     pyramid.parents(46)[
+                                         pyramid.parents(136, 46)[
+                                             pyramid.parents(406, 136)[
+                                                 pyramid.parents(976)]]])
+
+    flux = numpy.random.default_rng(0).random((2, 976))
+    coarse = pyramid.aggregate(flux, 976, 16)
+    assert coarse.shape == (2, 16)
+    numpy.testing.assert_allclose(coarse.sum(axis=1), flux.sum(axis=1))
+    by_level = flux
+    for sectors in (976, 406, 136, 46):
+        by_level = pyramid.aggregate(by_level, sectors)
+    numpy.testing.assert_allclose(by_level, coarse)
+    fine = pyramid.distribute(coarse, 16, 976)
+    numpy.testing.assert_allclose(pyramid.aggregate(fine, 976, 16), coarse)
+    numpy.testing.assert_allclose(
+        pyramid.aggregate(pyramid.solid_angles(976), 976, 6).sum(),
+        pyramid.solid_angles(976).sum())
+
+    with pytest.raises(ValueError):
+        pyramid.parents(66)
+    with pytest.raises(ValueError):
+        TurtlePyramid((66, 91))
+
+
+def test_sample_faces():
+    vertices, faces = turtle_mesh(46)
+    points, tags = sample_faces(vertices, faces, iter=1)
+    assert len(points) == len(tags) == sum(len(f) * 4 for f in faces)
+    assert tags[:4] == [0, 0, 0, 0]
+    points, tags = sample_faces(vertices, faces, iter=None, spheric=True)
+    assert tags == list(range(46))
+    el, az = zip(*turtle_face_centers(46))
+    numpy.testing.assert_allclose(numpy.degrees([p[0] for p in points]),
+                                  90 - numpy.array(el))
+
+
+def test_sample_directions():
+    # full sphere, sum of z ** 2 over the sphere is 4 pi / 3
+    vertices, faces = dual(*icosphere(1, 1))
+    for method in ('random', 'stratified', 'r2', 'fibonacci'):
+        points, tags, weights = sample_directions(vertices, faces, n=256,
+                                                  method=method)
+        assert points.shape == (len(faces) * 256, 3)
+        assert tags.shape == weights.shape == (len(faces) * 256,)
+        numpy.testing.assert_allclose(numpy.linalg.norm(points, axis=1), 1)
+        numpy.testing.assert_allclose(weights.sum(), 4 * numpy.pi)
+        numpy.testing.assert_allclose((weights * points[:, 2] ** 2).sum(),
+                                      4 * numpy.pi / 3, rtol=0.01)
+    # samples lie in their face
+    turtle = turtle_data(136)
+    vertices, faces = turtle_mesh(136)
+    points, tags, weights = sample_directions(vertices, faces, n=16, seed=1)
+    numpy.testing.assert_array_equal(turtle_face_index(points, 136), tags)
+    numpy.testing.assert_allclose(numpy.bincount(tags, weights),
+                                  turtle['solid_angles'])
+    with pytest.raises(ValueError):
+        sample_directions(vertices, faces, method='sobol')
+
+    points, weights = sample_hemisphere(1000)
+    assert points[:, 2].min() >= 0
+    numpy.testing.assert_allclose(weights.sum(), 2 * numpy.pi)
+    numpy.testing.assert_allclose((weights * points[:, 2]).sum(), numpy.pi,
+                                  rtol=1e-3)
+
+
+def test_spherical_geometry():
+    vertices, faces = dual(*icosphere(1, 1))
+    solid_angles = spherical_solid_angles(vertices, faces)
+    numpy.testing.assert_allclose(solid_angles.sum(), 4 * numpy.pi)
+    centroids = spherical_centroids(vertices, faces)
+    numpy.testing.assert_allclose(numpy.linalg.norm(centroids, axis=1), 1)
+    points, tags, weights = sample_directions(vertices, faces, n=1024,
+                                              method='r2')
+    means = numpy.add.reduceat(points, numpy.arange(0, len(points), 1024))
+    means /= numpy.linalg.norm(means, axis=1)[:, numpy.newaxis]
+    numpy.testing.assert_allclose(centroids, means, atol=1e-3)
+    # one face of a regular dodecahedron
+    vertices, faces = dual(*icosahedron())
+    numpy.testing.assert_allclose(spherical_solid_angles(vertices, faces[:1]),
+                                  numpy.pi / 3)
+    centroid = numpy.mean([vertices[i] for i in faces[0]], axis=0)
+    numpy.testing.assert_allclose(spherical_centroids(vertices, faces[:1])[0],
+                                  centroid / numpy.linalg.norm(centroid),
+                                  atol=1e-12)
+
+    turtle = turtle_data(136)
+    numpy.testing.assert_allclose(turtle['spherical_centers'],
+                                  spherical_centroids(*turtle_mesh(136)),
+                                  atol=1e-12)
+    assert numpy.all(turtle['sky_solid_angles'] <= turtle['solid_angles'])
+    el, az = zip(*turtle_face_centers(136, spherical=True))
+    assert len(el) == 136
+    numpy.testing.assert_allclose(max(el), 90)
+    numpy.testing.assert_allclose(turtle_data(26)['sky_solid_angles'].sum(),
+                                  2 * numpy.pi)
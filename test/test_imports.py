@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from openalea.astk._lazy import lazy_module
+
+_heavy = ('pandas', 'pvlib', 'matplotlib', 'openalea.plantgl')
+
+
+def _import_in_subprocess(module):
+    """import a module in a fresh interpreter and return the heavy
+    dependencies loaded"""
+    code = ('import sys\n'
+            'import {0}\n'
+            'print(",".join(m for m in {1} if m in sys.modules))\n'
+            ).format(module, _heavy)
+    src = os.path.join(os.path.dirname(__file__), '..', 'src')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [src] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                         capture_output=True, text=True, env=env, check=True)
+    loaded = out.stdout.splitlines()[-1]
+    return [m for m in loaded.split(',') if m]
+
+
+def test_lazy_imports():
+    for module in ('openalea.astk.sky_sources', 'openalea.astk.sky_irradiance',
+                   'openalea.astk.sky_luminance', 'openalea.astk.sun_position'):
+        loaded = _import_in_subprocess(module)
+        assert loaded == [], module + ' loads ' + ', '.join(loaded)
+
+
+def test_lazy_module():
+    mod = lazy_module('json')
+    assert mod
+    assert mod.dumps([1]) == '[1]'
+    assert not lazy_module('not_an_installed_module')
+    assert not lazy_module('openalea.not_an_installed_module.all')
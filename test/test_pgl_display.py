@@ -0,0 +1,35 @@
+import numpy
+import pytest
+
+pgl = pytest.importorskip('openalea.plantgl.all')
+
+from openalea.astk.colormap import jet_colors
+from openalea.astk.icosphere import turtle_mesh
+from openalea.astk.pgl_display import sky_dome
+
+
+def face_colors(shape):
+    return [(c.red, c.green, c.blue) for c in shape.geometry.colorList]
+
+
+def test_sky_dome():
+    mesh = turtle_mesh(46)
+    vertices, faces = mesh
+    luminance = numpy.linspace(0, 1, len(faces))
+    sources = [(0, 0, lum) for lum in luminance]
+    scene = sky_dome(mesh, sources)
+    assert len(scene) == 1
+    shape = scene[0]
+    assert len(shape.geometry.indexList) == len(faces)
+    assert len(shape.geometry.colorList) == len(faces)
+    assert not shape.geometry.colorPerVertex
+    expected = numpy.array(jet_colors(luminance)).astype(int).tolist()
+    assert face_colors(shape) == list(map(tuple, expected))
+
+    # recolouring in place
+    geometry_id = shape.geometry.getId()
+    recoloured = sky_dome(mesh, [(0, 0, lum) for lum in luminance[::-1]], scene=scene)
+    assert recoloured is scene
+    assert len(scene) == 1
+    assert scene[0].geometry.getId() == geometry_id
+    assert face_colors(scene[0]) == list(map(tuple, expected[::-1]))
@@ -0,0 +1,41 @@
+import numpy
+import pytest
+
+pgl = pytest.importorskip('openalea.plantgl.all')
+
+from openalea.astk.plantgl_utils import (triangle_geometry,
+                                         get_area_and_normal, get_height,
+                                         get_lai)
+
+
+def small_scene():
+    horizontal = pgl.TriangleSet([(0, 0, 1), (1, 0, 1), (0, 1, 1), (1, 1, 1)],
+                                 [(0, 1, 2), (1, 3, 2)])
+    vertical = pgl.TriangleSet([(0, 0, 0), (2, 0, 0), (0, 0, 3)], [(0, 1, 2)])
+    return {1: horizontal, 2: [horizontal, vertical]}
+
+
+def test_triangle_geometry():
+    geometry = triangle_geometry(small_scene())
+    numpy.testing.assert_allclose(geometry[1]['area'], [0.5, 0.5])
+    numpy.testing.assert_allclose(geometry[1]['normal'], [(0, 0, 1), (0, 0, 1)])
+    numpy.testing.assert_allclose(geometry[1]['centroid'], [(1 / 3., 1 / 3., 1), (2 / 3., 2 / 3., 1)])
+    numpy.testing.assert_allclose(geometry[1]['height'], [1, 1])
+    numpy.testing.assert_allclose(geometry[2]['area'], [0.5, 0.5, 3])
+    numpy.testing.assert_allclose(geometry[2]['normal'][-1], (0, -1, 0))
+    numpy.testing.assert_allclose(geometry[2]['height'], [1, 1, 1])
+
+
+def test_legacy_outputs():
+    scene = small_scene()
+    geometry = triangle_geometry(scene)
+    areas, normals = get_area_and_normal(scene)
+    assert set(areas) == set(normals) == {1, 2}
+    for vid, g in geometry.items():
+        assert isinstance(areas[vid], list)
+        numpy.testing.assert_allclose(areas[vid], g['area'])
+        assert all(isinstance(n, pgl.Vector3) for n in normals[vid])
+        numpy.testing.assert_allclose([(n.x, n.y, n.z) for n in normals[vid]], g['normal'])
+    heights = get_height(scene)
+    assert heights == {vid: g['height'].tolist() for vid, g in geometry.items()}
+    assert get_lai(scene, domain_area=2.) == pytest.approx(2.5)
@@ -6,6 +6,9 @@ from openalea.astk.sky_irradiance import (
     sky_irradiance,
     all_weather_sky_clearness,
     f_clear_sky)
+from openalea.astk.sky_sources import sky_sources
+from openalea.astk.sun_position import sun_position
+from openalea.astk.timeseries import utc_epoch
 
 
 def test_clear_sky_irradiances():
@@ -40,6 +43,13 @@ def test_sky_irradiances():
     assert df.dhi.sum() / df.ghi.sum() > 0.99
     df2 = sky_irradiance(with_pvlib=False)
     assert len(df2) == 15
+    # epoch dates
+    dates = pandas.date_range('2000-06-21', periods=24, freq='h', tz='Europe/Paris')
+    for with_pvlib in (True, False):
+        ref = sky_irradiance(dates, with_pvlib=with_pvlib)
+        df = sky_irradiance(utc_epoch(dates), with_pvlib=with_pvlib)
+        numpy.testing.assert_array_equal(df.index, utc_epoch(ref.index))
+        numpy.testing.assert_allclose(df, ref)
 
 
 def test_fsun():
@@ -58,4 +68,25 @@ def test_twilight():
     sky_irr = sky_irradiance(ghi=1.0, dates=pandas.Timestamp('2017-08-17 19:00:00+0400', tz='Indian/Reunion'), latitude=-21.32,
                     longitude=55.5, timezone='Indian/Reunion')
     assert sky_irr.dhi.sum() == 1
-    assert sky_irr.dni.sum() == 0
\ No newline at end of file
+    assert sky_irr.dni.sum() == 0
+
+
+def test_interval_mean():
+    dates = pandas.date_range('2000-06-21', periods=24, freq='h', tz='Europe/Paris')
+    ghi = pandas.Series(800 * numpy.maximum(0, numpy.sin(numpy.pi * (numpy.arange(24) - 5) / 16)), index=dates)
+    sun = sun_position(dates, interval_mean=True)
+    df = sky_irradiance(dates, ghi=ghi, interval_mean=True)
+    numpy.testing.assert_allclose(df.elevation, sun.elevation)
+    numpy.testing.assert_allclose(df.azimuth, sun.azimuth)
+    day = df.elevation > 5
+    numpy.testing.assert_allclose(df.ghi[day], df.dhi[day] + df.dni[day] * numpy.sin(numpy.radians(df.elevation[day])))
+    instant = sky_irradiance(dates, ghi=ghi)
+    assert numpy.abs(df.elevation - instant.elevation.reindex(df.index)).max() > 2
+    right = sky_irradiance(dates, ghi=ghi, interval_mean=True, label='right')
+    numpy.testing.assert_allclose(right.elevation, sun_position(dates, interval_mean=True, label='right').elevation)
+    # default sky of sky_sources
+    s, _ = sky_sources('sun_soc', interval_mean=True)
+    el = numpy.array([el for el, _, _ in s])
+    ref = sky_irradiance(interval_mean=True).elevation.values
+    assert len(el) > 10
+    assert numpy.abs(el[:, None] - ref).min(axis=1).max() < 1e-9
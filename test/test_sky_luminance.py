@@ -2,6 +2,7 @@ from openalea.astk.sky_luminance import sky_luminance
 from openalea.astk.sky_irradiance import sky_irradiance
 from openalea.astk.sky_map import sky_grid, sky_hi, sky_ni, sun_hi
 import numpy
+import pandas
 
 
 def test_soc_uoc():
@@ -101,3 +102,16 @@ def test_scaling():
     #
     sun, sky = sky_luminance(grid, sky_type='sun_soc', sky_irradiance=sky_irr, scale='ghi')
     numpy.testing.assert_allclose(sky_irr.ghi.mean(), sun_hi(sun).sum() + sky_hi(grid, sky).sum())
+
+
+def test_time_integration():
+    grid = sky_grid()
+    hourly = sky_irradiance()
+    dates = pandas.date_range('2000-06-21', periods=24 * 60, freq='min', tz='Europe/Paris')
+    minutes = sky_irradiance(dates=dates)
+    _, sky_h = sky_luminance(grid, sky_irradiance=hourly, sky_type='sun_soc', scale='global')
+    _, sky_m = sky_luminance(grid, sky_irradiance=minutes, sky_type='sun_soc', scale='global')
+    sun_h, _ = sky_luminance(grid, sky_irradiance=hourly, sky_type='sun_soc', scale='ghi')
+    sun_m, _ = sky_luminance(grid, sky_irradiance=minutes, sky_type='sun_soc', scale='ghi')
+    numpy.testing.assert_allclose(sky_hi(grid, sky_m).sum(), sky_hi(grid, sky_h).sum(), rtol=0.05)
+    numpy.testing.assert_allclose(sun_hi(sun_m).sum(), sun_hi(sun_h).sum(), rtol=0.05)
@@ -1,7 +1,10 @@
+import warnings
+
 import numpy
 from openalea.astk.sky_map import (sky_grid, cell_boundaries, scale_sky,
-                                   sky_map, sky_hi, sky_ni, uniform_sky,
-                                   surfacic_irradiance)
+                                   sky_map, sky_map_series, sky_hi, sky_ni,
+                                   uniform_sky, surfacic_irradiance,
+                                   discretisation_error)
 from openalea.astk.sky_sources import regular_sky, sky_turtle
 
 
@@ -92,6 +95,30 @@ def test_sky_map():
     numpy.testing.assert_almost_equal(hi_newlum.sum(), hi_ref, decimal=2)
 
 
+def test_sky_map_series():
+    grid, lum = uniform_sky()
+    rng = numpy.random.default_rng(0)
+    series = rng.random((3,) + lum.shape)
+    for dirs in (regular_sky(90, 30), sky_turtle(), sky_turtle(1)):
+        for force_hi in (False, True):
+            lum_agg, grid_agg = sky_map_series(grid, series, dirs, force_hi=force_hi)
+            assert lum_agg.shape == (3, len(dirs))
+            for sky, agg in zip(series, lum_agg):
+                ref, ref_grid, _ = sky_map(grid, sky, dirs, force_hi=force_hi)
+                numpy.testing.assert_allclose(agg, ref)
+            numpy.testing.assert_allclose(grid_agg, ref_grid)
+    # a duplicated direction gets no sky cell
+    dirs = sky_turtle(6)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for force_hi in (False, True):
+            lum_agg, grid_agg = sky_map_series(grid, series, dirs + dirs[:1], force_hi=force_hi)
+            assert grid_agg[2][-1] == 0
+            assert numpy.isfinite(lum_agg).all()
+            numpy.testing.assert_array_equal(lum_agg[:, -1], 0)
+            numpy.testing.assert_allclose(lum_agg[:, :-1], sky_map_series(grid, series, dirs, force_hi=force_hi)[0])
+
+
 def test_surfacic_irradiance():
     grid, lum = uniform_sky()
     hi_ref = sky_hi(grid, lum).sum()
@@ -102,3 +129,16 @@ def test_surfacic_irradiance():
     numpy.testing.assert_almost_equal(his, hi_ref, decimal=2)
     his = surfacic_irradiance(grid, lum, 90)
     numpy.testing.assert_almost_equal(his, hi_ref, decimal=2)
+
+
+def test_discretisation_error():
+    grid, lum = uniform_sky()
+    hi_error, tilted_error = discretisation_error(grid, lum, regular_sky(10, 10))
+    assert hi_error < 1e-6
+    assert tilted_error < 5e-3
+    hi_error, tilted_error = discretisation_error(grid, lum, sky_turtle(1), force_hi=False)
+    numpy.testing.assert_allclose(hi_error, 1, rtol=0.01)
+    coarse = discretisation_error(grid, lum, sky_turtle(16))
+    fine = discretisation_error(grid, lum, sky_turtle(46))
+    numpy.testing.assert_allclose([coarse[0], fine[0]], 0, atol=1e-9)
+    assert coarse[1] > fine[1]
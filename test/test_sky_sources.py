@@ -1,10 +1,22 @@
 import numpy
+import pandas
+import pytest
 
 from openalea.astk.sky_irradiance import sky_irradiance
+from openalea.astk.sky_luminance import sky_luminance
+from openalea.astk.sky_map import sky_grid, sky_map, sky_ni, sun_hi, surfacic_irradiance
 from openalea.astk.sky_sources import (
     regular_sky,
     sky_turtle,
-    sky_sources)
+    sky_sources,
+    sky_sources_series,
+    iter_sky_sources,
+    discretise_sun,
+    adaptive_sky_dirs,
+    turtle_error_curve,
+    turtle_sectors,
+    LightSources,
+    caribu_light_sources)
 
 
 def test_sky_turtle():
@@ -26,6 +38,21 @@ def test_sky_turtle():
     assert len(sky_dirs) == 976
 
 
+def test_memoised_discretisation():
+    sky_dirs = sky_turtle(500)
+    # sky_turtle returns a new list backed by a cached tuple
+    assert sky_turtle(500) is not sky_dirs
+    assert sky_turtle(500) == sky_dirs
+    sky_dirs.pop()
+    assert len(sky_turtle(500)) == 556
+    sun, sky = sky_sources('soc', sectors=500)
+    assert len(sky) == 556
+    ref_sun, ref_sky = sky_sources('soc', sky_dirs=sky_turtle(500))
+    numpy.testing.assert_allclose(sky, ref_sky)
+    sun, sky = sky_sources('soc', sectors=16)
+    assert len(sky) == 16
+
+
 def test_regular_sky():
     sky_dirs = regular_sky()
     assert len(sky_dirs) == 9 * 36
@@ -85,3 +112,161 @@ def test_sky_sources():
     numpy.testing.assert_almost_equal(delta_cs / delta_soc, 14.6, decimal=1)
 
 
+def test_sky_sources_series():
+    sky_irr = sky_irradiance()
+    for sky_type in ('soc', 'sun_soc', 'all_weather'):
+        for sun_in_sky in (False, True):
+            sun, sky, dirs = sky_sources_series(sky_type, sky_irradiance=sky_irr, sun_in_sky=sun_in_sky,
+                                                source_irradiance='horizontal', chunksize=4)
+            assert sun.shape == (len(sky_irr), 3)
+            assert sky.shape == (len(sky_irr), 46)
+            assert dirs.shape == (46, 2)
+            # each time step is a one step sky_sources call
+            for i in (0, 7):
+                s, k = sky_sources(sky_type, sky_irradiance=sky_irr.iloc[[i]], scale='ghi', sun_in_sky=sun_in_sky,
+                                   source_irradiance='horizontal')
+                numpy.testing.assert_allclose(sky[i], [irr for _, _, irr in k])
+                numpy.testing.assert_allclose(dirs, [(el, az) for el, az, _ in k])
+                if len(s) > 0:
+                    numpy.testing.assert_allclose(sun[i], s[0])
+                else:
+                    assert sun[i, 2] == 0
+            # horizontal irradiance is conserved at each time step
+            numpy.testing.assert_allclose(sun[:, 2] + sky.sum(axis=1), sky_irr.ghi)
+
+    steps = list(iter_sky_sources('sun_soc', sky_irradiance=sky_irr, chunksize=4))
+    assert len(steps) == len(sky_irr)
+    sun, sky, dirs = sky_sources_series('sun_soc', sky_irradiance=sky_irr)
+    for i, (s, k) in enumerate(steps):
+        assert len(s) == int(sun[i, 2] > 0)
+        numpy.testing.assert_allclose(sky[i], [irr for _, _, irr in k])
+
+
+def test_discretise_sun():
+    dates = pandas.date_range('2000-06-01', periods=24 * 10, freq='h', tz='Europe/Paris')
+    sky_irr = sky_irradiance(dates)
+    sun, _ = sky_luminance(sky_grid(), sky_type='sun_soc', sky_irradiance=sky_irr)
+    hi = sun_hi(sun).sum()
+    errors = []
+    for n in (1, 5, 20):
+        sources, mean_error, max_error = discretise_sun(sun, n)
+        assert len(sources) == n
+        # direct horizontal energy is conserved
+        numpy.testing.assert_allclose(sun_hi(sources).sum(), hi)
+        assert 0 < mean_error <= max_error
+        errors.append(mean_error)
+    assert errors[0] > errors[1] > errors[2]
+    sources, mean_error, max_error = discretise_sun(sun, len(sun))
+    assert sources == sun
+    assert mean_error == max_error == 0
+    for n in (0, -1):
+        with pytest.raises(ValueError):
+            discretise_sun(sun, n)
+        with pytest.raises(ValueError):
+            sky_sources('sun_soc', sky_irradiance=sky_irr, sun_clusters=n)
+
+    s, k = sky_sources('sun_soc', sky_irradiance=sky_irr, sun_clusters=5)
+    assert len(s) == 5
+    s5, k5, errors = sky_sources('sun_soc', sky_irradiance=sky_irr, sun_clusters=5, return_errors=True)
+    assert s5 == s
+    numpy.testing.assert_allclose(errors, discretise_sun(sun, 5)[1:])
+    assert 0 < errors[0] <= errors[1]
+    _, _, errors = sky_sources('sun_soc', sky_irradiance=sky_irr, as_array=True, return_errors=True)
+    assert errors == (0., 0.)
+    ref_s, ref_k = sky_sources('sun_soc', sky_irradiance=sky_irr)
+    assert len(ref_s) == len(sun)
+    numpy.testing.assert_allclose(k, ref_k)
+
+
+def test_adaptive_sky_dirs():
+    grid = sky_grid()
+    _, clear_sky = sky_luminance(grid, sky_type='clear_sky', sky_irradiance=sky_irradiance())
+
+    def _tilted_error(sky_dirs):
+        lum_agg, grid_agg, _ = sky_map(grid, clear_sky, sky_dirs, force_hi=True)
+        ni = sky_ni(grid_agg, lum_agg)
+        # same azimuth convention as astk.sky_map.ksi_grid
+        az, z, _ = map(numpy.radians, grid_agg)
+        sources = numpy.stack((numpy.sin(z) * numpy.cos(az), numpy.sin(z) * numpy.sin(az), numpy.cos(z)), axis=1)
+        errors = []
+        for zenith in (0, 45, 90):
+            for azimuth in range(0, 360, 45):
+                theta, phi = numpy.radians(zenith), numpy.radians(azimuth)
+                normal = (numpy.sin(theta) * numpy.cos(phi), numpy.sin(theta) * numpy.sin(phi), numpy.cos(theta))
+                ref = surfacic_irradiance(grid, clear_sky, zenith, azimuth)
+                errors.append(abs((ni * numpy.abs(sources @ normal)).sum() / ref - 1))
+        return max(errors)
+
+    sky_dirs = adaptive_sky_dirs(grid, clear_sky, 46)
+    assert len(sky_dirs) == 46
+    el, az = map(numpy.array, zip(*sky_dirs))
+    assert ((el >= 0) & (el <= 90) & (az >= 0) & (az < 360)).all()
+    assert _tilted_error(sky_dirs) < _tilted_error(sky_turtle(46))
+    assert adaptive_sky_dirs(grid, clear_sky, 46) == sky_dirs
+    for dark in (numpy.zeros_like(clear_sky), numpy.full_like(clear_sky, numpy.nan)):
+        sky_dirs = adaptive_sky_dirs(grid, dark, 16)
+        assert len(sky_dirs) == 16
+        assert numpy.isfinite(sky_dirs).all()
+
+    sun, sky = sky_sources('clear_sky', sky_irradiance=sky_irradiance(), sky_dirs='adaptive', sectors=16)
+    assert len(sky) == 16
+    numpy.testing.assert_allclose(sum(irr * numpy.sin(numpy.radians(el)) for el, _, irr in sky), 1)
+
+
+def test_turtle_sectors():
+    sectors, hi_error, tilted_error = turtle_error_curve('soc', max_sectors=136)
+    assert sectors == [1, 6, 16, 46, 66, 91, 136]
+    numpy.testing.assert_allclose(hi_error, 0, atol=1e-9)
+    assert tilted_error[0] > tilted_error[3] > tilted_error[-1]
+    n = turtle_sectors(0.02, sky_type='soc')
+    assert n == 46
+    assert len(sky_turtle(n)) == n
+    assert turtle_sectors(0.02, sky_type='clear_sky') > n
+    assert turtle_sectors(0.05, hi_tolerance=0.01, sky_type='soc', force_hi=False) == 16
+    # custom skies
+    n = turtle_sectors(0.05, sky_type='clear_sky', sky_irradiance=sky_irradiance(attenuation=0.2))
+    sectors, _, tilted_error = turtle_error_curve('clear_sky', sky_irradiance=sky_irradiance(attenuation=0.2),
+                                                  max_sectors=n)
+    assert tilted_error[-1] <= 0.05 < tilted_error[-2]
+
+
+def test_light_sources():
+    sources = LightSources([90, 45, 0], [0, 90, 180], [1, 2, 3])
+    assert len(sources) == 3
+    el, az, irr = map(numpy.array, zip(*sources))
+    numpy.testing.assert_allclose(irr, [1, 2, 3])
+    # views
+    assert numpy.shares_memory(sources.directions, sources.data)
+    assert numpy.shares_memory(sources.vectors, sources.data)
+    numpy.testing.assert_allclose(sources.directions, [(90, 0), (45, 90), (0, 180)])
+    numpy.testing.assert_allclose(sources.vectors, [(0, 0, -1), (0, -numpy.sqrt(0.5), -numpy.sqrt(0.5)), (1, 0, 0)],
+                                  atol=1e-12)
+    numpy.testing.assert_allclose(sources.horizontal_irradiance(), [1, numpy.sqrt(2), 0], atol=1e-12)
+    # north rotation
+    oriented = sources.orient(north=90)
+    numpy.testing.assert_allclose(oriented.azimuth, [90, 0, 270])
+    numpy.testing.assert_allclose(sources.azimuth, [0, 90, 180])
+    # legacy formats
+    assert LightSources.from_list(sources.to_list()).to_list() == sources.to_list()
+    assert len(LightSources.from_list([])) == 0
+    assert len(sources + []) == 3
+    assert len(sources[1:]) == 2
+    strided = sources[::2]
+    assert numpy.shares_memory(strided.directions, sources.data)
+    numpy.testing.assert_allclose(strided.directions, [(90, 0), (0, 180)])
+    numpy.testing.assert_allclose(sources[::-1].directions, [(0, 180), (45, 90), (90, 0)])
+    numpy.testing.assert_allclose(sources[1], (45, 90, 2))
+    caribu = caribu_light_sources([], sources)
+    assert caribu == caribu_light_sources(LightSources(), sources.to_list())
+    assert caribu[0][0] == 1
+    numpy.testing.assert_allclose(caribu[0][1], (0, 0, -1), atol=1e-12)
+
+    sky_irr = sky_irradiance()
+    sun, sky = sky_sources('sun_soc', sky_irradiance=sky_irr, as_array=True)
+    ref_sun, ref_sky = sky_sources('sun_soc', sky_irradiance=sky_irr)
+    assert sun.to_list() == ref_sun
+    assert sky.to_list() == ref_sky
+    for (s, k), (ref_s, ref_k) in zip(iter_sky_sources('sun_soc', sky_irradiance=sky_irr, as_array=True),
+                                      iter_sky_sources('sun_soc', sky_irradiance=sky_irr)):
+        assert s.to_list() == ref_s
+        assert k.to_list() == ref_k
@@ -0,0 +1,57 @@
+import numpy
+import pandas
+import pytest
+
+from openalea.astk.spa import solar_position, earth_sun_distance
+
+
+def _unixtime(dates):
+    return dates.values.astype('datetime64[ns]').astype(numpy.int64) / 1e9
+
+
+def _angle_diff(a, b):
+    return numpy.abs((a - b + 180) % 360 - 180)
+
+
+def test_reference_position():
+    # example of Reda & Andreas (2004), NREL/TP-560-34302, table A5.1
+    t = numpy.array([pandas.Timestamp('2003-10-17 12:30:30', tz='Etc/GMT+7').timestamp()])
+    sunpos = solar_position(t, 39.742476, -105.1786, 1830.14, 82000, 11, delta_t=67, step=None)
+    numpy.testing.assert_allclose(sunpos['apparent_zenith'], 50.11162, atol=1e-5)
+    numpy.testing.assert_allclose(sunpos['azimuth'], 194.34024, atol=1e-5)
+    numpy.testing.assert_allclose(earth_sun_distance(t, delta_t=67), 0.996542, atol=1e-6)
+
+
+def test_solar_position():
+    pvlib_spa = pytest.importorskip('pvlib.spa')
+    dates = pandas.date_range('1990-01-01', '2030-01-01', freq='7h13min',
+                              tz='UTC')
+    t = _unixtime(dates)
+    latitude, longitude, altitude = 43.61, 3.87, 56
+    ref = pvlib_spa.solar_position_numpy(t, latitude, longitude, altitude,
+                                         1000, 12, 67., 0.5667, 1)
+    names = ('apparent_zenith', 'zenith', 'apparent_elevation', 'elevation',
+             'azimuth', 'equation_of_time')
+    # direct evaluation
+    sunpos = solar_position(t, latitude, longitude, altitude, 100000,
+                            step=None)
+    for name, expected in zip(names, ref):
+        assert _angle_diff(sunpos[name], expected).max() < 1e-8
+    # interpolated time terms
+    dates = pandas.date_range('2020-01-01', periods=20000, freq='1min',
+                              tz='UTC')
+    t = _unixtime(dates)
+    ref = pvlib_spa.solar_position_numpy(t, -33.9, 151.2, 0, 1013.25, 25, 67.,
+                                         0.5667, 1)
+    sunpos = solar_position(t, -33.9, 151.2, 0, 101325, 25)
+    for name, expected in zip(names, ref):
+        assert _angle_diff(sunpos[name], expected).max() < 1e-6
+
+
+def test_earth_sun_distance():
+    pvlib_spa = pytest.importorskip('pvlib.spa')
+    dates = pandas.date_range('2000-01-01', '2001-01-01', freq='h', tz='UTC')
+    t = _unixtime(dates)
+    expected = pvlib_spa.solar_position_numpy(t, 0, 0, 0, 0, 0, 67., 0, 1,
+                                              esd=True)[0]
+    numpy.testing.assert_allclose(earth_sun_distance(t), expected, rtol=1e-9)
@@ -1,11 +1,23 @@
 import numpy
+import pandas
 
 from openalea.astk.sun_position import (
     sun_position, 
-    sun_extraradiation)
+    sun_extraradiation,
+    SunPathTable)
+from openalea.astk.timeseries import utc_epoch
+from openalea.astk.spa import earth_sun_distance
 from openalea.astk.sun_position_astk import (
     sun_position as sun_position_astk, 
-    sun_extraradiation as sun_extraradiation_astk)
+    sun_extraradiation as sun_extraradiation_astk,
+    interval_mean_position,
+    solar_ephemeris,
+    sun_events,
+    declination,
+    right_ascension,
+    hour_angle,
+    sun_elevation,
+    sun_azimuth)
 
 
 
@@ -21,7 +33,145 @@ def test_alternative_sun_position():
     numpy.testing.assert_allclose(suna, sun, rtol=0.05)
 
 
+def test_sun_position_methods():
+    dates = pandas.date_range('2000-06-21 04:00:30', periods=200, freq='7min',
+                              tz='UTC')
+    ref = sun_position(dates, filter_night=False, method='pvlib')
+    sun = sun_position(dates, filter_night=False, method='spa')
+    numpy.testing.assert_allclose(sun.elevation, ref.elevation, atol=1e-6)
+    numpy.testing.assert_allclose(sun.azimuth, ref.azimuth, atol=1e-6)
+    suna = sun_position(dates, filter_night=False, method='astk')
+    # low precision formulas, within refraction
+    numpy.testing.assert_allclose(suna.elevation, ref.elevation, atol=0.6)
+    sun = sun_position(dates, filter_night=False, method='spa',
+                       interval_mean=True)
+    ref = sun_position(dates, filter_night=False, method='pvlib',
+                       interval_mean=True)
+    numpy.testing.assert_allclose(sun.elevation, ref.elevation, atol=1e-6)
+
+
+def test_epoch_dates():
+    dates = pandas.date_range('2000-06-21', periods=24, freq='h', tz='Europe/Paris')
+    epoch = utc_epoch(dates)
+    for method in ('pvlib', 'spa', 'astk'):
+        ref = sun_position(dates, method=method)
+        sun = sun_position(epoch, method=method)
+        numpy.testing.assert_array_equal(sun.index, utc_epoch(ref.index))
+        numpy.testing.assert_allclose(sun, ref)
+        # float epoch seconds, as returned by Timestamp.timestamp
+        sun = sun_position(numpy.array([d.timestamp() for d in dates]), method=method)
+        numpy.testing.assert_allclose(sun, ref)
+        ref = sun_position(dates, method=method, interval_mean=True)
+        sun = sun_position(epoch, method=method, interval_mean=True)
+        numpy.testing.assert_allclose(sun, ref)
+    numpy.testing.assert_allclose(sun_extraradiation(epoch), sun_extraradiation(dates))
+    numpy.testing.assert_allclose(sun_extraradiation_astk(epoch), sun_extraradiation_astk(dates))
+    table = SunPathTable()
+    numpy.testing.assert_allclose(table.sun_position(epoch), table.sun_position(dates))
+
+
 def test_extra_radiation():
     df = sun_extraradiation()
     dfa = sun_extraradiation_astk()
-    numpy.testing.assert_allclose(dfa, df, rtol=0.01)
\ No newline at end of file
+    numpy.testing.assert_allclose(dfa, df, rtol=0.01)
+    # Spencer series, with a positive cos(2B) term (Iqbal, 1983, eq. 1.2.1)
+    dates = pandas.DatetimeIndex(['2000-01-01 12:00', '2000-07-04 12:00'], tz='UTC')
+    numpy.testing.assert_allclose(sun_extraradiation_astk(dates), [1413.981805, 1320.456651], rtol=1e-9)
+
+def test_interval_mean():
+    hours = pandas.date_range('2000-06-21', periods=24, freq='h', tz='Europe/Paris')
+    minutes = pandas.date_range('2000-06-21', periods=24 * 60, freq='min', tz='Europe/Paris')
+    sun = sun_position(minutes, filter_night=False)
+    ref_el, ref_az = interval_mean_position(sun.elevation.values.reshape(24, 60),
+                                            sun.azimuth.values.reshape(24, 60),
+                                            numpy.full((24, 60), 1 / 60.))
+    day = ref_el > 0
+    for position in (sun_position, sun_position_astk):
+        mean = position(hours, filter_night=False, interval_mean=True)
+        numpy.testing.assert_allclose(mean.elevation[day], ref_el[day], atol=0.2)
+        numpy.testing.assert_allclose(mean.azimuth[day], ref_az[day], atol=0.5)
+    # instantaneous positions are biased at sunrise and sunset
+    sun = sun_position(hours, filter_night=False)
+    assert numpy.abs(sun.elevation[day] - ref_el[day]).max() > 2
+    assert len(sun_position(hours, interval_mean=True)) == 16
+
+
+def test_solar_ephemeris():
+    hUTC = numpy.linspace(0, 24, 97)
+    dayofyear = numpy.arange(97) * 3 + 1
+    year = 2000 + numpy.arange(97) % 30
+    eph = solar_ephemeris(hUTC, dayofyear, year, 43.36, 3.52)
+    numpy.testing.assert_allclose(eph['declination'], declination(hUTC, dayofyear, year))
+    numpy.testing.assert_allclose(eph['right_ascension'], right_ascension(hUTC, dayofyear, year))
+    numpy.testing.assert_allclose(eph['hour_angle'], hour_angle(hUTC, dayofyear, year, 3.52))
+    # reference values from the formulas sun_elevation and sun_azimuth used before solar_ephemeris
+    idx = numpy.arange(0, 97, 8)
+    ref_el = [-69.58484585, -54.78627619, -29.76589459, -1.01459095, 28.30659925, 54.20270714, 67.34628288,
+              56.19418004, 34.9106384, 10.1451136, -16.4026271, -41.14971681, -55.19389443]
+    ref_az = [7.28100254, 56.24120195, 77.59663634, 92.77896104, 108.87059913, 134.1665664, 190.43573045,
+              244.64731116, 268.23268415, 283.83745316, 300.68030149, 326.34804473, 12.43280203]
+    numpy.testing.assert_allclose(eph['elevation'][idx], ref_el, atol=1e-7)
+    numpy.testing.assert_allclose(eph['azimuth'][idx], ref_az, atol=1e-7)
+    numpy.testing.assert_allclose(sun_elevation(hUTC, dayofyear, year, 43.36, 3.52)[idx], ref_el, atol=1e-7)
+    numpy.testing.assert_allclose(sun_azimuth(hUTC, dayofyear, year, 43.36, 3.52)[idx], ref_az, atol=1e-7)
+
+
+def test_sun_path_table():
+    rng = numpy.random.default_rng(0)
+    start = pandas.Timestamp('1990-01-01', tz='UTC').value
+    ns = numpy.sort(
+        start + rng.integers(0, int(60 * 365.25 * 86400e9), 20000))
+    dates = pandas.to_datetime(ns, utc=True)
+    for latitude, longitude in ((43.61, 3.87), (-21.32, 55.5), (65, -20)):
+        table = SunPathTable(latitude, longitude, 56)
+        sun = table.sun_position(dates, filter_night=False)
+        ref = sun_position(dates, latitude=latitude, longitude=longitude,
+                           altitude=56, filter_night=False, method='spa')
+        el_err = numpy.abs(sun.elevation - ref.elevation)
+        az_err = numpy.abs((sun.azimuth - ref.azimuth + 180) % 360 - 180)
+        refraction_band = (ref.elevation > -1.2) & (ref.elevation < 0)
+        polar = ref.elevation.abs() > 88
+        assert el_err[~(refraction_band | polar)].max() < 0.05
+        if polar.any():
+            assert el_err[polar].max() < 0.2
+        day = (ref.elevation > 1) & (ref.elevation < 80)
+        assert az_err[day].max() < 0.15
+        distance = earth_sun_distance(ns / 1e9)
+        expected = 1366.1 / distance ** 2
+        io = table.sun_extraradiation(dates)
+        numpy.testing.assert_allclose(io, expected, rtol=5e-4)
+    # filtering and localisation
+    sun = table.sun_position(daydate='2000-06-21', timezone='Europe/Paris')
+    assert (sun.elevation > 0).all()
+    assert str(sun.index.tz) == 'Europe/Paris'
+
+
+def test_sun_events():
+    from pvlib.solarposition import sun_rise_set_transit_spa
+    days = pandas.date_range('2021-01-01', '2021-12-31', freq='D', tz='UTC')
+    latitude, longitude = 43.61, 3.87
+    events = sun_events(days.dayofyear, days.year, latitude, longitude)
+    ref = sun_rise_set_transit_spa(days, latitude, longitude)
+    for name, ref_name in (('noon', 'transit'), ('sunrise', 'sunrise'),
+                           ('sunset', 'sunset')):
+        expected = (ref[ref_name] - days).dt.total_seconds() / 3600
+        # less than 0.1 minute
+        numpy.testing.assert_allclose(events[name], expected, atol=0.1 / 60)
+    numpy.testing.assert_allclose(events['daylength'],
+                                  events['sunset'] - events['sunrise'])
+    # daily integral of elevation sine, against 1 minute integration
+    hours = numpy.arange(0, 24, 1 / 60.)
+    for doy in (1, 80, 172, 300):
+        el = solar_ephemeris(hours, doy, 2021, latitude, 0)['elevation']
+        expected = numpy.maximum(numpy.sin(numpy.radians(el)), 0).sum() * 60
+        actual = sun_events(doy, 2021, latitude)['sinel_integral']
+        numpy.testing.assert_allclose(actual, expected, rtol=1e-3)
+    # sites x days arrays, polar day and night
+    events = sun_events(numpy.array([1, 172]), 2021,
+                        numpy.array([[0], [80], [-80]]))
+    assert events['daylength'].shape == (3, 2)
+    numpy.testing.assert_allclose(events['daylength'][1:],
+                                  [[0, 24], [24, 0]])
+    assert numpy.isnan(events['sunrise'][1:]).all()
+    assert events['sinel_integral'][1, 0] == 0
+    numpy.testing.assert_allclose(events['daylength'][0], 12.1, atol=0.05)
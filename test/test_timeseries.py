@@ -0,0 +1,100 @@
+import numpy
+import pandas
+
+from openalea.astk.timeseries import (
+    is_epoch,
+    time_weights,
+    stream_aggregate,
+    utc_epoch,
+    calendar)
+
+
+def test_time_weights():
+    dates = pandas.date_range('2000-06-21', periods=11, freq='min')
+    numpy.testing.assert_allclose(time_weights(dates), 60)
+    numpy.testing.assert_allclose(time_weights(dates[:1]), 3600)
+    # gaps (e.g. filtered nights) are replaced by the nominal step
+    numpy.testing.assert_allclose(time_weights(dates[[0, 1, 2, 4]]), [60, 60, 120, 60])
+    gap = dates[[0, 1, 2, 3, 10]]
+    numpy.testing.assert_allclose(time_weights(gap), 60)
+    numpy.testing.assert_allclose(time_weights(gap, max_step=420), [60, 60, 60, 420, 60])
+    numpy.testing.assert_allclose(time_weights(gap, max_step=420, label='right'), [60, 60, 60, 60, 420])
+
+
+def test_time_weights_epoch():
+    dates = pandas.date_range('2000-06-21', periods=11, freq='min')
+    epoch = utc_epoch(dates)
+    numpy.testing.assert_allclose(time_weights(epoch), time_weights(dates))
+    numpy.testing.assert_allclose(time_weights(epoch[[0, 1, 2, 4]]), [60, 60, 120, 60])
+    assert is_epoch(epoch + 0.5)
+    numpy.testing.assert_array_equal(utc_epoch(epoch + 0.5), epoch)
+    numpy.testing.assert_allclose(time_weights(epoch + 0.5), time_weights(dates))
+
+
+def test_calendar():
+    dates = pandas.date_range('2000-06-21 12:30', periods=5, freq='h', tz='Europe/Paris')
+    epoch = utc_epoch(dates)
+    assert epoch.dtype == numpy.int64
+    assert epoch[0] == dates[0].timestamp()
+    numpy.testing.assert_array_equal(utc_epoch(dates.tz_localize(None), timezone='Europe/Paris'), epoch)
+    rng = numpy.random.default_rng(0)
+    epoch = rng.integers(-50 * 365 * 86400, 80 * 365 * 86400, 1000)
+    utc = pandas.to_datetime(epoch, unit='s', utc=True)
+    for d in (epoch, epoch.astype('datetime64[s]'), epoch.astype(float), utc):
+        cal = calendar(d)
+        numpy.testing.assert_array_equal(cal['year'], utc.year)
+        numpy.testing.assert_array_equal(cal['month'], utc.month)
+        numpy.testing.assert_array_equal(cal['day'], utc.day)
+        numpy.testing.assert_array_equal(cal['dayofyear'], utc.dayofyear)
+        numpy.testing.assert_allclose(cal['hour'], utc.hour + utc.minute / 60. + utc.second / 3600.)
+
+
+def test_stream_aggregate():
+    dates = pandas.date_range('2000-06-21', periods=3 * 24 * 60, freq='min', tz='Europe/Paris')
+    df = pandas.DataFrame({'ghi': numpy.random.rand(len(dates))}, index=dates)
+    chunks = (df.iloc[i:i + 1000] for i in range(0, len(df), 1000))
+    hourly = pandas.concat(list(stream_aggregate(chunks, freq='h')))
+    expected = df.resample('h').mean()
+    assert len(hourly) == len(expected)
+    numpy.testing.assert_allclose(hourly.ghi, expected.ghi)
+    assert hourly.index.tz == dates.tz
+
+    # irregular sampling: chunked and in-memory aggregation are identical
+    irregular = df.iloc[numpy.sort(numpy.random.choice(len(df), 1000, replace=False))]
+    chunks = (irregular.iloc[i:i + 77] for i in range(0, len(irregular), 77))
+    chunked = pandas.concat(list(stream_aggregate(chunks, max_step=3600)))
+    whole = pandas.concat(list(stream_aggregate([irregular], max_step=3600)))
+    numpy.testing.assert_allclose(chunked.ghi, whole.ghi)
+
+
+def test_stream_aggregate_default_step():
+    dates = pandas.date_range('2000-06-21', periods=120, freq='min')
+    df = pandas.DataFrame({'x': numpy.arange(120.)}, index=dates)
+    hourly = pandas.concat(list(stream_aggregate([df])))
+    expected = df.resample('h').mean()
+    assert len(hourly) == 2
+    numpy.testing.assert_array_equal(hourly.index, expected.index)
+    numpy.testing.assert_allclose(hourly.x, expected.x)
+    # a 30 minutes gap is not bridged by the last value before it
+    gap = df.drop(df.index[30:60])
+    hourly = pandas.concat(list(stream_aggregate(gap.iloc[i:i + 7] for i in range(0, len(gap), 7))))
+    expected = gap.resample('h').mean()
+    assert len(hourly) == 2
+    numpy.testing.assert_allclose(hourly.x, expected.x)
+
+
+def test_stream_aggregate_chunking():
+    dates = pandas.date_range('2000-06-21', periods=3 * 24 * 60, freq='min')
+    df = pandas.DataFrame({'ghi': numpy.random.rand(len(dates))}, index=dates)
+    for seed in range(50):
+        rng = numpy.random.default_rng(seed)
+        irregular = df.iloc[numpy.sort(rng.choice(len(df), 1000, replace=False))]
+        cuts = numpy.sort(rng.choice(numpy.arange(2, len(irregular)), 20, replace=False))
+        bounds = numpy.concatenate(([0, 1], cuts, [len(irregular)]))
+        for label, step in (('left', None), ('left', 180), ('right', 180)):
+            chunks = (irregular.iloc[i:j] for i, j in zip(bounds[:-1], bounds[1:]))
+            chunked = pandas.concat(list(stream_aggregate(chunks, label=label, step=step)))
+            whole = pandas.concat(list(stream_aggregate([irregular], label=label, step=step)))
+            assert len(chunked) == len(whole)
+            numpy.testing.assert_array_equal(chunked.index, whole.index)
+            numpy.testing.assert_allclose(chunked.ghi, whole.ghi)
@@ -1,3 +1,6 @@
+import numpy
+import pandas
+
 from openalea.astk.Weather import Weather
 from openalea.astk.data_access import get_path
 
@@ -20,3 +23,15 @@ def test_date_range_index():
     index = weather.date_range_index('2000-12-31', '2001-01-02', by=24)
     assert len(index) == 2
     assert len(index[0]) == 24
+
+
+def test_daylength():
+    weather = Weather()
+    seq = weather.date_range_index('2000-06-21')
+    daylength = weather.daylength(seq)
+    assert len(daylength) == 24
+    assert 15.3 < daylength[0] < 15.5
+    # local dates are converted to UTC days
+    local = pandas.date_range('2000-03-21 00:30', periods=4, freq='6h', tz='Pacific/Auckland')
+    numpy.testing.assert_allclose(weather.daylength(local), weather.daylength(local.tz_convert('UTC')))
+    numpy.testing.assert_allclose(weather.daylength(local), weather.daylength(local.tz_convert('UTC').tz_localize(None)))